@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of the approximate (IVF-PQ) local index against exact
+search, over embeddings from embed_documents (fake hashing embeddings over a
+synthetic topical corpus unless --real-embeddings is given).
+
+    python scripts/bench_ann_index.py --vectors 100000 --nprobe 4 8 16 32 --refine 0 2 4
+
+recall@k counts a returned ID as a hit when its true cosine similarity is at
+least the exact k-th best (ties at the cut-off are not misses). Latency is per
+single-query search; the filtered rows restrict the search by doc_type and year.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_stand_ins import FakeEmbeddings, configure_environment, install_fake_embeddings, percentile
+
+DOC_TYPES = ["article", "amendment", "judgment", "schedule"]
+YEARS = range(1950, 2025)
+FILTER = {"doc_type": {"$in": ["amendment", "judgment"]}, "year": {"$gte": 1990}}
+
+
+def topical_texts(count: int, topics: int, seed: int):
+    """Texts drawn from overlapping topic vocabularies, so embeddings cluster like real passages"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(topics * 20)]
+    topic_words = [rng.sample(vocabulary, 40) for _ in range(topics)]
+    texts = []
+    for _ in range(count):
+        words = rng.sample(topic_words[rng.randrange(topics)], 20) + rng.sample(vocabulary, 10)
+        texts.append(" ".join(words))
+    return texts
+
+
+def embed_all(texts, batch_size: int = 1024) -> np.ndarray:
+    from embeddings.embedding_service import embed_documents
+
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embed_documents(texts[start:start + batch_size]))
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def recall_at_k(results, truth, vectors, queries, rows, top_k: int) -> float:
+    """Mean fraction of returned IDs scoring at least the exact k-th best similarity"""
+    hits = 0
+    for query, found, exact in zip(queries, results, truth):
+        if not exact:
+            continue
+        cutoff = float(vectors[rows[exact[-1][0]]] @ query) - 1e-5
+        hits += sum(1 for vector_id, _, _ in found if float(vectors[rows[vector_id]] @ query) >= cutoff)
+    expected = sum(len(exact) for exact in truth)
+    return hits / expected if expected else 1.0
+
+
+def time_searches(index, queries, top_k: int, **kwargs):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search([query], top_k, **kwargs)[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency of the IVF-PQ index against exact search")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=500, help="Topic clusters in the synthetic corpus")
+    parser.add_argument("--insert-batch", type=int, default=10000,
+                        help="Vectors per upsert (the index trains and retrains as it grows)")
+    parser.add_argument("--nlist", type=int, default=0, help="Coarse lists (0 = automatic)")
+    parser.add_argument("--subvectors", type=int, default=48, help="PQ bytes per vector")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--refine", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured embedding model")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="rag-ann-")
+    configure_environment(work_dir, EMBEDDING_CACHE_ENABLED="false")
+    if not args.real_embeddings:
+        install_fake_embeddings(FakeEmbeddings(call_overhead=0.0, per_text_cost=0.0))
+
+    from vector_store.ann_index import IVFPQIndex
+    from vector_store.local_store import LocalVectorIndex
+
+    start = time.perf_counter()
+    texts = topical_texts(args.vectors + args.queries, args.topics, seed=0)
+    embeddings = embed_all(texts)
+    vectors, queries = embeddings[:args.vectors], embeddings[args.vectors:]
+    print(f"Embedded {len(texts)} texts ({vectors.shape[1]} dims) in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    ids = [f"chunk_{i}" for i in range(args.vectors)]
+    rows = {vector_id: row for row, vector_id in enumerate(ids)}
+    metadata = [{"text": text, "chunk_id": i, "doc_type": rng.choice(DOC_TYPES), "year": rng.choice(YEARS)}
+                for i, text in enumerate(texts[:args.vectors])]
+
+    exact = LocalVectorIndex(os.path.join(work_dir, "exact"), "float32")
+    start = time.perf_counter()
+    exact.upsert(ids, vectors, metadata)
+    print(f"Exact index built in {time.perf_counter() - start:.1f}s")
+
+    ann = IVFPQIndex(os.path.join(work_dir, "ann"), nlist=args.nlist, subvectors=args.subvectors,
+                     min_train=min(20000, args.vectors))
+    start = time.perf_counter()
+    for batch_start in range(0, args.vectors, args.insert_batch):
+        batch = slice(batch_start, batch_start + args.insert_batch)
+        ann.upsert(ids[batch], vectors[batch], metadata[batch])
+    stats = ann.stats()
+    print(f"IVF-PQ index built in {time.perf_counter() - start:.1f}s: {stats['nlist']} lists, "
+          f"{stats['code_bytes_per_vector']} code bytes + {stats['vector_bytes_per_vector']} refine bytes "
+          f"per vector (exact float32: {4 * vectors.shape[1]})")
+
+    for label, filter in (("unfiltered", None), ("filtered", FILTER)):
+        truth, exact_ms = time_searches(exact, queries, args.top_k, filter=filter)
+        print(f"\n{label}: exact p50 {percentile(exact_ms, 50):.2f} ms, p95 {percentile(exact_ms, 95):.2f} ms, "
+              f"{1000 * len(queries) / sum(exact_ms):.0f} QPS")
+        print(f"{'nprobe':>6} {'refine':>6} {'recall@' + str(args.top_k):>9} {'p50 ms':>7} {'p95 ms':>7} "
+              f"{'QPS':>7} {'speed-up':>8}")
+        for nprobe in args.nprobe:
+            for refine in args.refine:
+                results, ms = time_searches(ann, queries, args.top_k, filter=filter, nprobe=nprobe, refine=refine)
+                recall = recall_at_k(results, truth, vectors, queries, rows, args.top_k)
+                print(f"{nprobe:>6} {refine:>6} {recall:>9.3f} {percentile(ms, 50):>7.2f} {percentile(ms, 95):>7.2f} "
+                      f"{1000 * len(queries) / sum(ms):>7.0f} {sum(exact_ms) / sum(ms):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
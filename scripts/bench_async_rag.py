@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Throughput of the async RAG pipeline at increasing concurrency, against local
+stand-ins (fake embeddings, local vector store, fake LLM endpoint).
+
+    python scripts/bench_async_rag.py --concurrency 1 4 16 64 --requests 128
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_llm_server import start_server_process
+from local_stand_ins import (
+    QUESTIONS, configure_environment, install_fake_embeddings, synthetic_documents, percentile
+)
+
+
+async def run_level(aquery_rag, concurrency: int, total: int):
+    """Answer `total` questions with `concurrency` clients, returning (seconds, latencies, errors)"""
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(f"{QUESTIONS[i % len(QUESTIONS)]} (variant {i})")
+
+    async def client():
+        nonlocal errors
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await aquery_rag(question)
+                if response["error"] or response["answer"].startswith("Error"):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark aquery_rag throughput against local stand-ins")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=128, help="Questions per concurrency level")
+    parser.add_argument("--documents", type=int, default=2000, help="Synthetic chunks in the local index")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake LLM seconds per answer")
+    args = parser.parse_args()
+
+    server, endpoint = start_server_process(first_token_delay=args.llm_latency, token_delay=0.0)
+    cache_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    configure_environment(cache_dir, endpoint, ANSWER_CACHE_ENABLED="false",
+                          ASYNC_MAX_CONCURRENCY=max(args.concurrency), ASYNC_MAX_PENDING=max(args.concurrency) * 4)
+    install_fake_embeddings()
+
+    from vector_store.vector_store import store_documents
+    from retrieval.async_rag_pipeline import aquery_rag
+    from retrieval.rag_pipeline import query_rag
+
+    store_documents(synthetic_documents(args.documents))
+
+    # Sequential synchronous baseline
+    baseline_count = min(args.requests, 16)
+    start = time.perf_counter()
+    for i in range(baseline_count):
+        query_rag(QUESTIONS[i % len(QUESTIONS)])
+    baseline = baseline_count / (time.perf_counter() - start)
+    print(f"sync query_rag, sequential: {baseline:.1f} questions/s")
+
+    print(f"{'concurrency':>11} {'q/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for level in args.concurrency:
+        elapsed, latencies, errors = asyncio.run(run_level(aquery_rag, level, args.requests))
+        ms = [value * 1000 for value in latencies]
+        print(f"{level:>11} {args.requests / elapsed:>8.1f} {percentile(ms, 50):>8.1f} "
+              f"{percentile(ms, 95):>8.1f} {percentile(ms, 99):>8.1f} {errors:>6}")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
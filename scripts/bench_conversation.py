@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Per-turn token and latency accounting of conversation mode against local
+stand-ins (fake embeddings, local vector store over a synthetic constitution,
+and a fake LLM endpoint that reports prompt-cache hits like the hosted models).
+
+    python scripts/bench_conversation.py --turns 16 --history-tokens 1500
+
+"prefix" is the part of the prompt unchanged since the previous turn and
+"cached" what the endpoint reported as served from its prompt cache.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_llm_server import start_server_process
+from local_stand_ins import QUESTIONS, configure_environment, install_fake_embeddings, write_synthetic_constitution
+
+FOLLOW_UPS = [
+    "What about clause 2 of that?",
+    "Are there any exceptions to it?",
+    "Which other articles relate to this?",
+]
+
+
+def conversation_questions(turns: int):
+    """Alternate new topics with follow-ups on them"""
+    questions = []
+    for i in range(turns):
+        if i % 3 == 0:
+            questions.append(QUESTIONS[(i // 3) % len(QUESTIONS)])
+        else:
+            questions.append(FOLLOW_UPS[(i // 3 + i % 3) % len(FOLLOW_UPS)])
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn accounting of conversation mode against local stand-ins")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--history-tokens", type=int, help="Sets CONVERSATION_HISTORY_TOKENS")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM seconds per answer")
+    args = parser.parse_args()
+
+    server, endpoint = start_server_process(first_token_delay=args.llm_latency, token_delay=0.0)
+    work_dir = tempfile.mkdtemp(prefix="rag-conversation-")
+    overrides = {"ANSWER_CACHE_ENABLED": "false"}
+    if args.history_tokens:
+        overrides["CONVERSATION_HISTORY_TOKENS"] = args.history_tokens
+    configure_environment(work_dir, endpoint, **overrides)
+    install_fake_embeddings()
+
+    from ingestion.ingestion_service import ingest_constitution
+    from retrieval.conversation import Conversation
+    from retrieval.rag_pipeline import query_rag
+
+    try:
+        ingest_constitution(write_synthetic_constitution(os.path.join(work_dir, "constitution.txt")))
+        conversation = Conversation()
+        totals = {"prompt": 0, "cached": 0}
+        print(f"\n{'turn':>4} {'follow-up':>9} {'prompt':>7} {'prefix':>7} {'cached':>7} {'new':>4} {'reused':>6} "
+              f"{'history':>7} {'pinned':>6} {'folded':>6} {'retr ms':>8} {'llm ms':>7}  question")
+        for question in conversation_questions(args.turns):
+            response = query_rag(question, conversation=conversation)
+            if response["error"]:
+                print(f"Error: {response['error']}")
+                break
+            turn = response["turn_stats"]
+            cached = turn.get("cached_tokens", 0)
+            totals["prompt"] += turn["usage"]["prompt_tokens"]
+            totals["cached"] += cached
+            print(f"{turn['turn']:>4} {'yes' if turn['follow_up'] else 'no':>9} {turn['prompt_tokens']:>7} "
+                  f"{turn['prefix_tokens']:>7} {cached:>7} {turn['new_chunks']:>4} {turn['reused_chunks']:>6} "
+                  f"{turn['history_turns']:>7} {turn['pinned_chunks']:>6} {turn['folded_turns']:>6} "
+                  f"{turn['retrieval_ms']:>8.1f} {turn['llm_ms']:>7.1f}  {question}")
+        if totals["prompt"]:
+            print(f"\n{totals['cached']} of {totals['prompt']} prompt tokens reported cached "
+                  f"({100 * totals['cached'] / totals['prompt']:.0f}%)")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of ingestion and query latency against local stand-ins
+(local vector store, fake LLM endpoint with configurable latency, and fake
+embeddings unless --real-embeddings is given).
+
+Each run appends one JSON record to --output so runs can be compared over time:
+
+    python scripts/bench_pipeline.py --output bench-results.jsonl
+    python scripts/bench_pipeline.py --document src/documents/COI.pdf --llm-latency 0.5 --compare
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_llm_server import start_server_process
+from local_stand_ins import (
+    QUESTIONS, configure_environment, install_fake_embeddings, write_synthetic_constitution, percentile
+)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_queries(query_rag, questions, stream: bool):
+    """Answer each question in turn, returning per-question latencies and the error count"""
+    latencies, errors = [], 0
+    for question in questions:
+        start = time.perf_counter()
+        response = query_rag(question, stream=stream)
+        answer = "".join(response["answer"]) if stream else response["answer"]
+        latencies.append(time.perf_counter() - start)
+        if response["error"] or answer.startswith("Error"):
+            errors += 1
+    return latencies, errors
+
+
+def summarize(latencies, errors, elapsed, stage_metrics):
+    ms = [value * 1000 for value in latencies]
+    return {
+        "questions": len(latencies),
+        "errors": errors,
+        "questions_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {"p50": percentile(ms, 50), "p95": percentile(ms, 95), "p99": percentile(ms, 99),
+                       "max": max(ms) if ms else 0.0},
+        "stages": stage_metrics,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_phase(name, result):
+    latency = result["latency_ms"]
+    print(f"\n{name}: {result['questions_per_second']:.1f} q/s, p50 {latency['p50']:.1f} ms, "
+          f"p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms, errors {result['errors']}")
+    print(f"  {'stage':<16} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage, metrics in result["stages"].items():
+        print(f"  {stage:<16} {metrics['count']:>6} {metrics['p50_ms']:>8.1f} "
+              f"{metrics['p95_ms']:>8.1f} {metrics['p99_ms']:>8.1f}")
+
+
+def print_comparison(previous, current):
+    """Relative change of the headline numbers against the previous record"""
+    def change(old, new):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nCompared with run {previous.get('revision') or '?'} at {previous.get('timestamp')}:")
+    rows = [
+        ("chunking chunks/s", previous["ingestion"]["chunk"]["chunks_per_second"],
+         current["ingestion"]["chunk"]["chunks_per_second"]),
+        ("store chunks/s", previous["ingestion"]["store"]["chunks_per_second"],
+         current["ingestion"]["store"]["chunks_per_second"]),
+    ]
+    for phase in ("cold", "warm"):
+        rows.append((f"{phase} q/s", previous["queries"][phase]["questions_per_second"],
+                     current["queries"][phase]["questions_per_second"]))
+        rows.append((f"{phase} p95 ms", previous["queries"][phase]["latency_ms"]["p95"],
+                     current["queries"][phase]["latency_ms"]["p95"]))
+    for label, old, new in rows:
+        print(f"  {label:<20} {old:>10.1f} -> {new:>10.1f}  {change(old, new)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and query latency against local stand-ins")
+    parser.add_argument("--document", help="Constitution PDF/TXT (default: a generated synthetic constitution)")
+    parser.add_argument("--articles", type=int, default=400, help="Articles in the synthetic constitution")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the question set per phase")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Fake LLM seconds between streamed tokens")
+    parser.add_argument("--stream", action="store_true", help="Request streamed answers")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured HuggingFace model")
+    parser.add_argument("--retrieval-mode", default="hybrid", choices=["hybrid", "vector", "lexical"])
+    parser.add_argument("--output", default="bench-results.jsonl", help="JSON lines file to append results to")
+    parser.add_argument("--compare", action="store_true", help="Compare with the last record in --output")
+    args = parser.parse_args()
+
+    server, endpoint = start_server_process(first_token_delay=args.llm_latency, token_delay=args.token_delay)
+    work_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    # The answer cache would turn the warm pass into cache lookups; measure the pipeline itself
+    configure_environment(work_dir, endpoint, ANSWER_CACHE_ENABLED="false", RETRIEVAL_MODE=args.retrieval_mode)
+    document = args.document or write_synthetic_constitution(os.path.join(work_dir, "constitution.txt"),
+                                                            args.articles)
+
+    try:
+        # Cold start: importing the pipeline and loading the embedding model
+        start = time.perf_counter()
+        from data.constitution_processor import process_constitution
+        from ingestion.ingestion_service import ingest_constitution, assign_chunk_ids
+        from vector_store.vector_store import store_documents
+        from retrieval.rag_pipeline import query_rag
+        from embeddings.embedding_service import warm_up_embeddings
+        from utils.tracing import get_stage_metrics, reset_stage_metrics
+        from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
+        import_seconds = time.perf_counter() - start
+        if not args.real_embeddings:
+            install_fake_embeddings()
+        _, model_seconds = timed(warm_up_embeddings)
+
+        # Ingestion
+        chunks, chunk_seconds = timed(process_constitution, document, CHUNK_SIZE, CHUNK_OVERLAP)
+        ok, store_seconds = timed(store_documents, chunks, ids=assign_chunk_ids(chunks))
+        if not ok:
+            raise RuntimeError("store_documents failed")
+        # Writes the manifest plus lexical/article indexes; embeddings are cached by now
+        ok, ingest_seconds = timed(ingest_constitution, document, CHUNK_SIZE, CHUNK_OVERLAP)
+        if not ok:
+            raise RuntimeError("ingest_constitution failed")
+        ingestion = {
+            "document": os.path.basename(document),
+            "chunks": len(chunks),
+            "chunk": {"seconds": chunk_seconds, "chunks_per_second": len(chunks) / chunk_seconds},
+            "store": {"seconds": store_seconds, "chunks_per_second": len(chunks) / store_seconds},
+            "ingest_cached_embeddings": {"seconds": ingest_seconds},
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        print(f"Ingestion: {len(chunks)} chunks; chunking {chunk_seconds:.2f}s, "
+              f"store {store_seconds:.2f}s, re-ingest {ingest_seconds:.2f}s")
+
+        # Cold queries: first pass with empty query caches; warm: repeated passes
+        questions = list(QUESTIONS)
+        reset_stage_metrics()
+        (latencies, errors), elapsed = timed(run_queries, query_rag, questions, args.stream)
+        cold = summarize(latencies, errors, elapsed, get_stage_metrics())
+        print_phase("Cold queries", cold)
+
+        reset_stage_metrics()
+        (latencies, errors), elapsed = timed(run_queries, query_rag, questions * args.rounds, args.stream)
+        warm = summarize(latencies, errors, elapsed, get_stage_metrics())
+        print_phase("Warm queries", warm)
+    finally:
+        server.terminate()
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "cold_start": {"import_seconds": import_seconds, "model_load_seconds": model_seconds},
+        "ingestion": ingestion,
+        "queries": {"cold": cold, "warm": warm},
+    }
+
+    previous = None
+    if args.compare and os.path.exists(args.output):
+        with open(args.output, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        previous = json.loads(lines[-1]) if lines else None
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"\nCold start: import {import_seconds:.2f}s, model load {model_seconds:.2f}s; "
+          f"peak RSS {peak_rss_mb():.0f} MB. Results appended to {args.output}")
+    if previous is not None:
+        print_comparison(previous, record)
+
+
+if __name__ == "__main__":
+    main()
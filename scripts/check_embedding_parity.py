@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare embedding runtimes on the same texts: cosine similarity of the ONNX
+(and int8-quantized ONNX) vectors to the PyTorch ones, plus document
+throughput and single-query latency of each runtime.
+
+    python scripts/check_embedding_parity.py
+    python scripts/check_embedding_parity.py --runtimes huggingface onnx-int8 --texts 500 --threads 4
+
+Exits with status 1 if a runtime falls below its minimum cosine similarity.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+from local_stand_ins import QUESTIONS, synthetic_documents, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ONNX embedding parity and speed against PyTorch")
+    parser.add_argument("--runtimes", nargs="+", default=["huggingface", "onnx", "onnx-int8"],
+                        choices=["huggingface", "onnx", "onnx-int8"], help="First runtime is the reference")
+    parser.add_argument("--texts", type=int, default=256, help="Synthetic document chunks to embed")
+    parser.add_argument("--threads", type=int, help="Sets EMBEDDING_THREADS for every runtime")
+    args = parser.parse_args()
+    if args.threads is not None:
+        os.environ["EMBEDDING_THREADS"] = str(args.threads)
+
+    from embeddings.embedding_service import initialize_embeddings
+    from embeddings.onnx_embeddings import min_cosine, l2_normalize, MIN_PARITY_COSINE, MIN_PARITY_COSINE_INT8
+
+    documents = [doc.page_content for doc in synthetic_documents(args.texts)]
+    results = {}
+    for runtime in args.runtimes:
+        start = time.perf_counter()
+        model = initialize_embeddings(runtime=runtime)
+        load_seconds = time.perf_counter() - start
+        model.embed_query("warm up")
+
+        start = time.perf_counter()
+        vectors = np.asarray(model.embed_documents(documents), dtype=np.float32)
+        document_seconds = time.perf_counter() - start
+
+        query_ms = []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            model.embed_query(question)
+            query_ms.append((time.perf_counter() - start) * 1000)
+        results[runtime] = {"vectors": vectors, "load": load_seconds, "documents": document_seconds,
+                            "query_p50": percentile(query_ms, 50), "query_p95": percentile(query_ms, 95)}
+
+    reference_name = args.runtimes[0]
+    reference = results[reference_name]["vectors"]
+    failed = False
+    print(f"{len(documents)} documents, {len(QUESTIONS)} queries; parity against {reference_name}\n")
+    print(f"{'runtime':<12} {'load s':>7} {'docs/s':>8} {'query p50 ms':>13} {'query p95 ms':>13} "
+          f"{'min cos':>9} {'mean cos':>9}")
+    for runtime, result in results.items():
+        cosines = (l2_normalize(reference) * l2_normalize(result["vectors"])).sum(axis=1)
+        threshold = MIN_PARITY_COSINE_INT8 if "int8" in runtime or "int8" in reference_name else MIN_PARITY_COSINE
+        ok = min_cosine(reference, result["vectors"]) >= threshold
+        failed = failed or not ok
+        print(f"{runtime:<12} {result['load']:>7.2f} {len(documents) / result['documents']:>8.1f} "
+              f"{result['query_p50']:>13.2f} {result['query_p95']:>13.2f} "
+              f"{cosines.min():>9.5f} {cosines.mean():>9.5f}{'' if ok else '  BELOW ' + str(threshold)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
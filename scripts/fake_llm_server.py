@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the chat-completions endpoint, with configurable latency.
+
+Supports both regular JSON responses and streamed server-sent events
+("stream": true in the request body). Point the app at it with:
+    GITHUB_TOKEN=local GITHUB_MODEL_ENDPOINT=http://127.0.0.1:8001/chat/completions
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Recent prompts remembered for simulated prompt caching
+PROMPT_CACHE_ENTRIES = 64
+
+DEFAULT_ANSWER = (
+    "Article 21 provides that no person shall be deprived of his life or personal "
+    "liberty except according to procedure established by law."
+)
+
+
+class FakeLLMConfig:
+    """Behaviour knobs, adjustable while the server runs"""
+
+    def __init__(self, answer: str = DEFAULT_ANSWER, first_token_delay: float = 0.2,
+                 token_delay: float = 0.01, status_code: int = 200, retry_after: float = None,
+                 fail_requests: int = 0, failure_status: int = 500, slow_requests: int = 0,
+                 slow_delay: float = 2.0):
+        self.answer = answer
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.status_code = status_code
+        self.retry_after = retry_after
+        # The next fail_requests requests answer failure_status, then the server recovers
+        self.fail_requests = fail_requests
+        self.failure_status = failure_status
+        # The next slow_requests requests wait slow_delay before answering, for hedging tests
+        self.slow_requests = slow_requests
+        self.slow_delay = slow_delay
+        self.request_count = 0
+        self.recent_prompts = []
+        self.lock = threading.Lock()
+
+    def next_behaviour(self):
+        """(status code, extra delay) for the next request"""
+        with self.lock:
+            self.request_count += 1
+            status, delay = self.status_code, 0.0
+            if self.fail_requests > 0:
+                self.fail_requests -= 1
+                status = self.failure_status
+            elif self.slow_requests > 0:
+                self.slow_requests -= 1
+                delay = self.slow_delay
+            return status, delay
+
+    def cached_tokens(self, prompt: str) -> int:
+        """Mimic provider prompt caching: the longest prefix shared with a recent prompt counts
+        as cached once it reaches 1024 tokens, in steps of 128 (~4 characters per token)"""
+        with self.lock:
+            shared = max((len(os.path.commonprefix([prompt, previous])) for previous in self.recent_prompts),
+                         default=0)
+            self.recent_prompts = (self.recent_prompts + [prompt])[-PROMPT_CACHE_ENTRIES:]
+        tokens = shared // 4
+        return tokens // 128 * 128 if tokens >= 1024 else 0
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog deep enough for load tests"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(config: FakeLLMConfig):
+    class Handler(BaseHTTPRequestHandler):
+        # Headers and body go out as separate writes; don't let Nagle hold the body back
+        disable_nagle_algorithm = True
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, payload, status=200, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            status, extra_delay = config.next_behaviour()
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if status != 200:
+                headers = {"Retry-After": str(config.retry_after)} if config.retry_after is not None else None
+                self._send_json({"error": {"message": "fake failure"}}, status, headers)
+                return
+
+            time.sleep(config.first_token_delay + extra_delay)
+            tokens = config.answer.split(" ")
+            prompt = "".join(f"{m.get('role')}\0{m.get('content', '')}\0" for m in request.get("messages", []))
+            usage = {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(tokens),
+                "total_tokens": len(prompt) // 4 + len(tokens),
+                "prompt_tokens_details": {"cached_tokens": config.cached_tokens(prompt)},
+            }
+
+            if not request.get("stream"):
+                time.sleep(config.token_delay * len(tokens))
+                self._send_json({
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": config.answer},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(config.token_delay)
+                chunk = {"choices": [{"index": 0, "delta": {"content": token if i == 0 else " " + token}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                # Like the OpenAI API: usage arrives in one extra chunk with no choices
+                self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def start_server(config: FakeLLMConfig = None, host: str = "127.0.0.1", port: int = 0):
+    """Start the fake endpoint in a background thread, returning (server, endpoint_url)"""
+    config = config or FakeLLMConfig()
+    server = StubHTTPServer((host, port), make_handler(config))
+    server.config = config
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/chat/completions"
+
+
+def start_server_process(first_token_delay: float = 0.2, token_delay: float = 0.01, host: str = "127.0.0.1"):
+    """Run the fake endpoint in a separate process, so it doesn't compete for the caller's GIL
+
+    Returns (process, endpoint_url); terminate the process when done.
+    """
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(port),
+        "--first-token-delay", str(first_token_delay), "--token-delay", str(token_delay)
+    ], stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f"http://{host}:{port}/chat/completions"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake chat-completions endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed tokens")
+    parser.add_argument("--status-code", type=int, default=200, help="Fail every request with this status")
+    parser.add_argument("--retry-after", type=float, help="Retry-After header sent with failures")
+    parser.add_argument("--fail-requests", type=int, default=0, help="Fail only this many requests, then recover")
+    parser.add_argument("--failure-status", type=int, default=500, help="Status of the --fail-requests failures")
+    parser.add_argument("--slow-requests", type=int, default=0, help="Delay this many requests by --slow-delay")
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                           status_code=args.status_code, retry_after=args.retry_after,
+                           fail_requests=args.fail_requests, failure_status=args.failure_status,
+                           slow_requests=args.slow_requests,
+                           slow_delay=args.slow_delay)
+    server = StubHTTPServer((args.host, args.port), make_handler(config))
+    print(f"Fake LLM endpoint listening on http://{args.host}:{args.port}/chat/completions")
+    server.serve_forever()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for a Pinecone index data plane, for local testing.
+
+Point the app at it with:
+    PINECONE_API_KEY=local PINECONE_INDEX_HOST=http://127.0.0.1:5080 streamlit run src/app.py
+"""
+
+import argparse
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakePineconeIndex:
+    """Keeps vectors in a dict and answers queries with exact cosine similarity"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.vectors = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    def upsert(self, vectors):
+        with self.lock:
+            for vector in vectors:
+                self.vectors[vector["id"]] = vector
+        return {"upsertedCount": len(vectors)}
+
+    def delete(self, ids=None, delete_all=False):
+        with self.lock:
+            if delete_all:
+                self.vectors.clear()
+            for vector_id in ids or []:
+                self.vectors.pop(vector_id, None)
+        return {}
+
+    def fetch(self, ids):
+        with self.lock:
+            found = {vector_id: self.vectors[vector_id] for vector_id in ids if vector_id in self.vectors}
+        return {"vectors": found, "namespace": ""}
+
+    def query(self, vector, top_k=5, include_metadata=False, include_values=False):
+        query_norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        with self.lock:
+            stored = list(self.vectors.values())
+        scored = []
+        for item in stored:
+            values = item["values"]
+            norm = math.sqrt(sum(v * v for v in values)) or 1.0
+            score = sum(a * b for a, b in zip(vector, values)) / (norm * query_norm)
+            scored.append((score, item))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+
+        matches = []
+        for score, item in scored[:top_k]:
+            match = {"id": item["id"], "score": score, "values": item["values"] if include_values else []}
+            if include_metadata:
+                match["metadata"] = item.get("metadata", {})
+            matches.append(match)
+        return {"matches": matches, "namespace": ""}
+
+    def describe_index_stats(self):
+        with self.lock:
+            count = len(self.vectors)
+        return {
+            "namespaces": {"": {"vectorCount": count}},
+            "dimension": self.dimension,
+            "indexFullness": 0.0,
+            "totalVectorCount": count,
+        }
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog deep enough for load tests"""
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(index: FakePineconeIndex):
+    class Handler(BaseHTTPRequestHandler):
+        # Headers and body go out as separate writes; don't let Nagle hold the body back
+        disable_nagle_algorithm = True
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            index.request_count += 1
+            url = urlparse(self.path)
+            if url.path == "/describe_index_stats":
+                self._send(index.describe_index_stats())
+            elif url.path == "/vectors/fetch":
+                self._send(index.fetch(parse_qs(url.query).get("ids", [])))
+            else:
+                self._send({"message": "not found"}, 404)
+
+        def do_POST(self):
+            index.request_count += 1
+            path = urlparse(self.path).path
+            body = self._body()
+            if path == "/query":
+                self._send(index.query(
+                    body.get("vector", []),
+                    top_k=body.get("topK", 5),
+                    include_metadata=body.get("includeMetadata", False),
+                    include_values=body.get("includeValues", False),
+                ))
+            elif path == "/vectors/upsert":
+                self._send(index.upsert(body.get("vectors", [])))
+            elif path == "/vectors/delete":
+                self._send(index.delete(body.get("ids"), body.get("deleteAll", False)))
+            elif path == "/describe_index_stats":
+                self._send(index.describe_index_stats())
+            else:
+                self._send({"message": "not found"}, 404)
+
+    return Handler
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, dimension: int = 384):
+    """Start the stub server in a background thread, returning (server, base_url)"""
+    index = FakePineconeIndex(dimension)
+    server = StubHTTPServer((host, port), make_handler(index))
+    server.index = index
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an in-memory Pinecone index stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5080)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    server = StubHTTPServer((args.host, args.port), make_handler(FakePineconeIndex(args.dimension)))
+    print(f"Fake Pinecone index listening on http://{args.host}:{args.port}")
+    server.serve_forever()
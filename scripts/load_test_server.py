@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Load test for the HTTP server (src/server.py): throughput, latency percentiles
+and status codes at increasing numbers of concurrent keep-alive clients.
+
+Against a running server:
+    python scripts/load_test_server.py --url http://127.0.0.1:8000 --concurrency 1 8 32
+
+Or against a server started here on local stand-ins (fake embeddings, local
+vector store over a synthetic constitution, fake LLM endpoint):
+    python scripts/load_test_server.py --workers 1 2 4 --concurrency 8 32 --requests 400
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_llm_server import start_server_process
+from local_stand_ins import (
+    QUESTIONS, configure_environment, install_fake_embeddings, write_synthetic_constitution, percentile
+)
+
+
+def wait_until_ready(host: str, port: int, timeout: float = 120.0):
+    """Poll /readyz until a worker answers 200"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=2)
+            connection.request("GET", "/readyz")
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+            connection.close()
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {host}:{port} did not become ready within {timeout:.0f}s")
+
+
+def run_level(host: str, port: int, concurrency: int, total: int, unique: bool):
+    """Send `total` questions from `concurrency` clients; returns (seconds, latencies, status counts)"""
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            question = QUESTIONS[i % len(QUESTIONS)] + (f" (variant {i})" if unique else "")
+            body = json.dumps({"question": question})
+            start = time.perf_counter()
+            try:
+                connection.request("POST", "/query", body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=60)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, statuses
+
+
+def start_local_server(workers: int, work_dir: str, document_path: str):
+    """Fork a server over the local stand-ins; returns (pid, host, port)"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    pid = os.fork()
+    if pid == 0:
+        try:
+            sys.stdout = open(os.path.join(work_dir, f"server-{workers}.log"), "w")
+            install_fake_embeddings()
+            from server import serve
+            serve("127.0.0.1", port, workers, constitution_path=document_path)
+        finally:
+            os._exit(0)
+    return pid, "127.0.0.1", port
+
+
+def stop_local_server(pid: int):
+    os.kill(pid, signal.SIGTERM)
+    os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RAG HTTP server")
+    parser.add_argument("--url", help="Server to test; starts one on local stand-ins when omitted")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="Worker counts to compare (local server only)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Questions per concurrency level")
+    parser.add_argument("--repeat-questions", action="store_true",
+                        help="Cycle through the same questions (answer/embedding cache hits)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds per answer")
+    parser.add_argument("--articles", type=int, default=400, help="Articles in the synthetic constitution")
+    args = parser.parse_args()
+
+    if not args.url:
+        llm_server, endpoint = start_server_process(first_token_delay=args.llm_latency, token_delay=0.0)
+        work_dir = tempfile.mkdtemp(prefix="rag-load-")
+        configure_environment(work_dir, endpoint, ANSWER_CACHE_ENABLED="false")
+        document_path = write_synthetic_constitution(os.path.join(work_dir, "constitution.txt"), args.articles)
+        print(f"Local stand-ins in {work_dir} (server logs: server-<workers>.log)")
+
+    print(f"{'workers':>7} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for workers in ([None] if args.url else args.workers):
+        if args.url:
+            url = urlparse(args.url)
+            pid, host, port = None, url.hostname, url.port or 80
+        else:
+            pid, host, port = start_local_server(workers, work_dir, document_path)
+        try:
+            wait_until_ready(host, port)
+            for level in args.concurrency:
+                elapsed, latencies, statuses = run_level(host, port, level, args.requests,
+                                                         unique=not args.repeat_questions)
+                ms = [value * 1000 for value in latencies]
+                print(f"{workers or '-':>7} {level:>7} {args.requests / elapsed:>8.1f} {percentile(ms, 50):>8.1f} "
+                      f"{percentile(ms, 95):>8.1f} {percentile(ms, 99):>8.1f}  "
+                      + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+        finally:
+            if pid is not None:
+                stop_local_server(pid)
+    if not args.url:
+        llm_server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Local stand-ins for benchmarks: a fake embedding model, a synthetic corpus and
+environment wiring for the local vector store and fake LLM endpoint.
+
+configure_environment() must run before any module under src/ is imported,
+because settings are read at import time.
+"""
+
+import hashlib
+import os
+import re
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+QUESTIONS = [
+    "What are the fundamental rights guaranteed by the Constitution?",
+    "What does Article 21 say about personal liberty?",
+    "How is the President of India elected?",
+    "What are the Directive Principles of State Policy?",
+    "What is the procedure for amending the Constitution?",
+    "What powers does the Supreme Court have under Article 32?",
+    "What subjects are listed in the Seventh Schedule?",
+    "Who appoints the Governor of a State?",
+    "What is the right to equality under Article 14?",
+    "How are money bills passed in Parliament?",
+    "What are the fundamental duties of citizens?",
+    "What emergency powers does the President have?",
+]
+
+_TOPICS = [
+    "fundamental rights", "equality before law", "personal liberty", "freedom of speech",
+    "directive principles", "the President", "the Governor", "Parliament", "the Supreme Court",
+    "the High Courts", "money bills", "emergency provisions", "amendment of the Constitution",
+    "citizenship", "the Union and State Lists", "elections", "fundamental duties", "writs",
+]
+
+
+def configure_environment(cache_dir: str, llm_endpoint: str = None, **overrides):
+    """Point settings at a throwaway cache, the local vector store and a fake LLM"""
+    os.environ["CACHE_DIR"] = cache_dir
+    os.environ["VECTOR_STORE_BACKEND"] = "local"
+    os.environ.setdefault("GITHUB_TOKEN", "local-benchmark")
+    if llm_endpoint:
+        os.environ["GITHUB_MODEL_ENDPOINT"] = llm_endpoint
+    for name, value in overrides.items():
+        os.environ[name] = str(value)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+
+class FakeEmbeddings:
+    """Hashing-trick embedder with the same interface as HuggingFaceEmbeddings.
+
+    Texts sharing words get similar vectors, and each call sleeps to mimic
+    model cost (a fixed overhead plus a per-text cost).
+    """
+
+    def __init__(self, dimension: int = 384, call_overhead: float = 0.002, per_text_cost: float = 0.0005):
+        self.dimension = dimension
+        self.call_overhead = call_overhead
+        self.per_text_cost = per_text_cost
+
+    def _embed(self, text: str):
+        vector = [0.0] * self.dimension
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        time.sleep(self.call_overhead + self.per_text_cost * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def install_fake_embeddings(embeddings: FakeEmbeddings = None) -> FakeEmbeddings:
+    """Route the shared embedding registry to a FakeEmbeddings instance"""
+    import embeddings.embedding_service as embedding_service
+
+    fake = embeddings or FakeEmbeddings()
+    embedding_service.get_embeddings = lambda *args, **kwargs: fake
+    return fake
+
+
+def synthetic_documents(count: int = 2000):
+    """Generate constitution-flavoured chunks as langchain Documents"""
+    from langchain.schema import Document
+
+    documents = []
+    for i in range(count):
+        topic = _TOPICS[i % len(_TOPICS)]
+        other = _TOPICS[(i * 7 + 3) % len(_TOPICS)]
+        text = (
+            f"Article {i + 1}. Provisions relating to {topic}. Subject to the provisions of this "
+            f"Constitution, the law made by Parliament on {topic} shall have regard to {other}, "
+            f"and nothing in this article shall affect the operation of any existing law. "
+        ) * 4
+        documents.append(Document(page_content=text, metadata={"source": "Synthetic Constitution", "chunk_id": i}))
+    return documents
+
+
+def write_synthetic_constitution(path: str, articles: int = 400, articles_per_page: int = 3) -> str:
+    """Write a constitution-shaped text file (Parts, numbered Articles, form-feed page breaks)"""
+    pages, lines = [], []
+    for i in range(articles):
+        if i % 40 == 0:
+            lines.append(f"PART {_roman(i // 40 + 1)}")
+            lines.append(_TOPICS[(i // 40) % len(_TOPICS)].upper())
+        topic = _TOPICS[i % len(_TOPICS)]
+        other = _TOPICS[(i * 7 + 3) % len(_TOPICS)]
+        lines.append(f"{i + 1}. Provisions relating to {topic}.—(1) Subject to the provisions of this "
+                     f"Constitution, Parliament may by law make provision with respect to {topic}.")
+        lines.append(f"(2) Any such law shall have regard to {other}, and nothing in this article shall "
+                     f"affect the operation of any existing law relating to {topic} or {other}. " * 3)
+        if (i + 1) % articles_per_page == 0:
+            pages.append("\n".join(lines))
+            lines = []
+    if lines:
+        pages.append("\n".join(lines))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\x0c".join(pages))
+    return path
+
+
+def _roman(number: int) -> str:
+    numerals = [(10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
+    result = ""
+    for value, numeral in numerals:
+        while number >= value:
+            result += numeral
+            number -= value
+    return result
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the application's entry modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`,
+and the slowest imports (cumulative, i.e. including everything they pull in)
+are reported, so cold-start regressions show up before they reach the UI:
+
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --module retrieval.rag_pipeline --top 30
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_DIR, "src")
+
+# What the Streamlit page imports before rendering, and what the warm-up imports after
+DEFAULT_MODULES = ["app", "retrieval.rag_pipeline", "ingestion.ingestion_service"]
+
+
+def profile_module(module: str):
+    """Return (total_seconds, [(cumulative_seconds, self_seconds, module_name), ...]) for one import"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        raise RuntimeError(f"importing {module} failed: {error}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.rstrip()))
+    # Keep the module's own subtree: the rows between the previous top-level import
+    # (interpreter start-up) and the module's row, which closes the subtree
+    end = max((i for i, row in enumerate(rows) if row[2] == " " + module), default=len(rows) - 1)
+    start = max((i for i in range(end) if not rows[i][2].startswith("  ")), default=-1) + 1
+    rows = rows[start:end + 1]
+    return (rows[-1][0] if rows else 0.0), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the slowest imports of the application entry modules")
+    parser.add_argument("--module", action="append", help="Module to profile (repeatable; default: entry modules)")
+    parser.add_argument("--top", type=int, default=15, help="Imports to list per module")
+    args = parser.parse_args()
+
+    for module in args.module or DEFAULT_MODULES:
+        try:
+            total, rows = profile_module(module)
+        except RuntimeError as e:
+            print(f"\n{module}: {str(e)}")
+            continue
+        print(f"\n{module}: {total * 1000:.0f} ms")
+        # Self time summed per top-level package: which dependency the cold start pays for
+        packages = {}
+        for _, self_time, name in rows:
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0.0) + self_time
+        print(f"  {'self ms':>13}  package")
+        for package, self_time in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"  {self_time * 1000:>13.1f}  {package}")
+        # Slowest individual imports; nested imports are included in their parent's time
+        print(f"  {'cumulative ms':>13}  import")
+        imports = [row for row in rows if row[2].strip() != module]
+        for cumulative, _, name in sorted(imports, reverse=True)[:args.top]:
+            print(f"  {cumulative * 1000:>13.1f}  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
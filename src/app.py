@@ -1,74 +1,138 @@
 import streamlit as st
 import os
 import sys
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from data.constitution_processor import process_constitution
-from vector_store.pinecone_client import store_documents
-from retrieval.rag_pipeline import query_rag
-from utils.helpers import validate_environment_variables, print_validation_results
-from config.settings import CHUNK_SIZE, CHUNK_OVERLAP
-
-def initialize_rag_system():
-    """Initialize the RAG system by processing and storing documents"""
-    if 'rag_initialized' not in st.session_state:
-        try:
-            with st.spinner("Initializing RAG system..."):
-                # Validate environment variables
-                validation_results = validate_environment_variables()
-                if not all(validation_results.values()):
-                    st.error("Missing required environment variables!")
-                    print_validation_results(validation_results)
-                    return False
-                
-                # Check if constitution file exists (support both PDF and TXT)
-                constitution_paths = [
-                    "src/documents/COI.pdf"
-                ]
-                
-                constitution_path = None
-                for path in constitution_paths:
-                    if os.path.exists(path):
-                        constitution_path = path
-                        break
-                
-                if constitution_path is None:
-                    st.error("Constitution file not found!")
-                    st.info("Please add the Constitution of India file (PDF or TXT) to the documents folder with one of these names:")
-                    for path in constitution_paths:
-                        st.info(f"- {path}")
-                    return False
-                
-                # Process constitution document
-                documents = process_constitution(
-                    constitution_path,
-                    chunk_size=CHUNK_SIZE,
-                    chunk_overlap=CHUNK_OVERLAP
-                )
-                
-                # Store in vector database
-                success = store_documents(documents)
-                
-                if success:
-                    st.session_state.rag_initialized = True
-                    st.success("RAG system initialized successfully!")
-                    return True
-                else:
-                    st.error("Failed to initialize vector store")
-                    return False
-                    
-        except Exception as e:
-            st.error(f"Error initializing RAG system: {str(e)}")
-            return False
-    
+# Only lightweight modules at the top: the pipeline (langchain, numpy, the vector
+# store client and the embedding model) is imported by the background warm-up so
+# the page renders straight away
+from utils.tracing import span, start_metrics_server
+from utils.warmup import WarmupState, pipeline_steps, worker_steps
+from config.settings import METRICS_PORT
+
+# Seconds between reruns while the warm-up is still running
+WARMUP_POLL_SECONDS = 0.5
+
+@st.cache_resource
+def start_metrics_exporter():
+    """Expose stage latency histograms for Prometheus, once per process"""
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
     return True
 
+@st.cache_resource
+def start_warmup() -> WarmupState:
+    """Start the one-time warm-up for this process; sessions share its state"""
+    return WarmupState(pipeline_steps() + worker_steps()).start()
+
+def restart_warmup():
+    """Drop a failed warm-up so the next run starts a new one (e.g. after a network error)"""
+    start_warmup.clear()
+
+def get_warmup() -> WarmupState:
+    """The process's warm-up; a failed one is retried when a new session opens"""
+    warmup = start_warmup()
+    if warmup.status == "failed" and "warmup_checked" not in st.session_state:
+        restart_warmup()
+        warmup = start_warmup()
+    st.session_state["warmup_checked"] = True
+    return warmup
+
+def show_warmup_progress(warmup: WarmupState):
+    """Readiness banner for the main page; reruns the script until the warm-up finishes"""
+    state = warmup.snapshot()
+    if state["status"] == "failed":
+        st.error(f"Error initializing RAG system ({state['failed_step']}): {state['error']}")
+        st.button("Retry initialization", on_click=restart_warmup)
+        return
+    if state["status"] != "ready":
+        st.progress(state["completed"] / state["total"],
+                    text=f"Initializing RAG system: {state['current_step'] or 'starting'}... "
+                         f"({state['elapsed']:.1f}s)")
+
+def show_warmup_timings(warmup: WarmupState):
+    state = warmup.snapshot()
+    st.markdown("### Startup:")
+    lines = [f"- {step}: {seconds:.2f}s" for step, seconds in state["durations"].items()]
+    lines.append(f"- **total**: {state['elapsed']:.2f}s ({state['status']})")
+    st.markdown("\n".join(lines))
+
+def get_conversation():
+    """This session's conversation, created on first use"""
+    from retrieval.conversation import Conversation
+
+    if "conversation" not in st.session_state:
+        st.session_state["conversation"] = Conversation()
+        st.session_state["conversation_history"] = []
+    return st.session_state["conversation"]
+
+def reset_conversation():
+    st.session_state.pop("conversation", None)
+    st.session_state.pop("conversation_history", None)
+
+def show_conversation_history():
+    for question, answer in st.session_state.get("conversation_history", []):
+        with st.chat_message("user"):
+            st.markdown(question)
+        with st.chat_message("assistant"):
+            st.markdown(answer)
+
+def answer_question(user_question: str, conversation=None):
+    """Run a question through the RAG pipeline and render the answer"""
+    from retrieval.rag_pipeline import query_rag
+    from llm.errors import LLMError
+
+    with st.spinner("Searching the Constitution..."):
+        # Get response from RAG pipeline; the answer streams in below
+        response = query_rag(user_question, stream=True, conversation=conversation)
+
+    print(response)  # Debugging output
+    
+    if response["error"]:
+        st.error(f"Error: {response['error']}")
+        return
+
+    with span("render"):
+        # Display answer as it is generated
+        st.markdown("### 📝 Answer:")
+        try:
+            answer = st.write_stream(response["answer"])
+        except LLMError as e:
+            st.error(f"Error: {str(e)}")
+            answer = None
+
+        stats = response.get("context_stats")
+        if stats:
+            st.caption(f"Context: {stats['context_tokens']} tokens from {stats['chunks_used']} chunks "
+                       f"({stats['tokens_saved']} tokens saved)")
+        turn = response.get("turn_stats")
+        if turn and "total_ms" in turn:
+            st.caption(f"Turn {turn['turn']}: {turn['prompt_tokens']} prompt tokens, {turn['prefix_tokens']} "
+                       f"unchanged from the last turn ({turn.get('cached_tokens', 0)} cached by the model); "
+                       f"{turn['reused_chunks']} chunks reused, {turn['new_chunks']} new; "
+                       f"{turn['total_ms']:.0f}ms")
+        if conversation is not None and answer:
+            st.session_state["conversation_history"].append((user_question, answer))
+
+        # Display sources
+        if response["sources"]:
+            st.markdown("### 📚 Sources:")
+            for i, source in enumerate(response["sources"], 1):
+                with st.expander(f"Source {i} (Relevance: {source['score']:.3f})"):
+                    st.text(source["text"])
+
 def main():
     st.title("🏛️ Constitution of India RAG Assistant")
     st.markdown("Ask questions about the Constitution of India and get accurate, context-based answers.")
     
-    # Initialize RAG system
-    if not initialize_rag_system():
-        st.stop()
+    start_metrics_exporter()
+    warmup = get_warmup()
+    show_warmup_progress(warmup)
+
+    conversation_mode = st.sidebar.checkbox("Conversation mode (follow-up questions)", value=False)
+    if conversation_mode:
+        st.sidebar.button("New conversation", on_click=reset_conversation)
+        show_conversation_history()
     
     # Create the query interface
     st.markdown("### Ask your question:")
@@ -77,27 +141,10 @@ def main():
         placeholder="e.g., What are the fundamental rights mentioned in the Constitution?"
     )
     
-    if st.button("Get Answer", type="primary"):
+    if st.button("Get Answer", type="primary", disabled=not warmup.ready):
         if user_question.strip():
-            with st.spinner("Searching and generating answer..."):
-                # Get response from RAG pipeline
-                response = query_rag(user_question)
-
-                print(response)  # Debugging output
-                
-                if response["error"]:
-                    st.error(f"Error: {response['error']}")
-                else:
-                    # Display answer
-                    st.markdown("### 📝 Answer:")
-                    st.markdown(response["answer"])
-                    
-                    # Display sources
-                    if response["sources"]:
-                        st.markdown("### 📚 Sources:")
-                        for i, source in enumerate(response["sources"], 1):
-                            with st.expander(f"Source {i} (Relevance: {source['score']:.3f})"):
-                                st.text(source["text"])
+            with span("request"):
+                answer_question(user_question, get_conversation() if conversation_mode else None)
         else:
             st.warning("Please enter a question.")
     
@@ -127,5 +174,11 @@ def main():
         - 🔧 HuggingFace embeddings (no OpenAI API required)
         """)
 
+        show_warmup_timings(warmup)
+
+    if warmup.status == "running":
+        time.sleep(WARMUP_POLL_SECONDS)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Answer a file of questions without the UI, e.g. to run evaluation sets or
+pre-warm the answer cache:
+
+    python src/batch_qa.py questions.jsonl --output answers.jsonl
+
+Input is JSONL ({"id": ..., "question": ...} per line) or CSV with a
+"question" column. Answers are appended to the output as they complete;
+re-running the same command resumes after an interruption.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from retrieval.batch_rag import read_questions, answer_questions
+from embeddings.embedding_service import warm_up_embeddings
+from utils.helpers import validate_environment_variables, print_validation_results
+from config.settings import ASYNC_MAX_CONCURRENCY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer questions from a JSONL/CSV file in bulk")
+    parser.add_argument("input", help="Questions as JSONL or CSV")
+    parser.add_argument("--output", help="JSONL file to append answers to (default: <input>.answers.jsonl)")
+    parser.add_argument("--question-field", default="question", help="Field/column holding the question")
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions embedded and searched together")
+    parser.add_argument("--concurrency", type=int, default=ASYNC_MAX_CONCURRENCY, help="Concurrent LLM calls")
+    parser.add_argument("--requests-per-minute", type=float, default=0, help="LLM request budget (0: unlimited)")
+    args = parser.parse_args()
+
+    validation_results = validate_environment_variables()
+    if not all(validation_results.values()):
+        print_validation_results(validation_results)
+        sys.exit(1)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+    questions = read_questions(args.input, args.question_field)
+    print(f"Loaded {len(questions)} questions from {args.input}")
+
+    warm_up_embeddings()
+    start = time.perf_counter()
+    counts = asyncio.run(answer_questions(
+        questions, output,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        requests_per_minute=args.requests_per_minute
+    ))
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s: {counts['answered']} answered, {counts['cached']} from cache, "
+          f"{counts['skipped']} already done, {counts['errors']} errors. Answers in {output}")
+
+
+if __name__ == "__main__":
+    main()
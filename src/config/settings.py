@@ -3,9 +3,23 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Vector Store Configuration ("pinecone" or "local")
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+
 # Pinecone Configuration
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = "constitution-index"
+# Set to the index's data-plane host (or a local stub server) to skip index discovery
+PINECONE_INDEX_HOST = os.getenv("PINECONE_INDEX_HOST")
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "4"))
+PINECONE_CONNECTION_POOL_MAXSIZE = int(os.getenv("PINECONE_CONNECTION_POOL_MAXSIZE", "16"))
+PINECONE_TIMEOUT = float(os.getenv("PINECONE_TIMEOUT", "10"))
+# Bulk upserts: vectors per request (also capped to stay under the 2 MB request limit),
+# concurrent requests, and retries of a failed request
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_MAX_REQUEST_BYTES = int(os.getenv("UPSERT_MAX_REQUEST_BYTES", "1800000"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "3"))
 
 # GitHub Model Configuration
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -13,12 +27,118 @@ GITHUB_MODEL_ENDPOINT = os.getenv("GITHUB_MODEL_ENDPOINT")
 
 # HuggingFace Configuration
 HUGGINGFACE_MODEL_NAME = os.getenv("HUGGINGFACE_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")
+EMBEDDING_NORMALIZE = os.getenv("EMBEDDING_NORMALIZE", "true").lower() == "true"
+# Inference runtime: "huggingface" (PyTorch) or "onnx" (ONNX Runtime, optionally int8-quantized)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true"
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))  # 0 = runtime default
+EMBEDDING_DOCUMENT_BATCH_SIZE = int(os.getenv("EMBEDDING_DOCUMENT_BATCH_SIZE", "32"))
+# Coalesce concurrent query embeddings into one batched forward pass
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# Local caches
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "10000"))
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(CACHE_DIR, "local_index"))
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")  # float32, float16 or int8
+# "exact" scans every vector; "ivfpq" is the approximate index for large corpora
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "exact")
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", os.path.join(CACHE_DIR, "ann_index"))
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))  # coarse lists; 0 picks ~4 * sqrt(vectors)
+ANN_PQ_SUBVECTORS = int(os.getenv("ANN_PQ_SUBVECTORS", "48"))  # bytes per compressed vector
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))  # lists scanned per query: higher is slower, better recall
+ANN_REFINE_FACTOR = int(os.getenv("ANN_REFINE_FACTOR", "4"))  # top_k * this re-scored exactly; 0 disables
+ANN_TRAIN_MIN_VECTORS = int(os.getenv("ANN_TRAIN_MIN_VECTORS", "20000"))  # searched exactly below this
+ANN_RETRAIN_GROWTH = float(os.getenv("ANN_RETRAIN_GROWTH", "4"))  # retrain after growing this many times
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(CACHE_DIR, "onnx"))
+# Chunk text is served from this local store by vector ID; vectors only carry small metadata
+CHUNK_STORE_ENABLED = os.getenv("CHUNK_STORE_ENABLED", "true").lower() == "true"
+CHUNK_STORE_DIR = os.getenv("CHUNK_STORE_DIR", os.path.join(CACHE_DIR, "chunk_store"))
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", os.path.join(CACHE_DIR, "ingestion_manifest.json"))
 
 
 EMBEDDING_DIMENSION=384
 # Text Processing
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+# "structure" splits along Parts/Articles/Schedules, "recursive" is the plain character splitter
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structure").lower()
+ARTICLE_INDEX_PATH = os.getenv("ARTICLE_INDEX_PATH", os.path.join(CACHE_DIR, "article_index.json"))
 
 # Retrieval
 TOP_K_RESULTS = 5
+# Questions naming an Article/Schedule are answered from these chunks without vector search
+ARTICLE_LOOKUP_MAX_CHUNKS = int(os.getenv("ARTICLE_LOOKUP_MAX_CHUNKS", "8"))
+# "hybrid" fuses BM25 and vector results, "vector" or "lexical" use one retriever only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join(CACHE_DIR, "lexical_index"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # per retriever, before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Hybrid retrieval answers from BM25 alone if vector search fails or takes longer than this
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("VECTOR_SEARCH_TIMEOUT", "2"))
+# Optional cross-encoder second stage: re-rank RERANK_CANDIDATES retrieved chunks and keep the
+# best RERANK_TOP_K; retrieval order is kept if scoring takes longer than RERANK_TIMEOUT_MS
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_TIMEOUT_MS = float(os.getenv("RERANK_TIMEOUT_MS", "500"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))  # (query, chunk) scores kept in memory
+# Token budget for retrieved context (0 uses the per-model default)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))
+
+# Conversation mode: recent turns are resent verbatim up to CONVERSATION_HISTORY_TOKENS; older
+# turns are folded into a short summary, and their context chunks into a pinned block
+CONVERSATION_HISTORY_TOKENS = int(os.getenv("CONVERSATION_HISTORY_TOKENS", "3000"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "600"))
+CONVERSATION_PINNED_TOKENS = int(os.getenv("CONVERSATION_PINNED_TOKENS", "1500"))
+CONVERSATION_DIR = os.getenv("CONVERSATION_DIR", os.path.join(CACHE_DIR, "conversations"))
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", str(24 * 3600)))
+
+# Semantic answer cache
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_DIR = os.getenv("ANSWER_CACHE_DIR", os.path.join(CACHE_DIR, "answers"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+# Async pipeline
+ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", "16"))
+ASYNC_MAX_PENDING = int(os.getenv("ASYNC_MAX_PENDING", "64"))
+ASYNC_EXECUTOR_WORKERS = int(os.getenv("ASYNC_EXECUTOR_WORKERS", "4"))
+
+# HTTP API (src/server.py)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "2"))  # forked processes sharing the loaded model
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "8"))  # questions answered at once per worker
+SERVER_MAX_PENDING = int(os.getenv("SERVER_MAX_PENDING", "32"))  # queued per worker before answering 503
+SERVER_MAX_QUESTION_CHARS = int(os.getenv("SERVER_MAX_QUESTION_CHARS", "2000"))
+
+# Observability
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")  # JSON-lines trace log, disabled when empty
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Prometheus /metrics endpoint, disabled when 0
+
+# LLM client resilience
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds to wait for (each chunk of) the response
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+# Send a second identical request if the first has not answered after this many seconds (0 disables)
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # 0 disables the circuit breaker
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
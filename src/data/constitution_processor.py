@@ -1,9 +1,18 @@
 import os
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+from typing import List, Iterator, Iterable, Tuple
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 import PyPDF2
 from pathlib import Path
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import PDF_EXTRACTION_WORKERS, PDF_PAGES_PER_TASK, CHUNKING_STRATEGY
+from data.structure_chunker import iter_structured_chunks
+
+DEFAULT_SOURCE = "Constitution of India"
 
 def load_constitution_text(file_path: str) -> str:
     """Load the constitution text from file (supports both TXT and PDF)"""
@@ -24,16 +33,9 @@ def load_constitution_text(file_path: str) -> str:
 
 def load_pdf_text(file_path: str) -> str:
     """Load text from PDF file"""
-    text = ""
     try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from all pages
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-        
+        text = "".join(page_text + "\n" for _, page_text in iter_pdf_pages(file_path))
+
         if not text.strip():
             raise Exception("No text could be extracted from the PDF file")
             
@@ -41,6 +43,47 @@ def load_pdf_text(file_path: str) -> str:
     except Exception as e:
         raise Exception(f"Error reading PDF file: {str(e)}")
 
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extract text for pages [start, end) in a worker process"""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [(page_num + 1, pdf_reader.pages[page_num].extract_text() or "") for page_num in range(start, end)]
+
+def iter_pdf_pages(file_path: str, workers: int = PDF_EXTRACTION_WORKERS,
+                   pages_per_task: int = PDF_PAGES_PER_TASK) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) for each PDF page in order, extracting in a process pool"""
+    with open(file_path, 'rb') as file:
+        page_count = len(PyPDF2.PdfReader(file).pages)
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield from _extract_page_range(file_path, start, end)
+        return
+
+    # Keep only a bounded window of page ranges in flight so memory stays flat
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        remaining = iter(ranges)
+        for start, end in islice(remaining, workers * 2):
+            pending.append(executor.submit(_extract_page_range, file_path, start, end))
+        while pending:
+            pages = pending.popleft().result()
+            for start, end in islice(remaining, 1):
+                pending.append(executor.submit(_extract_page_range, file_path, start, end))
+            yield from pages
+
+def iter_document_pages(file_path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) for a PDF or TXT file (form feeds split TXT pages)"""
+    file_extension = Path(file_path).suffix.lower()
+    if file_extension == '.pdf':
+        yield from iter_pdf_pages(file_path)
+    elif file_extension == '.txt':
+        for page_num, page_text in enumerate(load_txt_text(file_path).split('\x0c'), 1):
+            yield page_num, page_text
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}. Only PDF and TXT files are supported.")
+
 def load_txt_text(file_path: str) -> str:
     """Load text from TXT file"""
     with open(file_path, 'r', encoding='utf-8') as file:
@@ -64,37 +107,95 @@ def preprocess_text(text: str) -> str:
 
 def split_into_chunks(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
     """Split text into chunks and create Document objects"""
+    return list(iter_chunks_from_pages([(1, text)], chunk_size, chunk_overlap))
+
+def _page_at(page_marks: List[Tuple[int, int]], offset: int) -> int:
+    """Page number containing a character offset of the chunking buffer"""
+    page = page_marks[0][1]
+    for mark_offset, mark_page in page_marks:
+        if mark_offset > offset:
+            break
+        page = mark_page
+    return page
+
+def iter_chunks_from_pages(pages: Iterable[Tuple[int, str]], chunk_size: int = 1000, chunk_overlap: int = 200,
+                           source: str = DEFAULT_SOURCE) -> Iterator[Document]:
+    """Chunk a stream of pages incrementally, recording the pages each chunk spans"""
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]
+        separators=["\n\n", "\n", ". ", " ", ""],
+        add_start_index=True
     )
-    
-    preprocessed_text = preprocess_text(text)
-    
-    # Split text into chunks
-    chunks = text_splitter.split_text(preprocessed_text)
-    
-    # Create Document objects with metadata
-    documents = []
-    for i, chunk in enumerate(chunks):
-        doc = Document(
-            page_content=chunk,
-            metadata={
-                "source": "Constitution of India",
-                "chunk_id": i,
-                "chunk_size": len(chunk)
-            }
-        )
-        documents.append(doc)
-    
-    return documents
+    # Split once the buffer holds several chunks; the last chunk is carried over
+    flush_length = chunk_size * 8
+
+    buffer = ""
+    page_marks: List[Tuple[int, int]] = []  # (buffer offset, page number)
+    chunk_id = 0
+
+    def split_buffer(final: bool):
+        nonlocal buffer, page_marks, chunk_id
+        pieces = text_splitter.create_documents([buffer])
+        emit = pieces if final else pieces[:-1]
+        for piece in emit:
+            start = piece.metadata["start_index"]
+            end = start + len(piece.page_content) - 1
+            yield Document(
+                page_content=piece.page_content,
+                metadata={
+                    "source": source,
+                    "chunk_id": chunk_id,
+                    "chunk_size": len(piece.page_content),
+                    "page_start": _page_at(page_marks, start),
+                    "page_end": _page_at(page_marks, end)
+                }
+            )
+            chunk_id += 1
+        if not final and len(pieces) > 1:
+            carry_from = pieces[-1].metadata["start_index"]
+            buffer = buffer[carry_from:]
+            carried_page = _page_at(page_marks, carry_from)
+            page_marks = [(0, carried_page)] + [
+                (offset - carry_from, page) for offset, page in page_marks if offset > carry_from
+            ]
+
+    for page_num, page_text in pages:
+        page_text = preprocess_text(page_text)
+        if not page_text:
+            continue
+        if buffer:
+            buffer += " "
+        page_marks.append((len(buffer), page_num))
+        buffer += page_text
+        if len(buffer) >= flush_length:
+            yield from split_buffer(final=False)
+
+    if buffer.strip():
+        yield from split_buffer(final=True)
+
+def iter_document_chunks(file_path: str, chunk_size: int = 1000, chunk_overlap: int = 200,
+                         source: str = DEFAULT_SOURCE, strategy: str = CHUNKING_STRATEGY) -> Iterator[Document]:
+    """Stream chunks from a document as its pages are extracted"""
+    if strategy == "structure":
+        return iter_structured_chunks(iter_document_pages(file_path), chunk_size, chunk_overlap, source)
+    if strategy == "recursive":
+        return iter_chunks_from_pages(iter_document_pages(file_path), chunk_size, chunk_overlap, source)
+    raise ValueError(f"Unknown chunking strategy: {strategy}. Use 'structure' or 'recursive'.")
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most batch_size items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
 
 def process_constitution(file_path: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
     """Main function to process the constitution document"""
-    text = load_constitution_text(file_path)
-    documents = split_into_chunks(text, chunk_size, chunk_overlap)
+    documents = list(iter_document_chunks(file_path, chunk_size, chunk_overlap))
     
     print(f"Processed constitution into {len(documents)} chunks")
     return documents
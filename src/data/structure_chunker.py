@@ -0,0 +1,136 @@
+import re
+from typing import List, Dict, Any, Iterator, Iterable, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+
+# Headings as they appear at the start of a line in the Constitution text
+PART_PATTERN = re.compile(r"^PART\s+([IVXL]+[A-Z]?)\b")
+SCHEDULE_PATTERN = re.compile(
+    r"^(FIRST|SECOND|THIRD|FOURTH|FIFTH|SIXTH|SEVENTH|EIGHTH|NINTH|TENTH|ELEVENTH|TWELFTH)\s+SCHEDULE\b",
+    re.IGNORECASE
+)
+# "21. Protection of life and personal liberty.—No person ..." (optionally "1[21A. ..." after amendments).
+# Only an em dash ends the title: amendment footnotes ("3. Ins. by the Constitution (Forty-second
+# Amendment) Act, 1976 ...") also start with a number and contain hyphens
+ARTICLE_PATTERN = re.compile(r"^(?:\d+\[)?(\d{1,3}[A-Z]{0,3})\.\s+([A-Z][^—]{2,200}?)\s*\.?\s*—{1,2}\s*")
+CLAUSE_PATTERN = re.compile(r"(?:^|[\s—])\((\d{1,2}[A-Z]?)\)\s")
+
+# Articles jump forward by small steps; larger jumps are page numbers or list items
+MAX_ARTICLE_STEP = 30
+
+
+def _article_number(article: str) -> int:
+    return int(re.match(r"\d+", article).group())
+
+
+def clean_line(line: str) -> str:
+    """Normalize whitespace within a line, keeping line structure intact"""
+    return ' '.join(line.replace('\xa0', ' ').replace('\x0c', ' ').split())
+
+
+class _Segment:
+    def __init__(self, part: Optional[str], article: Optional[str], article_title: Optional[str],
+                 schedule: Optional[str], page: int):
+        self.part = part
+        self.article = article
+        self.article_title = article_title
+        self.schedule = schedule
+        self.page_start = page
+        self.page_end = page
+        self.lines: List[str] = []
+
+    def heading(self) -> str:
+        parts = []
+        if self.schedule:
+            parts.append(f"{self.schedule.title()} Schedule")
+        elif self.part:
+            parts.append(f"Part {self.part}")
+        if self.article:
+            parts.append(f"Article {self.article}" + (f". {self.article_title}" if self.article_title else ""))
+        return " — ".join(parts)
+
+
+def iter_segments(pages: Iterable[Tuple[int, str]]) -> Iterator[_Segment]:
+    """Split a page stream into Part/Article/Schedule segments"""
+    part = None
+    schedule = None
+    last_article = 0
+    segment = _Segment(None, None, None, None, 1)
+
+    for page_num, page_text in pages:
+        for raw_line in page_text.splitlines():
+            line = clean_line(raw_line)
+            if not line:
+                continue
+
+            new_segment = None
+            part_match = PART_PATTERN.match(line)
+            schedule_match = SCHEDULE_PATTERN.match(line)
+            article_match = None if schedule else ARTICLE_PATTERN.match(line)
+
+            if part_match:
+                part = part_match.group(1)
+                new_segment = _Segment(part, None, None, schedule, page_num)
+            elif schedule_match:
+                schedule = schedule_match.group(1).upper()
+                new_segment = _Segment(part, None, None, schedule, page_num)
+            elif article_match:
+                number = _article_number(article_match.group(1))
+                if last_article <= number <= last_article + MAX_ARTICLE_STEP:
+                    last_article = number
+                    new_segment = _Segment(part, article_match.group(1), article_match.group(2).strip(" ."),
+                                           schedule, page_num)
+
+            if new_segment is not None:
+                if segment.lines:
+                    yield segment
+                segment = new_segment
+            segment.lines.append(line)
+            segment.page_end = page_num
+
+    if segment.lines:
+        yield segment
+
+
+def iter_structured_chunks(pages: Iterable[Tuple[int, str]], chunk_size: int = 1000, chunk_overlap: int = 200,
+                           source: str = "Constitution of India") -> Iterator[Document]:
+    """Chunk the Constitution along Part/Article/Schedule boundaries
+
+    Each chunk stays within one Article (or Schedule section), is prefixed with
+    its heading, and carries part/article/schedule/clause metadata.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    chunk_id = 0
+    for segment in iter_segments(pages):
+        heading = segment.heading()
+        text = "\n".join(segment.lines)
+        pieces = [text] if len(text) <= chunk_size else text_splitter.split_text(text)
+
+        for piece in pieces:
+            # The heading keeps split Articles attributable and helps retrieval
+            needs_heading = heading and (segment.article or not piece.startswith(segment.lines[0]))
+            content = f"{heading}\n{piece}" if needs_heading else piece
+            metadata: Dict[str, Any] = {
+                "source": source,
+                "chunk_id": chunk_id,
+                "chunk_size": len(content),
+                "page_start": segment.page_start,
+                "page_end": segment.page_end,
+            }
+            if segment.part:
+                metadata["part"] = segment.part
+            if segment.article:
+                metadata["article"] = segment.article
+                metadata["article_title"] = segment.article_title
+            if segment.schedule:
+                metadata["schedule"] = segment.schedule
+            clauses = CLAUSE_PATTERN.findall(piece)
+            if clauses:
+                metadata["clauses"] = ",".join(dict.fromkeys(clauses))
+            yield Document(page_content=content, metadata=metadata)
+            chunk_id += 1
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing so whitespace differences share a cache entry"""
+    return ' '.join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Content-addressed cache key for a text embedded by a given model"""
+    payload = f"{model_name}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache backed by a memory-mapped float32 matrix.
+
+    Vectors live in ``vectors.f32`` (one row per entry). ``index.json`` is a
+    snapshot mapping keys to rows and ``index.log`` journals later writes, so a
+    put appends a line instead of rewriting the whole index. When
+    ``max_entries`` is set, the least recently used entries are evicted and
+    their rows reused.
+    """
+
+    def __init__(self, directory: str, max_entries: Optional[int] = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.json")
+        self.journal_path = os.path.join(directory, "index.log")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._free_rows: List[int] = []
+        self._dimension: Optional[int] = None
+        self._capacity = 0
+        self._size = 0
+        self._matrix: Optional[np.memmap] = None
+        self._journal_lines = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path) or not os.path.exists(self.vectors_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self._dimension = index["dimension"]
+            self._capacity = index["capacity"]
+            self._size = index["size"]
+            self._rows = OrderedDict((key, row) for key, row in index["rows"])
+            self._free_rows = list(index.get("free_rows", []))
+            self._replay_journal()
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r+",
+                shape=(self._capacity, self._dimension)
+            )
+        except Exception as e:
+            # A corrupt cache is only a performance problem; start over
+            print(f"Ignoring unreadable embedding cache at {self.directory}: {str(e)}")
+            self._rows = OrderedDict()
+            self._free_rows = []
+            self._dimension = None
+            self._capacity = 0
+            self._size = 0
+            self._matrix = None
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        owners = {row: key for key, row in self._rows.items()}
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue  # torn write from a crash
+                key, row = parts[0], int(parts[1])
+                if row >= self._capacity:
+                    continue
+                previous = owners.get(row)
+                if previous is not None and previous != key:
+                    # The row was reused after an eviction
+                    self._rows.pop(previous, None)
+                owners[row] = key
+                self._rows[key] = row
+                self._rows.move_to_end(key)
+                self._size = max(self._size, row + 1)
+                self._journal_lines += 1
+
+    def _append_journal(self, entries: List[str]):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(entries))
+        self._journal_lines += len(entries)
+        # Fold the journal into a fresh snapshot once it outgrows the index
+        if self._journal_lines > max(1024, len(self._rows)):
+            self._save_index()
+
+    def _save_index(self):
+        index = {
+            "dimension": self._dimension,
+            "capacity": self._capacity,
+            "size": self._size,
+            "rows": list(self._rows.items()),
+            "free_rows": self._free_rows,
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_lines = 0
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._capacity:
+            return
+        new_capacity = max(needed, self._capacity * 2, 1024)
+        if self.max_entries:
+            new_capacity = min(new_capacity, max(self.max_entries, needed))
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self._dimension * 4)
+        self._capacity = new_capacity
+        self._matrix = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r+",
+            shape=(self._capacity, self._dimension)
+        )
+
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self.max_entries and len(self._rows) >= self.max_entries:
+            _, row = self._rows.popitem(last=False)
+            self.evictions += 1
+            return row
+        self._ensure_capacity(self._size + 1)
+        row = self._size
+        self._size += 1
+        return row
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return cached vectors for keys, or None for each miss"""
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for key in keys:
+                row = self._rows.get(key)
+                if row is None or self._matrix is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                self._rows.move_to_end(key)
+                results.append(np.array(self._matrix[row]))
+        return results
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors for keys and persist the index"""
+        if not keys:
+            return
+        with self._lock:
+            first_write = self._dimension is None
+            if first_write:
+                self._dimension = len(vectors[0])
+            capacity = self._capacity
+            entries = []
+            for key, vector in zip(keys, vectors):
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._allocate_row()
+                self._matrix[row] = np.asarray(vector, dtype=np.float32)
+                self._rows[key] = row
+                self._rows.move_to_end(key)
+                entries.append(f"{key} {row}\n")
+            self._matrix.flush()
+            # The snapshot records dimension and capacity, so rewrite it when they change
+            if first_write or capacity != self._capacity:
+                self._save_index()
+            else:
+                self._append_journal(entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "entries": len(self._rows),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,33 +1,292 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from typing import List
+from typing import List, Dict, Any, Tuple
+import threading
+import time
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import HUGGINGFACE_MODEL_NAME
+from config.settings import (
+    HUGGINGFACE_MODEL_NAME, EMBEDDING_DEVICE, EMBEDDING_NORMALIZE, EMBEDDING_BACKEND, EMBEDDING_ONNX_QUANTIZE,
+    EMBEDDING_THREADS, EMBEDDING_DOCUMENT_BATCH_SIZE,
+    CACHE_DIR, EMBEDDING_CACHE_ENABLED, EMBEDDING_QUERY_CACHE_SIZE,
+    EMBEDDING_BATCHING_ENABLED, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS
+)
+from embeddings.embedding_cache import EmbeddingCache, cache_key
+from embeddings.query_batcher import QueryEmbeddingBatcher
 
-def initialize_embeddings():
-    """Initialize HuggingFace embeddings model"""
+EMBEDDING_BACKENDS = ("huggingface", "onnx")
+
+# Process-wide model registry, shared by every caller and Streamlit session
+_models: Dict[Tuple[str, str, bool, str], Any] = {}
+_models_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Any] = {
+    "load_count": 0,
+    "load_seconds": {},
+    "document_calls": 0,
+    "document_texts": 0,
+    "document_seconds": 0.0,
+    "query_calls": 0,
+    "query_texts": 0,
+    "query_seconds": 0.0,
+}
+
+
+def embedding_runtime(backend: str = None, quantize: bool = None) -> str:
+    """Runtime that produces the vectors: huggingface, onnx or onnx-int8"""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Use one of {', '.join(EMBEDDING_BACKENDS)}")
+    quantize = EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+    return "onnx-int8" if backend == "onnx" and quantize else backend
+
+
+def _model_key(model_name: str = None, device: str = None, normalize: bool = None,
+               runtime: str = None) -> Tuple[str, str, bool, str]:
+    """Build the registry key for an embedding model configuration"""
+    return (
+        model_name or HUGGINGFACE_MODEL_NAME,
+        device or EMBEDDING_DEVICE,
+        EMBEDDING_NORMALIZE if normalize is None else normalize,
+        runtime or embedding_runtime(),
+    )
+
+
+def initialize_embeddings(model_name: str = None, device: str = None, normalize: bool = None,
+                          runtime: str = None):
+    """Initialize the embeddings model on the configured runtime"""
+    model_name, device, normalize, runtime = _model_key(model_name, device, normalize, runtime)
+    if runtime.startswith("onnx"):
+        from embeddings.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            model_name, device=device, normalize=normalize, quantize=runtime == "onnx-int8",
+            threads=EMBEDDING_THREADS, batch_size=EMBEDDING_DOCUMENT_BATCH_SIZE
+        )
+
+    # Deferred: importing langchain_huggingface pulls in torch and transformers
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    if EMBEDDING_THREADS:
+        import torch
+        torch.set_num_threads(EMBEDDING_THREADS)
+    # sentence-transformers already sorts each call's texts by length before batching
     embeddings = HuggingFaceEmbeddings(
-        model_name=HUGGINGFACE_MODEL_NAME,
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
+        model_name=model_name,
+        model_kwargs={'device': device},
+        encode_kwargs={'normalize_embeddings': normalize, 'batch_size': EMBEDDING_DOCUMENT_BATCH_SIZE}
     )
     return embeddings
 
+
+def get_embeddings(model_name: str = None, device: str = None, normalize: bool = None, runtime: str = None):
+    """Return the shared embeddings model, loading it once per process"""
+    key = _model_key(model_name, device, normalize, runtime)
+    embeddings = _models.get(key)
+    if embeddings is not None:
+        return embeddings
+
+    with _models_lock:
+        # Another thread may have finished loading while we waited
+        embeddings = _models.get(key)
+        if embeddings is None:
+            start = time.perf_counter()
+            embeddings = initialize_embeddings(*key)
+            elapsed = time.perf_counter() - start
+            _models[key] = embeddings
+            with _metrics_lock:
+                _metrics["load_count"] += 1
+                _metrics["load_seconds"]["/".join(str(part) for part in key)] = elapsed
+            print(f"Loaded embedding model {key[0]} on {key[1]} ({key[3]}) in {elapsed:.2f}s")
+    return embeddings
+
+
+def warm_up_embeddings(model_name: str = None, device: str = None, normalize: bool = None,
+                       runtime: str = None) -> None:
+    """Load the embeddings model and run one encode so the first query is fast"""
+    embeddings = get_embeddings(model_name, device, normalize, runtime)
+    embeddings.embed_query("warm up")
+
+
+def get_embedding_metrics() -> Dict[str, Any]:
+    """Return model load and encode timing metrics"""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+        metrics["load_seconds"] = dict(_metrics["load_seconds"])
+    metrics["loaded_models"] = ["/".join(str(part) for part in key) for key in list(_models)]
+    return metrics
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+# Directory name of the query cache under CACHE_DIR/embeddings
+_query_cache_name = "queries"
+
+
+def use_process_query_cache(name: str) -> None:
+    """Give this process its own query embedding cache
+
+    The cache files have a single writer, so each server worker process keeps
+    its queries in a directory of its own. Call before the first query.
+    """
+    global _query_cache_name
+    _query_cache_name = f"queries-{name}"
+    with _caches_lock:
+        _caches.pop("queries", None)
+
+
+def get_embedding_cache(kind: str) -> EmbeddingCache:
+    """Return the on-disk cache for "documents" or "queries", opening it once"""
+    cache = _caches.get(kind)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(kind)
+            if cache is None:
+                max_entries = EMBEDDING_QUERY_CACHE_SIZE if kind == "queries" else None
+                directory = _query_cache_name if kind == "queries" else kind
+                cache = EmbeddingCache(os.path.join(CACHE_DIR, "embeddings", directory), max_entries)
+                _caches[kind] = cache
+    return cache
+
+
+def get_embedding_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Return hit/miss counters for the embedding caches opened so far"""
+    return {kind: cache.stats() for kind, cache in list(_caches.items())}
+
+
+def _cache_prefix() -> str:
+    # Runtime is only part of the prefix for ONNX, so PyTorch caches from before it existed stay valid
+    *key, runtime = _model_key()
+    if runtime != "huggingface":
+        key.append(runtime)
+    return "/".join(str(part) for part in key)
+
+
+def _record_encode(kind: str, count: int, elapsed: float) -> None:
+    with _metrics_lock:
+        _metrics[f"{kind}_calls"] += 1
+        _metrics[f"{kind}_seconds"] += elapsed
+        _metrics[f"{kind}_texts"] += count
+
+
+def _encode_documents(texts: List[str]) -> List[List[float]]:
+    embeddings = get_embeddings()
+    start = time.perf_counter()
+    embeddings_list = embeddings.embed_documents(texts)
+    _record_encode("document", len(texts), time.perf_counter() - start)
+    return embeddings_list
+
+
+def _encode_query_batch(queries: List[str]) -> List[List[float]]:
+    embeddings = get_embeddings()
+    start = time.perf_counter()
+    # embed_query is embed_documents on a single text for these models
+    embedding_list = embeddings.embed_documents(queries)
+    _record_encode("query", len(queries), time.perf_counter() - start)
+    return embedding_list
+
+
+_query_batcher = None
+_query_batcher_lock = threading.Lock()
+
+
+def get_query_batcher() -> QueryEmbeddingBatcher:
+    """Return the process-wide query embedding batcher"""
+    global _query_batcher
+    if _query_batcher is None:
+        with _query_batcher_lock:
+            if _query_batcher is None:
+                _query_batcher = QueryEmbeddingBatcher(
+                    _encode_query_batch, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS
+                )
+    return _query_batcher
+
+
+def _reset_after_fork():
+    # The batcher's worker thread does not survive fork; a child starts its own on first use
+    global _query_batcher, _query_batcher_lock, _models_lock
+    _query_batcher_lock = threading.Lock()
+    _query_batcher = None
+    # Neither do ONNX Runtime's session thread pools: each child opens its own session
+    # (the exported model files on disk are reused). PyTorch models stay shared.
+    _models_lock = threading.Lock()
+    for key in [key for key in _models if key[3].startswith("onnx")]:
+        del _models[key]
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_query_batching_metrics() -> Dict[str, Any]:
+    """Return batch size distribution and queueing latency of the query batcher"""
+    return _query_batcher.metrics() if _query_batcher is not None else {}
+
+
+def _encode_query(query: str) -> List[float]:
+    if EMBEDDING_BATCHING_ENABLED:
+        return get_query_batcher().embed(query)
+    return _encode_query_batch([query])[0]
+
+
 def embed_documents(texts: List[str]) -> List[List[float]]:
     """Generate embeddings for a list of documents"""
     try:
-        embeddings = initialize_embeddings()
-        embeddings_list = embeddings.embed_documents(texts)
-        return embeddings_list
+        if not EMBEDDING_CACHE_ENABLED:
+            return _encode_documents(texts)
+
+        cache = get_embedding_cache("documents")
+        prefix = _cache_prefix()
+        keys = [cache_key(prefix, text) for text in texts]
+        cached = cache.get_many(keys)
+
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            new_vectors = _encode_documents([texts[i] for i in missing])
+            cache.put_many([keys[i] for i in missing], new_vectors)
+            for i, vector in zip(missing, new_vectors):
+                cached[i] = vector
+
+        return [vector.tolist() if hasattr(vector, "tolist") else list(vector) for vector in cached]
     except Exception as e:
         raise Exception(f"Error generating embeddings: {str(e)}")
 
+
 def embed_query(query: str) -> List[float]:
     """Generate embedding for a single query"""
     try:
-        embeddings = initialize_embeddings()
-        embedding = embeddings.embed_query(query)
+        if not EMBEDDING_CACHE_ENABLED:
+            return _encode_query(query)
+
+        cache = get_embedding_cache("queries")
+        key = cache_key(_cache_prefix(), query)
+        cached = cache.get_many([key])[0]
+        if cached is not None:
+            return cached.tolist()
+
+        embedding = _encode_query(query)
+        cache.put_many([key], [embedding])
         return embedding
     except Exception as e:
         raise Exception(f"Error generating query embedding: {str(e)}")
+
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """Generate embeddings for many queries in batched forward passes"""
+    try:
+        if not EMBEDDING_CACHE_ENABLED:
+            return _encode_query_batch(queries) if queries else []
+
+        cache = get_embedding_cache("queries")
+        prefix = _cache_prefix()
+        keys = [cache_key(prefix, query) for query in queries]
+        cached = cache.get_many(keys)
+
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            new_vectors = _encode_query_batch([queries[i] for i in missing])
+            cache.put_many([keys[i] for i in missing], new_vectors)
+            for i, vector in zip(missing, new_vectors):
+                cached[i] = vector
+
+        return [vector.tolist() if hasattr(vector, "tolist") else list(vector) for vector in cached]
+    except Exception as e:
+        raise Exception(f"Error generating query embeddings: {str(e)}")
@@ -0,0 +1,220 @@
+import inspect
+import json
+import os
+from typing import List, Dict, Any, Optional
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import ONNX_MODEL_DIR
+
+# Sentences for the export-time parity check against the PyTorch model
+PARITY_SENTENCES = [
+    "What are the fundamental rights guaranteed by the Constitution?",
+    "Article 21. Protection of life and personal liberty. No person shall be deprived of his life "
+    "or personal liberty except according to procedure established by law.",
+    "The President shall be elected by the members of an electoral college.",
+    "Schedule VII",
+]
+# Lowest acceptable cosine similarity to the PyTorch embeddings
+MIN_PARITY_COSINE = 0.9999
+MIN_PARITY_COSINE_INT8 = 0.99
+
+
+def _model_files(model_name: str) -> str:
+    """Local directory with the model's tokenizer, weights and sentence-transformers config"""
+    if os.path.isdir(model_name):
+        return model_name
+    from huggingface_hub import snapshot_download
+    return snapshot_download(model_name)
+
+
+def _sentence_transformers_config(model_dir: str) -> Dict[str, Any]:
+    """Pooling, normalization and max length as the sentence-transformers pipeline would apply them"""
+    config = {"pooling": "mean", "normalize": False, "max_length": None}
+    modules_path = os.path.join(model_dir, "modules.json")
+    if not os.path.exists(modules_path):
+        return config
+
+    with open(modules_path, 'r', encoding='utf-8') as f:
+        modules = json.load(f)
+    for module in modules:
+        if module["type"].endswith("Pooling"):
+            with open(os.path.join(model_dir, module["path"], "config.json"), 'r', encoding='utf-8') as f:
+                pooling = json.load(f)
+            if pooling.get("pooling_mode_cls_token"):
+                config["pooling"] = "cls"
+            elif pooling.get("pooling_mode_max_tokens"):
+                config["pooling"] = "max"
+        elif module["type"].endswith("Normalize"):
+            config["normalize"] = True
+
+    bert_config_path = os.path.join(model_dir, "sentence_bert_config.json")
+    if os.path.exists(bert_config_path):
+        with open(bert_config_path, 'r', encoding='utf-8') as f:
+            config["max_length"] = json.load(f).get("max_seq_length")
+    return config
+
+
+def pool(hidden: np.ndarray, attention_mask: np.ndarray, mode: str = "mean") -> np.ndarray:
+    """Token embeddings (batch, sequence, dim) to sentence embeddings, ignoring padding"""
+    if mode == "cls":
+        return hidden[:, 0]
+    mask = attention_mask[:, :, None].astype(hidden.dtype)
+    if mode == "max":
+        return np.where(mask > 0, hidden, -1e9).max(axis=1)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def min_cosine(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Lowest row-wise cosine similarity between two embedding matrices"""
+    return float((l2_normalize(expected) * l2_normalize(actual)).sum(axis=1).min())
+
+
+def _export_onnx(model_dir: str, tokenizer, output_path: str) -> None:
+    """Export the transformer to ONNX with dynamic batch and sequence axes"""
+    import torch
+    from transformers import AutoModel
+
+    model = AutoModel.from_pretrained(model_dir)
+    model.eval()
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(*inputs)[0]
+
+    sample = tokenizer(PARITY_SENTENCES[:2], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    temp_path = output_path + ".tmp"
+    # Newer torch defaults to the dynamo exporter, which needs onnxscript; keep the TorchScript one
+    export_options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(model), tuple(sample[name] for name in input_names), temp_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=14, **export_options
+        )
+    os.replace(temp_path, output_path)
+
+
+def _quantize_onnx(input_path: str, output_path: str) -> None:
+    """Dynamic int8 quantization of the weights; activations stay float"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    temp_path = output_path + ".tmp"
+    quantize_dynamic(input_path, temp_path, weight_type=QuantType.QInt8)
+    os.replace(temp_path, output_path)
+
+
+def _reference_embeddings(model_dir: str, tokenizer, config: Dict[str, Any], texts: List[str]) -> np.ndarray:
+    """PyTorch embeddings with the same tokenization and pooling, for the parity check"""
+    import torch
+    from transformers import AutoModel
+
+    model = AutoModel.from_pretrained(model_dir)
+    model.eval()
+    encoded = tokenizer(texts, padding=True, truncation=True, max_length=config["max_length"], return_tensors="pt")
+    with torch.no_grad():
+        hidden = model(**encoded)[0].numpy()
+    return pool(hidden, encoded["attention_mask"].numpy(), config["pooling"])
+
+
+class OnnxEmbeddings:
+    """Sentence-transformers model run with ONNX Runtime
+
+    Drop-in for HuggingFaceEmbeddings (embed_documents / embed_query). The
+    model is exported (and optionally int8-quantized) once into ONNX_MODEL_DIR,
+    checked against the PyTorch output, and reused from there afterwards.
+    embed_documents sorts texts by length and pads each batch only to its
+    longest text.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", normalize: bool = True, quantize: bool = False,
+                 threads: int = 0, batch_size: int = 32, export_dir: str = ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = _model_files(model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = _sentence_transformers_config(model_dir)
+        self.pooling = config["pooling"]
+        self.normalize = normalize or config["normalize"]
+        self.max_length = config["max_length"] or min(self.tokenizer.model_max_length, 512)
+        config["max_length"] = self.max_length
+        self.batch_size = batch_size
+
+        model_export_dir = os.path.join(export_dir, model_name.strip("/").replace("/", "--"))
+        os.makedirs(model_export_dir, exist_ok=True)
+        self.model_path = os.path.join(model_export_dir, "model-int8.onnx" if quantize else "model.onnx")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        # Callers already run encodes from several threads; one op at a time per call
+        options.inter_op_num_threads = 1
+        self._session_options = options
+        self._providers = ["CUDAExecutionProvider", "CPUExecutionProvider"] if device.startswith("cuda") \
+            else ["CPUExecutionProvider"]
+
+        if not os.path.exists(self.model_path):
+            fp32_path = os.path.join(model_export_dir, "model.onnx")
+            if not os.path.exists(fp32_path):
+                print(f"Exporting {model_name} to ONNX at {fp32_path}")
+                _export_onnx(model_dir, self.tokenizer, fp32_path)
+            if quantize:
+                print(f"Quantizing {fp32_path} to int8")
+                _quantize_onnx(fp32_path, self.model_path)
+            self._load_session()
+            # Only newly written models are checked; a failed check removes the file
+            self.check_parity(_reference_embeddings(model_dir, self.tokenizer, config, PARITY_SENTENCES),
+                              MIN_PARITY_COSINE_INT8 if quantize else MIN_PARITY_COSINE)
+        else:
+            self._load_session()
+
+    def _load_session(self):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(self.model_path, self._session_options, providers=self._providers)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def check_parity(self, reference: np.ndarray, min_cosine_similarity: float) -> float:
+        """Compare PARITY_SENTENCES embeddings with reference (unnormalized) PyTorch embeddings"""
+        similarity = min_cosine(reference, self._encode_batch(PARITY_SENTENCES, normalize=False))
+        if similarity < min_cosine_similarity:
+            os.remove(self.model_path)
+            raise RuntimeError(f"ONNX model {self.model_path} does not match PyTorch: "
+                               f"min cosine {similarity:.6f} < {min_cosine_similarity}")
+        print(f"ONNX parity check passed for {self.model_path}: min cosine {similarity:.6f}")
+        return similarity
+
+    def _encode_batch(self, texts: List[str], normalize: Optional[bool] = None) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                 return_tensors="np")
+        feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feed)[0]
+        vectors = pool(hidden, encoded["attention_mask"], self.pooling)
+        if self.normalize if normalize is None else normalize:
+            vectors = l2_normalize(vectors)
+        return vectors.astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Longest first, so similar lengths share a batch and padding stays short
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        vectors: List[Any] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
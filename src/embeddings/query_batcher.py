@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List
+
+
+class QueryEmbeddingBatcher:
+    """Coalesces concurrent single-query embedding calls into batched encodes.
+
+    The worker thread takes the first waiting query, then keeps collecting
+    until ``max_batch_size`` queries are queued or ``max_wait_ms`` has passed
+    since that first query arrived, and encodes them in one forward pass.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._queue_waits = deque(maxlen=10000)
+        self._encode_seconds = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a query for embedding, returning a future for its vector"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        """Embed a query, blocking until its batch has been encoded"""
+        return self.submit(text).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                vectors = self.encode_batch([text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            with self._metrics_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+                self._encode_seconds += finished - started
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch size distribution and the queueing latency added by coalescing"""
+        with self._metrics_lock:
+            waits = sorted(self._queue_waits)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            encode_seconds = self._encode_seconds
+        batches = sum(batch_sizes.values())
+        queries = sum(size * count for size, count in batch_sizes.items())
+
+        def wait_ms(pct: float) -> float:
+            return waits[min(len(waits) - 1, int(pct / 100.0 * len(waits)))] * 1000 if waits else 0.0
+
+        return {
+            "batches": batches,
+            "queries": queries,
+            "mean_batch_size": queries / batches if batches else 0.0,
+            "batch_size_histogram": batch_sizes,
+            "queue_wait_ms_p50": wait_ms(50),
+            "queue_wait_ms_p95": wait_ms(95),
+            "queue_wait_ms_max": waits[-1] * 1000 if waits else 0.0,
+            "encode_seconds": encode_seconds,
+        }
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+from typing import List, Dict, Any, TYPE_CHECKING
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    HUGGINGFACE_MODEL_NAME, INGESTION_MANIFEST_PATH, INGEST_BATCH_SIZE, CHUNKING_STRATEGY, ARTICLE_INDEX_PATH,
+    LEXICAL_INDEX_DIR, CHUNK_STORE_ENABLED
+)
+from vector_store.vector_store import store_document_batches, delete_documents, index_identity, check_health
+from vector_store.records import document_metadata
+from vector_store.chunk_store import ChunkStore, chunk_store_exists
+from embeddings.embedding_service import embedding_runtime
+from retrieval.article_index import index_keys, save_article_index
+from retrieval.lexical_index import BM25Index
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+MANIFEST_VERSION = 2  # bump when chunk metadata changes, forcing a full re-upsert
+
+
+def file_sha256(file_path: str) -> str:
+    """Hash a file's contents without loading it all into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    """Hash a chunk's text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def assign_chunk_ids(documents: List["Document"], seen: Dict[str, int] = None) -> List[str]:
+    """Derive stable, content-addressed vector IDs for chunks
+
+    Pass the same ``seen`` dict across batches of one document so repeated
+    chunks get unique IDs.
+    """
+    ids = []
+    seen = {} if seen is None else seen
+    for doc in documents:
+        base_id = f"chunk_{content_hash(doc.page_content)[:24]}"
+        # Identical chunks get a suffix so each keeps its own vector
+        count = seen.get(base_id, 0)
+        seen[base_id] = count + 1
+        ids.append(base_id if count == 0 else f"{base_id}_{count}")
+    return ids
+
+
+def legacy_chunk_ids(vector_count: int) -> List[str]:
+    """Positional IDs (chunk_0, chunk_1, ...) that ingestion used before content-addressed IDs
+
+    They never collide with content-addressed IDs. An index holding
+    vector_count vectors can have at most that many of them.
+    """
+    return [f"chunk_{i}" for i in range(vector_count)]
+
+
+def load_manifest(manifest_path: str = INGESTION_MANIFEST_PATH) -> Dict[str, Any]:
+    """Load the ingestion manifest, or an empty one if none exists"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ignoring unreadable ingestion manifest: {str(e)}")
+    return {}
+
+
+def save_manifest(manifest: Dict[str, Any], manifest_path: str = INGESTION_MANIFEST_PATH):
+    """Atomically write the ingestion manifest"""
+    directory = os.path.dirname(manifest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+_corpus_versions: Dict[str, tuple] = {}
+
+
+def get_corpus_version(manifest_path: str = INGESTION_MANIFEST_PATH) -> str:
+    """Return an identifier for the currently ingested corpus ("" if none)"""
+    try:
+        mtime = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return ""
+    # Re-read the manifest only when it has been rewritten
+    cached = _corpus_versions.get(manifest_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, load_manifest(manifest_path).get("corpus_version", ""))
+        _corpus_versions[manifest_path] = cached
+    return cached[1]
+
+
+def _settings_fingerprint(chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    settings = {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "chunking_strategy": CHUNKING_STRATEGY,
+        "model_name": HUGGINGFACE_MODEL_NAME,
+        "index_name": index_identity(),
+        # With the chunk store on, remote vectors are upserted without their text
+        "chunk_store": CHUNK_STORE_ENABLED,
+    }
+    # Only recorded for ONNX, so manifests written before the choice existed still match
+    runtime = embedding_runtime()
+    if runtime != "huggingface":
+        settings["embedding_runtime"] = runtime
+    return settings
+
+
+def ingest_constitution(file_path: str, chunk_size: int = 1000, chunk_overlap: int = 200,
+                        manifest_path: str = INGESTION_MANIFEST_PATH) -> bool:
+    """Ingest the constitution, only touching chunks that changed since the last run"""
+    # Imported here so the query path (which only needs get_corpus_version) skips PDF and splitter imports
+    from data.constitution_processor import iter_document_chunks, iter_batches
+
+    manifest = load_manifest(manifest_path)
+    settings = _settings_fingerprint(chunk_size, chunk_overlap)
+    file_hash = file_sha256(file_path)
+
+    if (manifest.get("file_sha256") == file_hash and manifest.get("settings") == settings
+            and os.path.exists(ARTICLE_INDEX_PATH)
+            and os.path.exists(os.path.join(LEXICAL_INDEX_DIR, "documents.json"))
+            and (chunk_store_exists() or not CHUNK_STORE_ENABLED)):
+        print("Constitution already ingested with current settings, skipping")
+        return True
+
+    # Vectors from another model or index cannot be reused
+    reusable = manifest.get("settings", {})
+    # Vectors upserted without text (chunk store on, or not recorded) cannot serve answers with it off
+    same_vectors = (reusable.get("model_name") == settings["model_name"]
+                    and reusable.get("index_name") == settings["index_name"]
+                    and (CHUNK_STORE_ENABLED or reusable.get("chunk_store") is False))
+    old_chunks = manifest.get("chunks", {}) if same_vectors else {}
+    # With no manifest for this index, it may still hold the positional vectors of the
+    # original ingestion; they are removed once the new vectors are in
+    indexed_before = manifest.get("chunks") is not None and reusable.get("index_name") == settings["index_name"]
+    legacy_ids = [] if indexed_before else legacy_chunk_ids(check_health().get("vector_count", 0))
+
+    # Chunks stream out of extraction into the vector store, which embeds and upserts
+    # each batch while the next one is being extracted
+    new_chunks = {}
+    article_index: Dict[str, List[str]] = {}
+    lexical_documents: List[Dict[str, Any]] = []
+    chunk_ids: List[str] = []
+    seen: Dict[str, int] = {}
+    upserted = 0
+
+    def changed_batches():
+        nonlocal upserted
+        for batch in iter_batches(iter_document_chunks(file_path, chunk_size, chunk_overlap), INGEST_BATCH_SIZE):
+            changed_docs, changed_ids = [], []
+            for doc, chunk_id in zip(batch, assign_chunk_ids(batch, seen)):
+                entry = {"hash": content_hash(doc.page_content), "chunk_id": doc.metadata.get("chunk_id")}
+                new_chunks[chunk_id] = entry
+                for key in index_keys(doc.metadata):
+                    article_index.setdefault(key, []).append(chunk_id)
+                lexical_documents.append(document_metadata(doc, len(lexical_documents)))
+                chunk_ids.append(chunk_id)
+                if old_chunks.get(chunk_id) != entry:
+                    changed_docs.append(doc)
+                    changed_ids.append(chunk_id)
+            if changed_docs:
+                upserted += len(changed_ids)
+                yield changed_docs, changed_ids
+
+    if not store_document_batches(changed_batches()):
+        return False
+
+    if not new_chunks:
+        print(f"No text could be extracted from {file_path}")
+        return False
+
+    if indexed_before:
+        stale_ids = [chunk_id for chunk_id in manifest.get("chunks", {}) if chunk_id not in new_chunks]
+    else:
+        stale_ids = [chunk_id for chunk_id in legacy_ids if chunk_id not in new_chunks]
+    if stale_ids and not delete_documents(stale_ids):
+        return False
+
+    save_article_index(article_index)
+    BM25Index.build(lexical_documents).save()
+    if CHUNK_STORE_ENABLED:
+        ChunkStore.build(chunk_ids, lexical_documents).save()
+
+    corpus_version = hashlib.sha256(
+        json.dumps({"file_sha256": file_hash, "settings": settings}, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:16]
+    save_manifest({
+        "version": MANIFEST_VERSION,
+        "file_path": file_path,
+        "file_sha256": file_hash,
+        "settings": settings,
+        "corpus_version": corpus_version,
+        "chunks": new_chunks,
+    }, manifest_path)
+
+    print(f"Ingestion complete: {upserted} chunks upserted, {len(stale_ids)} stale chunk IDs deleted, "
+          f"{len(new_chunks) - upserted} unchanged")
+    return True
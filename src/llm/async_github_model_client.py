@@ -0,0 +1,151 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Any, Optional
+import httpx
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    GITHUB_MODEL_ENDPOINT, ASYNC_MAX_CONCURRENCY, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES,
+    LLM_HEDGE_AFTER_SECONDS
+)
+from llm.github_model_client import _build_payload, _headers, parse_sse_line
+from llm.errors import LLMError, LLMTimeoutError, LLMConnectionError, LLMServerError, error_for_status
+from llm.resilience import get_circuit_breaker, retry_after_seconds, backoff_delay
+
+# One pooled client per event loop; httpx clients cannot be shared across loops
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client for the running event loop"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONCURRENCY,
+                max_keepalive_connections=ASYNC_MAX_CONCURRENCY
+            )
+        )
+        _client_loop = loop
+    return _client
+
+
+async def aclose_async_client():
+    """Close the pooled client, e.g. on application shutdown"""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def _asend(payload: Dict[str, Any], stream: bool = False) -> httpx.Response:
+    """One request attempt; raises a typed LLMError for anything but a 200"""
+    breaker = get_circuit_breaker()
+    breaker.before_request()
+    client = get_async_client()
+    try:
+        request = client.build_request("POST", GITHUB_MODEL_ENDPOINT, headers=_headers(), content=json.dumps(payload))
+        response = await client.send(request, stream=stream)
+    except httpx.TimeoutException as e:
+        breaker.record_failure()
+        raise LLMTimeoutError(f"GitHub model did not respond within {LLM_TIMEOUT}s") from e
+    except httpx.HTTPError as e:
+        breaker.record_failure()
+        raise LLMConnectionError(f"Could not reach GitHub model: {str(e)}") from e
+
+    if response.status_code == 200:
+        breaker.record_success()
+        return response
+
+    body = await response.aread()
+    await response.aclose()
+    error = error_for_status(response.status_code, body.decode("utf-8", "replace")[:300],
+                             retry_after_seconds(response.headers))
+    if isinstance(error, (LLMServerError, LLMTimeoutError)):
+        breaker.record_failure()
+    else:
+        breaker.record_success()  # the endpoint is up, it just refused this request
+    raise error
+
+
+async def _ahedged_send(payload: Dict[str, Any]) -> httpx.Response:
+    """Send the request, and a duplicate if the first is slower than LLM_HEDGE_AFTER_SECONDS"""
+    if not LLM_HEDGE_AFTER_SECONDS:
+        return await _asend(payload)
+    first = asyncio.ensure_future(_asend(payload))
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=LLM_HEDGE_AFTER_SECONDS)
+        if done:
+            pending = set()
+            return first.result()
+
+        pending.add(asyncio.ensure_future(_asend(payload)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winners = [task for task in done if task.exception() is None]
+            if winners:
+                pending.update(winners[1:])  # both answered at once: the second is a loser too
+                return winners[0].result()
+            error = next(iter(done)).exception()
+        raise error
+    finally:
+        # Also reached when the caller is cancelled, so no request outlives it
+        await _adiscard(pending)
+
+
+async def _adiscard(tasks):
+    """Cancel hedged requests that lost, closing any response one already received"""
+    for task in tasks:
+        task.cancel()
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, httpx.Response):
+            await result.aclose()
+
+
+async def _apost(payload: Dict[str, Any], stream: bool = False) -> httpx.Response:
+    """Send a request, retrying retryable failures with backoff that honours Retry-After"""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await (_asend(payload, stream=True) if stream else _ahedged_send(payload))
+        except LLMError as e:
+            if not e.retryable or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e.retry_after)
+            print(f"LLM request failed ({str(e)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def agenerate_response(prompt: str, context: str = "") -> str:
+    """Generate response using GitHub Marketplace model without blocking the event loop
+
+    Raises an LLMError subclass when no answer could be obtained.
+    """
+    response = await _apost(_build_payload(prompt, context))
+    result = response.json()
+    return result.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+
+async def astream_response(prompt: str, context: str = "") -> AsyncIterator[str]:
+    """Stream the answer as server-sent events, yielding text fragments as they arrive
+
+    Raises an LLMError subclass if no answer could be obtained or the stream breaks off.
+    """
+    response = await _apost(_build_payload(prompt, context, stream=True), stream=True)
+    try:
+        async for line in response.aiter_lines():
+            done, content = parse_sse_line(line)
+            if done:
+                break
+            if content:
+                yield content
+    except httpx.HTTPError as e:
+        raise LLMConnectionError(f"Answer stream from GitHub model was interrupted: {str(e)}") from e
+    finally:
+        await response.aclose()
@@ -0,0 +1,51 @@
+from typing import Optional
+
+
+class LLMError(Exception):
+    """Base class for failures talking to the chat-completions endpoint"""
+    retryable = False
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    """The endpoint did not answer within the configured timeout"""
+    retryable = True
+
+
+class LLMConnectionError(LLMError):
+    """The endpoint could not be reached or dropped the connection"""
+    retryable = True
+
+
+class LLMRateLimitError(LLMError):
+    """The endpoint answered 429; retry_after holds its Retry-After hint, if any"""
+    retryable = True
+
+
+class LLMServerError(LLMError):
+    """The endpoint answered with a 5xx status"""
+    retryable = True
+
+
+class LLMRequestError(LLMError):
+    """The endpoint rejected the request (4xx other than 429); retrying will not help"""
+
+
+class LLMUnavailableError(LLMError):
+    """The circuit breaker is open after repeated failures; the request was not sent"""
+
+
+def error_for_status(status_code: int, detail: str = "", retry_after: Optional[float] = None) -> LLMError:
+    """Typed error for a non-200 response"""
+    message = f"GitHub model returned status {status_code}" + (f": {detail}" if detail else "")
+    if status_code == 429:
+        return LLMRateLimitError(message, status_code, retry_after)
+    if status_code == 408:
+        return LLMTimeoutError(message, status_code, retry_after)
+    if status_code >= 500:
+        return LLMServerError(message, status_code, retry_after)
+    return LLMRequestError(message, status_code)
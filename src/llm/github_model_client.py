@@ -1,24 +1,42 @@
 import requests
+import hashlib
 import json
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import GITHUB_TOKEN, GITHUB_MODEL_ENDPOINT
+from config.settings import (
+    GITHUB_TOKEN, GITHUB_MODEL_ENDPOINT, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES,
+    LLM_HEDGE_AFTER_SECONDS, LLM_POOL_SIZE
+)
+from llm.errors import (
+    LLMError, LLMTimeoutError, LLMConnectionError, LLMServerError, error_for_status
+)
+from llm.resilience import get_circuit_breaker, retry_after_seconds, backoff_delay
 
 
-def construct_prompt(question: str, context: str) -> str:
-    """Construct prompt with context and question"""
-    prompt_template = """
-You are a constitutional law expert specializing in the Constitution of India. Your task is to provide accurate, precise answers based on the provided constitutional context.
+MODEL_NAME = "gpt-4o-mini"  # or whatever model you're using
+
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions about the Constitution of India based on the provided context."
+
+EXPERT_INTRO = "You are a constitutional law expert specializing in the Constitution of India. Your task is to provide accurate, precise answers based on the provided constitutional context."
 
-GUIDELINES:
+GUIDELINES = """GUIDELINES:
 - Answer ALL questions that can be answered from the provided constitutional context
 - Provide lawyer-like precision with specific Article/Section references when available
 - Keep responses concise, factual, and authoritative
 - Cite relevant constitutional provisions and legal terminology
 - Only respond "I don't have sufficient constitutional context to answer this question accurately" if the question is COMPLETELY unrelated to the provided context
-- For constitutional questions where you have partial context, provide what you can and indicate what additional information might be needed
+- For constitutional questions where you have partial context, provide what you can and indicate what additional information might be needed"""
+
+PROMPT_TEMPLATE = """
+""" + EXPERT_INTRO + """
+
+""" + GUIDELINES + """
 
 Constitutional Context:
 {context}
@@ -27,62 +45,241 @@ Question: {question}
 
 Constitutional Analysis:
 """
-    return prompt_template.format(context=context, question=question)
 
+# Conversation mode sends these as one fixed system message ahead of every turn, so the
+# start of the prompt is byte-identical across turns and conversations
+CONVERSATION_SYSTEM_PROMPT = "\n\n".join([
+    SYSTEM_PROMPT,
+    EXPERT_INTRO,
+    GUIDELINES + "\n- Questions may follow up on earlier turns (\"that Article\", \"clause 2\"); resolve them "
+                 "against the earlier questions, answers and context in this conversation",
+])
 
 
+def construct_prompt(question: str, context: str) -> str:
+    """Construct prompt with context and question"""
+    return PROMPT_TEMPLATE.format(context=context, question=question)
 
-def generate_response(prompt: str, context: str = "") -> str:
-    """Generate response using GitHub Marketplace model"""
-    try:
+
+def prompt_version() -> str:
+    """Fingerprint of the model and prompt wording, for invalidating cached answers"""
+    return hashlib.sha256(f"{MODEL_NAME}\0{SYSTEM_PROMPT}\0{PROMPT_TEMPLATE}".encode("utf-8")).hexdigest()[:16]
+
+
+def _build_payload(prompt: str, context: str, stream: bool = False,
+                   messages: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+    """Build the chat-completions request body; `messages` replaces the single-turn prompt"""
+    if messages is None:
         # Construct the full prompt with context
         full_prompt = construct_prompt(prompt, context)
-        
-        headers = {
-            "Authorization": f"Bearer {GITHUB_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        # Try different payload formats for GitHub Models
-        payload = {
-            "model": "gpt-4o-mini",  # or whatever model you're using
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that answers questions about the Constitution of India based on the provided context."
-                },
-                {
-                    "role": "user",
-                    "content": full_prompt
-                }
-            ],
-            "max_tokens": 1000,
-            "temperature": 0.7
-        }
-        
-        print(f"Making request to: {GITHUB_MODEL_ENDPOINT}")
-        print(f"Token starts with: {GITHUB_TOKEN[:10]}..." if GITHUB_TOKEN else "No token")
-        
-        # Make API call
-        response = requests.post(
+        messages = [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": full_prompt
+            }
+        ]
+
+    # Try different payload formats for GitHub Models
+    payload = {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "max_tokens": 1000,
+        "temperature": 0.7
+    }
+    if stream:
+        payload["stream"] = True
+        # Streams only report token usage (and cached prompt tokens) when asked to
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+
+def _headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {GITHUB_TOKEN}",
+        "Content-Type": "application/json"
+    }
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# Runs hedged requests, so the slower duplicate can be abandoned
+_hedge_executor = ThreadPoolExecutor(max_workers=LLM_POOL_SIZE, thread_name_prefix="llm-hedge")
+
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session, keeping connections to the endpoint alive between questions"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _reset_after_fork():
+    # Keep-alive connections belong to the parent process
+    global _session, _session_lock
+    _session_lock = threading.Lock()
+    _session = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _send(payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+    """One request attempt; raises a typed LLMError for anything but a 200"""
+    breaker = get_circuit_breaker()
+    breaker.before_request()
+    try:
+        response = get_session().post(
             GITHUB_MODEL_ENDPOINT,
-            headers=headers,
+            headers=_headers(),
             data=json.dumps(payload),
-            timeout=30
+            stream=stream,
+            timeout=(LLM_CONNECT_TIMEOUT, LLM_TIMEOUT)
         )
-        
-        print(f"Response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            # Extract response (adjust based on your model's response format)
-            return result.get("choices", [{}])[0].get("message", {}).get("content", "")
-        else:
-            error_msg = f"Error: Failed to get response from GitHub model. Status: {response.status_code}"
-            print(f"Error details: {response.text}")
-            return error_msg
-            
-    except Exception as e:
-        error_msg = f"Error generating response: {str(e)}"
-        print(error_msg)
-        return error_msg
+    except requests.Timeout as e:
+        breaker.record_failure()
+        raise LLMTimeoutError(f"GitHub model did not respond within {LLM_TIMEOUT}s") from e
+    except requests.RequestException as e:
+        breaker.record_failure()
+        raise LLMConnectionError(f"Could not reach GitHub model: {str(e)}") from e
+
+    if response.status_code == 200:
+        breaker.record_success()
+        return response
+
+    with response:
+        error = error_for_status(response.status_code, response.text[:300], retry_after_seconds(response.headers))
+    if isinstance(error, (LLMServerError, LLMTimeoutError)):
+        breaker.record_failure()
+    else:
+        breaker.record_success()  # the endpoint is up, it just refused this request
+    raise error
+
+
+def _hedged_send(payload: Dict[str, Any]) -> requests.Response:
+    """Send the request, and a duplicate if the first is slower than LLM_HEDGE_AFTER_SECONDS"""
+    if not LLM_HEDGE_AFTER_SECONDS:
+        return _send(payload)
+    first = _hedge_executor.submit(_send, payload)
+    done, _ = wait([first], timeout=LLM_HEDGE_AFTER_SECONDS)
+    if done:
+        return first.result()
+
+    futures = [first, _hedge_executor.submit(_send, payload)]
+    error = None
+    for future in as_completed(futures):
+        try:
+            response = future.result()
+        except LLMError as e:
+            error = e
+            continue
+        _discard([other for other in futures if other is not future])
+        return response
+    raise error
+
+
+def _discard(futures):
+    """Release the connections of hedged requests that lost, now or whenever they finish"""
+    for future in futures:
+        if not future.cancel():
+            future.add_done_callback(_close_response)
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _post(payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+    """Send a request, retrying retryable failures with backoff that honours Retry-After"""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return _send(payload, stream=True) if stream else _hedged_send(payload)
+        except LLMError as e:
+            if not e.retryable or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt, e.retry_after)
+            print(f"LLM request failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def generate_response(prompt: str, context: str = "", stream: bool = False,
+                      messages: Optional[List[Dict[str, str]]] = None, usage: Optional[Dict[str, Any]] = None):
+    """Generate response using GitHub Marketplace model
+
+    With stream=True, returns a generator of text fragments instead of a string.
+    Pass `messages` to send a prepared conversation instead of the single-turn
+    prompt, and a `usage` dict to receive the token usage the endpoint reports
+    (for a stream, once it has been consumed). Raises an LLMError subclass when
+    no answer could be obtained.
+    """
+    if stream:
+        return stream_response(prompt, context, messages, usage)
+
+    response = _post(_build_payload(prompt, context, messages=messages))
+    result = response.json()
+    if usage is not None:
+        usage.update(result.get("usage") or {})
+    return result.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+
+def parse_sse_event(line: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Parse one server-sent event line into (done, event payload)"""
+    # SSE frames look like "data: {...}"; blank lines separate events
+    if not line or not line.startswith("data:"):
+        return False, None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return True, None
+    return False, json.loads(data)
+
+
+def _delta_content(event: Dict[str, Any]) -> Optional[str]:
+    choices = event.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content")
+
+
+def parse_sse_line(line: str) -> Tuple[bool, Optional[str]]:
+    """Parse one server-sent event line into (done, content fragment)"""
+    done, event = parse_sse_event(line)
+    return done, _delta_content(event) if event else None
+
+
+def stream_response(prompt: str, context: str = "", messages: Optional[List[Dict[str, str]]] = None,
+                    usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Stream the answer as server-sent events
+
+    The request is made (and retried) before returning, so failures to get an
+    answer raise here; the returned generator yields text fragments and raises
+    LLMConnectionError if the stream breaks off.
+    """
+    response = _post(_build_payload(prompt, context, stream=True, messages=messages), stream=True)
+    return _iter_stream(response, usage)
+
+
+def _iter_stream(response: requests.Response, usage: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    with response:
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                done, event = parse_sse_event(line)
+                if done:
+                    break
+                if not event:
+                    continue
+                if usage is not None and event.get("usage"):
+                    usage.update(event["usage"])
+                content = _delta_content(event)
+                if content:
+                    yield content
+        except requests.RequestException as e:
+            raise LLMConnectionError(f"Answer stream from GitHub model was interrupted: {str(e)}") from e
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    ANSWER_CACHE_DIR, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS
+)
+from retrieval.article_index import find_references
+
+
+class SemanticAnswerCache:
+    """Answers keyed by query embedding, matched by cosine similarity.
+
+    A hit also needs the same Article/Schedule references, since questions
+    naming different Articles ("What does Article 14 say?" / "... Article 15
+    ...") embed almost identically. Entries expire after ``ttl_seconds``, the
+    least recently used entry is
+    evicted beyond ``max_entries``, and the whole cache is dropped when its
+    ``version`` (corpus + prompt fingerprint) changes. ``answers.json`` and
+    ``embeddings.npy`` persist it across restarts.
+    """
+
+    def __init__(self, directory: str = ANSWER_CACHE_DIR, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.answers_path = os.path.join(directory, "answers.json")
+        self.embeddings_path = os.path.join(directory, "embeddings.npy")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._version = ""
+        self._entries: List[Dict[str, Any]] = []
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.answers_path) or not os.path.exists(self.embeddings_path):
+            return
+        try:
+            with open(self.answers_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            embeddings = np.load(self.embeddings_path)
+            if len(embeddings) != len(stored["entries"]):
+                raise ValueError("answers and embeddings are out of sync")
+            self._version = stored["version"]
+            self._entries = stored["entries"]
+            for entry in self._entries:
+                entry.setdefault("references", find_references(entry["question"]))
+            self._embeddings = embeddings.astype(np.float32)
+        except Exception as e:
+            print(f"Ignoring unreadable answer cache at {self.directory}: {str(e)}")
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_embeddings_path = self.embeddings_path + ".tmp.npy"
+        np.save(tmp_embeddings_path, self._embeddings)
+        os.replace(tmp_embeddings_path, self.embeddings_path)
+        tmp_path = self.answers_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self._version, "entries": self._entries}, f)
+        os.replace(tmp_path, self.answers_path)
+
+    def _drop(self, rows: Sequence[int]):
+        doomed = set(rows)
+        keep = [row for row in range(len(self._entries)) if row not in doomed]
+        self._entries = [self._entries[row] for row in keep]
+        self._embeddings = self._embeddings[keep]
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            self._version = version
+            self._entries = []
+            self._embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question: str, embedding: Sequence[float], version: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for the most similar question above the threshold naming the same Articles"""
+        query = self._normalize(embedding)
+        references = find_references(question)
+        with self._lock:
+            self._check_version(version)
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            expired = [row for row, entry in enumerate(self._entries) if now - entry["created_at"] > self.ttl_seconds]
+            if expired:
+                self._drop(expired)
+                if not self._entries:
+                    self.misses += 1
+                    return None
+
+            scores = self._embeddings @ query
+            candidates = np.flatnonzero(scores >= self.threshold)
+            matching = [int(row) for row in candidates[np.argsort(-scores[candidates])]
+                        if self._entries[row]["references"] == references]
+            if not matching:
+                self.misses += 1
+                return None
+            best = matching[0]
+
+            self.hits += 1
+            entry = self._entries[best]
+            entry["last_used"] = now
+            return dict(entry["response"], cache_similarity=float(scores[best]), cached_question=entry["question"])
+
+    def store(self, question: str, embedding: Sequence[float], response: Dict[str, Any], version: str):
+        """Cache a response, evicting the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._check_version(version)
+            if len(self._entries) >= self.max_entries:
+                oldest = min(range(len(self._entries)), key=lambda row: self._entries[row]["last_used"])
+                self._drop([oldest])
+
+            now = time.time()
+            self._entries.append({"question": question, "references": find_references(question),
+                                  "response": dict(response), "created_at": now, "last_used": now})
+            if self._embeddings.size == 0:
+                self._embeddings = vector[None, :]
+            else:
+                self._embeddings = np.vstack([self._embeddings, vector[None, :]])
+            self._save()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+_cache_directory = ANSWER_CACHE_DIR
+
+
+def use_process_answer_cache(name: str) -> None:
+    """Give this process its own answer cache
+
+    The cache files have a single writer (each save rewrites them from memory),
+    so each server worker process keeps its answers in a directory of its own.
+    Call before the first question.
+    """
+    global _cache, _cache_directory
+    with _cache_lock:
+        _cache_directory = os.path.join(ANSWER_CACHE_DIR, name)
+        _cache = None
+
+
+def _seed_from_shared_cache(directory: str):
+    """Start a worker's cache from the shared one (e.g. pre-warmed by batch_qa.py)"""
+    if os.path.exists(os.path.join(directory, "answers.json")):
+        return
+    shared = SemanticAnswerCache(ANSWER_CACHE_DIR)
+    if shared._entries:
+        seeded = SemanticAnswerCache(directory)
+        seeded._version, seeded._entries, seeded._embeddings = shared._version, shared._entries, shared._embeddings
+        seeded._save()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Get the process-wide answer cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if _cache_directory != ANSWER_CACHE_DIR:
+                    _seed_from_shared_cache(_cache_directory)
+                _cache = SemanticAnswerCache(_cache_directory)
+    return _cache
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+from itertools import zip_longest
+from typing import List, Dict, Any, Tuple
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import ARTICLE_INDEX_PATH
+
+# "Article 21", "Art. 21A", "Articles 14, 15 and 16", "Article 19(1)(a)"
+ARTICLE_REFERENCE_PATTERN = re.compile(
+    r"\bart(?:icles?|s?\.)\s*((?:\d{1,3}[A-Z]{0,3}(?:\(\w{1,4}\))*(?:\s*(?:,|and|&|or)\s*)?)+)",
+    re.IGNORECASE
+)
+ARTICLE_NUMBER_PATTERN = re.compile(r"\d{1,3}[A-Z]{0,3}", re.IGNORECASE)
+SCHEDULE_REFERENCE_PATTERN = re.compile(
+    r"\b(first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|eleventh|twelfth)\s+schedule\b",
+    re.IGNORECASE
+)
+
+
+def index_keys(metadata: Dict[str, Any]) -> List[str]:
+    """Lookup keys a chunk should be reachable under"""
+    keys = []
+    if metadata.get("article"):
+        keys.append(f"article:{metadata['article'].upper()}")
+    if metadata.get("schedule"):
+        keys.append(f"schedule:{metadata['schedule'].upper()}")
+    return keys
+
+
+def find_references(question: str) -> List[str]:
+    """Extract Article/Schedule lookup keys named in a question, in order of mention"""
+    keys = []
+    for match in ARTICLE_REFERENCE_PATTERN.finditer(question):
+        numbers = re.sub(r"\([^)]*\)", "", match.group(1))  # drop clause references
+        for number in ARTICLE_NUMBER_PATTERN.findall(numbers):
+            keys.append(f"article:{number.upper()}")
+    for match in SCHEDULE_REFERENCE_PATTERN.finditer(question):
+        keys.append(f"schedule:{match.group(1).upper()}")
+    return list(dict.fromkeys(keys))
+
+
+def save_article_index(index: Dict[str, List[str]], index_path: str = ARTICLE_INDEX_PATH):
+    """Atomically write the Article/Schedule to chunk ID index"""
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+_loaded: Dict[str, Tuple[int, Dict[str, List[str]]]] = {}
+
+
+def load_article_index(index_path: str = ARTICLE_INDEX_PATH) -> Dict[str, List[str]]:
+    """Load the index, re-reading it only when ingestion has rewritten it"""
+    try:
+        mtime = os.stat(index_path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _loaded.get(index_path)
+    if cached is None or cached[0] != mtime:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            cached = (mtime, json.load(f))
+        _loaded[index_path] = cached
+    return cached[1]
+
+
+def lookup_chunk_ids(question: str, max_chunks: int, index_path: str = ARTICLE_INDEX_PATH) -> List[str]:
+    """Chunk IDs for the Articles/Schedules a question names, or [] if it names none"""
+    references = find_references(question)
+    if not references:
+        return []
+    index = load_article_index(index_path)
+    # Interleave so every named Article gets chunks before any gets its second
+    ids = []
+    for group in zip_longest(*(index.get(key, []) for key in references)):
+        ids.extend(chunk_id for chunk_id in group if chunk_id is not None)
+    return list(dict.fromkeys(ids))[:max_chunks]
@@ -0,0 +1,144 @@
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embeddings.embedding_service import embed_query
+from llm.async_github_model_client import agenerate_response
+from llm.errors import LLMError
+from retrieval.answer_cache import get_answer_cache
+from retrieval.context_builder import build_context
+from utils.tracing import span
+from retrieval.rag_pipeline import (
+    retrieve_documents, format_sources, answer_cache_enabled, answer_cache_version, is_cacheable,
+    llm_error_response, NO_RESULTS_ANSWER
+)
+from config.settings import (
+    ASYNC_MAX_CONCURRENCY, ASYNC_MAX_PENDING, ASYNC_EXECUTOR_WORKERS
+)
+
+
+class RAGOverloadedError(Exception):
+    """Raised when too many questions are already waiting to be answered"""
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests and rejects new ones once the wait queue is full"""
+
+    def __init__(self, max_concurrency: int, max_pending: int):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise RAGOverloadedError(f"Too many pending questions ({self.waiting}), try again shortly")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+# CPU-bound work (embedding, local search) and blocking I/O (Pinecone) run here
+_executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix="rag-worker")
+# Weakly keyed, so a finished loop (e.g. one asyncio.run per batch) does not stay alive here
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ConcurrencyLimiter]" = weakref.WeakKeyDictionary()
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    """Return the concurrency limiter for the running event loop"""
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        # A limiter whose semaphore has had waiters references its loop, which keeps the
+        # weak key alive too; drop the ones for closed loops explicitly
+        for closed in [other for other in list(_limiters) if other.is_closed()]:
+            del _limiters[closed]
+        limiter = ConcurrencyLimiter(ASYNC_MAX_CONCURRENCY, ASYNC_MAX_PENDING)
+        _limiters[loop] = limiter
+    return limiter
+
+
+async def _run_blocking(func, *args):
+    # Run in a copy of the current context so spans opened by func join the request's trace
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_executor, context.run, func, *args)
+
+
+async def aquery_rag(question: str) -> Dict[str, Any]:
+    """Async RAG query function, safe to run many times concurrently
+
+    Raises RAGOverloadedError when the pending queue is full, so callers can
+    shed load (e.g. answer HTTP 503) instead of queueing without bound.
+    """
+    with span("rag.query", stream=False):
+        async with get_limiter():
+            return await _aquery_rag(question)
+
+
+async def _aquery_rag(question: str) -> Dict[str, Any]:
+    try:
+        query_embedding = None
+        if answer_cache_enabled():
+            with span("embedding"):
+                query_embedding = await _run_blocking(embed_query, question)
+            cache_version = answer_cache_version()
+            with span("answer_cache") as attributes:
+                cached = get_answer_cache().lookup(question, query_embedding, cache_version)
+                attributes["hit"] = cached is not None
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+
+        relevant_docs = await _run_blocking(retrieve_documents, question)
+
+        if not relevant_docs:
+            return {
+                "answer": NO_RESULTS_ANSWER,
+                "sources": [],
+                "error": None
+            }
+
+        with span("context") as attributes:
+            context, context_stats = await _run_blocking(build_context, relevant_docs)
+            attributes["tokens"] = context_stats["context_tokens"]
+        try:
+            with span("llm"):
+                answer = await agenerate_response(question, context)
+        except LLMError as e:
+            return llm_error_response(e, relevant_docs)
+
+        response = {
+            "answer": answer,
+            "sources": format_sources(relevant_docs),
+            "context_stats": context_stats,
+            "error": None
+        }
+
+        if query_embedding is not None and is_cacheable(answer):
+            await _run_blocking(get_answer_cache().store, question, query_embedding, response, cache_version)
+
+        return response
+
+    except Exception as e:
+        return {
+            "answer": "An error occurred while processing your question.",
+            "sources": [],
+            "error": str(e)
+        }
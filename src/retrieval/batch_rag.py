@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import json
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embeddings.embedding_service import embed_queries
+from vector_store.vector_store import search_by_vectors
+from llm.async_github_model_client import agenerate_response, aclose_async_client
+from llm.errors import LLMError, LLMRateLimitError
+from llm.resilience import backoff_delay
+from retrieval.answer_cache import get_answer_cache
+from retrieval.context_builder import build_context
+from retrieval.rag_pipeline import (
+    retrieve_documents, vector_candidates, format_sources, answer_cache_enabled, answer_cache_version, is_cacheable,
+    llm_error_response, NO_RESULTS_ANSWER
+)
+from config.settings import RETRIEVAL_MODE, ASYNC_MAX_CONCURRENCY
+
+
+def read_questions(path: str, question_field: str = "question") -> List[Dict[str, str]]:
+    """Read questions from a JSONL or CSV file; rows without an "id" are numbered by position"""
+    questions = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for position, row in enumerate(rows, 1):
+            question = (row.get(question_field) or "").strip()
+            if question:
+                questions.append({"id": str(row.get("id") or position), "question": question})
+    return questions
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """IDs already answered without error in a previous (possibly interrupted) run"""
+    latest: Dict[str, bool] = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # line cut short by the interruption
+            latest[record["id"]] = not record.get("error")
+    return {question_id for question_id, ok in latest.items() if ok}
+
+
+class RequestPacer:
+    """Spaces LLM requests to a requests-per-minute budget and pauses every
+    worker after a question runs out of retries on 429."""
+
+    def __init__(self, requests_per_minute: float = 0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        start = max(now, self._next_slot, self._paused_until)
+        self._next_slot = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+async def generate_answer(question: str, context: str, pacer: RequestPacer) -> Tuple[str, Optional[LLMError]]:
+    """Return (answer, error) from the LLM client, which retries with backoff (LLM_MAX_RETRIES)"""
+    await pacer.wait()
+    try:
+        return await agenerate_response(question, context), None
+    except LLMError as e:
+        if isinstance(e, LLMRateLimitError):
+            pacer.pause(backoff_delay(0, e.retry_after))
+        return "", e
+
+
+def prepare_batch(batch: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Embed, look up cached answers, bulk-search and build contexts for a batch of questions"""
+    texts = [item["question"] for item in batch]
+    use_cache = answer_cache_enabled()
+    embeddings = embed_queries(texts) if use_cache or RETRIEVAL_MODE != "lexical" else [None] * len(batch)
+    version = answer_cache_version() if use_cache else None
+
+    prepared, to_search = [], []
+    for item, embedding in zip(batch, embeddings):
+        entry = dict(item, embedding=embedding)
+        if use_cache:
+            cached = get_answer_cache().lookup(item["question"], embedding, version)
+            if cached is not None:
+                entry["response"] = dict(cached, cached=True)
+        if "response" not in entry:
+            to_search.append(entry)
+        prepared.append(entry)
+
+    vector_results = [None] * len(to_search)
+    if to_search and RETRIEVAL_MODE != "lexical":
+        vector_results = search_by_vectors([entry["embedding"] for entry in to_search], vector_candidates())
+
+    for entry, vector_docs in zip(to_search, vector_results):
+        entry["documents"] = retrieve_documents(entry["question"], vector_docs)
+        if entry["documents"]:
+            entry["context"], entry["context_stats"] = build_context(entry["documents"])
+    return prepared
+
+
+async def answer_questions(questions: List[Dict[str, str]], output_path: str, batch_size: int = 64,
+                           concurrency: int = ASYNC_MAX_CONCURRENCY, requests_per_minute: float = 0
+                           ) -> Dict[str, int]:
+    """Answer questions, appending one JSON line per answer to output_path as each completes
+
+    Questions already answered in output_path are skipped, so an interrupted
+    run resumes where it stopped. Retrieval for the next batch overlaps the
+    LLM calls of the current one.
+    """
+    completed = load_completed(output_path)
+    pending = [item for item in questions if item["id"] not in completed]
+    counts = {"skipped": len(questions) - len(pending), "answered": 0, "cached": 0, "errors": 0}
+    if not pending:
+        return counts
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(batch_size, concurrency) * 2)
+    pacer = RequestPacer(requests_per_minute)
+    use_cache = answer_cache_enabled()
+    version = answer_cache_version() if use_cache else None
+
+    async def produce():
+        try:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                for entry in await loop.run_in_executor(None, prepare_batch, batch):
+                    await queue.put(entry)
+        finally:
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def work(output):
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            response = entry.get("response")
+            if response is None:
+                if not entry["documents"]:
+                    response = {"answer": NO_RESULTS_ANSWER, "sources": [], "error": None}
+                else:
+                    answer, error = await generate_answer(entry["question"], entry["context"], pacer)
+                    if error is not None:
+                        response = dict(llm_error_response(error, entry["documents"]),
+                                        context_stats=entry["context_stats"])
+                    else:
+                        response = {
+                            "answer": answer,
+                            "sources": format_sources(entry["documents"]),
+                            "context_stats": entry["context_stats"],
+                            "error": None,
+                        }
+                    if use_cache and not error and is_cacheable(answer):
+                        await loop.run_in_executor(None, get_answer_cache().store, entry["question"],
+                                                   entry["embedding"], response, version)
+
+            counts["cached" if response.get("cached") else "answered"] += 1
+            counts["errors"] += bool(response.get("error"))
+            record = {"id": entry["id"], "question": entry["question"], **response}
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    with open(output_path, 'a', encoding='utf-8') as output:
+        try:
+            await asyncio.gather(produce(), *(work(output) for _ in range(concurrency)))
+        finally:
+            await aclose_async_client()
+    return counts
@@ -0,0 +1,150 @@
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import CONTEXT_TOKEN_BUDGET, CHUNK_OVERLAP
+from llm.github_model_client import MODEL_NAME
+
+SEPARATOR = "\n\n---\n\n"
+
+# Context tokens per request; leaves room for the prompt template, question and answer
+# within the request limits of the hosted models
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-4o": 3000,
+    "gpt-4o-mini": 3000,
+}
+DEFAULT_CONTEXT_BUDGET = 2000
+
+# Shorter suffix/prefix matches between neighbouring chunks are treated as coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+# Characters per token assumed when the tokenizer cannot be loaded (English text
+# averages a little over 4, so budgets err on the safe side)
+APPROXIMATE_CHARS_PER_TOKEN = 4
+
+
+class ApproximateEncoding:
+    """Stand-in for a tiktoken encoding whose tokens are fixed-size pieces of the text"""
+
+    def encode(self, text: str) -> List[str]:
+        return [text[i:i + APPROXIMATE_CHARS_PER_TOKEN] for i in range(0, len(text), APPROXIMATE_CHARS_PER_TOKEN)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = MODEL_NAME):
+    """Tokenizer for a model, falling back to cl100k_base for unknown models
+
+    tiktoken downloads its BPE files on first use (cached under
+    TIKTOKEN_CACHE_DIR); without network access token counts are estimated
+    from character counts instead.
+    """
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Could not load the tokenizer for {model_name} ({type(e).__name__}: {str(e)}); "
+              f"estimating {APPROXIMATE_CHARS_PER_TOKEN} characters per token")
+        return ApproximateEncoding()
+
+
+def count_tokens(text: str, model_name: str = MODEL_NAME) -> int:
+    return len(get_encoding(model_name).encode(text))
+
+
+def context_budget(model_name: str = MODEL_NAME) -> int:
+    """Token budget for retrieved context, CONTEXT_TOKEN_BUDGET overriding the per-model default"""
+    return CONTEXT_TOKEN_BUDGET or MODEL_CONTEXT_BUDGETS.get(model_name, DEFAULT_CONTEXT_BUDGET)
+
+
+def merge_texts(first: str, second: str, max_overlap: int = 2 * CHUNK_OVERLAP) -> str:
+    """Join consecutive chunks, dropping the text the splitter repeated across them"""
+    first_line, _, rest = second.partition("\n")
+    if rest and first.startswith(first_line + "\n"):
+        second = rest  # repeated Article heading from the structure chunker
+    for size in range(min(len(first), len(second), max_overlap), MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+
+def _position(doc: Dict[str, Any]) -> Tuple[str, int]:
+    try:
+        return doc.get("source", ""), int(doc["chunk_id"])
+    except (KeyError, TypeError, ValueError):
+        return doc.get("source", ""), -1
+
+
+def merge_adjacent(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Group retrieved chunks that are neighbours in the source document into one passage each
+
+    Passages keep the best (lowest) retrieval rank of their chunks and are
+    returned in that order.
+    """
+    ranked = [dict(doc, rank=rank) for rank, doc in enumerate(documents)]
+    by_position = sorted((doc for doc in ranked if _position(doc)[1] >= 0), key=_position)
+    passages = [dict(doc, chunk_ids=[doc["chunk_id"]]) for doc in ranked if _position(doc)[1] < 0]
+
+    current = None
+    for doc in by_position:
+        source, chunk_id = _position(doc)
+        if current is not None and current["source_key"] == source and chunk_id == current["last_id"] + 1:
+            current["text"] = merge_texts(current["text"], doc["text"])
+            current["chunk_ids"].append(doc["chunk_id"])
+            current["rank"] = min(current["rank"], doc["rank"])
+            current["last_id"] = chunk_id
+        elif current is None or current["source_key"] != source or chunk_id != current["last_id"]:
+            current = dict(doc, chunk_ids=[doc["chunk_id"]], source_key=source, last_id=chunk_id)
+            passages.append(current)
+        # a repeated chunk_id is the same chunk retrieved twice; drop it
+
+    for passage in passages:
+        passage.pop("source_key", None)
+        passage.pop("last_id", None)
+    return sorted(passages, key=lambda passage: passage["rank"])
+
+
+def build_context(documents: List[Dict[str, Any]], model_name: str = MODEL_NAME,
+                  budget: int = 0) -> Tuple[str, Dict[str, Any]]:
+    """Pack retrieved chunks into a context string under a token budget
+
+    Returns the context and token accounting for the request.
+    """
+    encoding = get_encoding(model_name)
+    budget = budget or context_budget(model_name)
+    separator_tokens = len(encoding.encode(SEPARATOR))
+    raw_tokens = len(encoding.encode(SEPARATOR.join(doc["text"] for doc in documents)))
+
+    parts, used, used_ids = [], 0, []
+    for passage in merge_adjacent(documents):
+        tokens = encoding.encode(passage["text"])
+        cost = len(tokens) + (separator_tokens if parts else 0)
+        if used + cost <= budget:
+            parts.append(passage["text"])
+            used += cost
+            used_ids.extend(passage["chunk_ids"])
+        elif not parts:
+            # Even the best passage is over budget; keep as much of it as fits
+            parts.append(encoding.decode(tokens[:budget]))
+            used = budget
+            used_ids.extend(passage["chunk_ids"])
+
+    context = SEPARATOR.join(parts)
+    context_tokens = len(encoding.encode(context))
+    return context, {
+        "budget": budget,
+        "raw_tokens": raw_tokens,
+        "context_tokens": context_tokens,
+        "tokens_saved": max(raw_tokens - context_tokens, 0),
+        "chunks_retrieved": len(documents),
+        "chunks_used": len(used_ids),
+        "chunk_ids": used_ids,
+    }
@@ -0,0 +1,263 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+import sys
+try:
+    import fcntl
+except ImportError:  # Windows: turns are only serialized within one process
+    fcntl = None
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    CONVERSATION_HISTORY_TOKENS, CONVERSATION_SUMMARY_TOKENS, CONVERSATION_PINNED_TOKENS,
+    CONVERSATION_DIR, CONVERSATION_TTL_SECONDS
+)
+from llm.github_model_client import CONVERSATION_SYSTEM_PROMPT
+from retrieval.context_builder import SEPARATOR, count_tokens, get_encoding
+from retrieval.article_index import find_references
+
+# Short questions, or ones that refer back ("what about clause 2 of that?"), are searched
+# together with the previous question unless they name an Article or Schedule themselves
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|same|above|previous|earlier|former|latter|clause|also)\b",
+    re.IGNORECASE
+)
+FOLLOW_UP_MAX_WORDS = 5
+# Tokens of each folded answer kept in the summary
+TURN_SUMMARY_TOKENS = 60
+# Chat format overhead per message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+CONVERSATION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+# Conversations hash onto this many lock files, so there is nothing to clean up
+LOCK_STRIPES = 64
+
+
+def turn_message(question: str, context: str) -> str:
+    """User message for a turn: the context retrieved for it (if any new) and the question"""
+    if context:
+        return f"Constitutional Context:\n{context}\n\nQuestion: {question}"
+    return f"Question: {question}"
+
+
+def message_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def summarize_turn(question: str, answer: str, max_tokens: int = TURN_SUMMARY_TOKENS) -> str:
+    """One summary line for a folded turn: the question and the start of its answer"""
+    encoding = get_encoding()
+    tokens = encoding.encode(" ".join(answer.split()))
+    short_answer = encoding.decode(tokens[:max_tokens]) + ("..." if len(tokens) > max_tokens else "")
+    return f"- Q: {' '.join(question.split())} A: {short_answer}"
+
+
+class Conversation:
+    """Multi-turn state: recent turns verbatim, older turns folded into a summary
+
+    Messages are laid out so that everything before the newest question is
+    byte-for-byte what the previous turn sent: the fixed system prompt, a
+    pinned block (context chunks and summary lines carried over from folded
+    turns), then each recent turn exactly as first sent with the context
+    retrieved for it. The provider can reuse its cached prefix; it changes only
+    when turns are folded, which happens in steps (down to half of
+    CONVERSATION_HISTORY_TOKENS) rather than on every turn.
+    """
+
+    def __init__(self, conversation_id: Optional[str] = None, turns: Optional[List[Dict[str, Any]]] = None,
+                 summary: Optional[List[str]] = None, pinned: Optional[List[Dict[str, Any]]] = None,
+                 folded_turns: int = 0, updated_at: Optional[float] = None):
+        self.id = conversation_id or uuid.uuid4().hex
+        # Each turn: question, user_content (as sent), answer, chunks ({chunk_id, text}), tokens
+        self.turns: List[Dict[str, Any]] = turns or []
+        self.summary: List[str] = summary or []
+        self.pinned: List[Dict[str, Any]] = pinned or []  # {chunk_id, text, tokens}
+        self.folded_turns = folded_turns
+        self.updated_at = updated_at or time.time()
+
+    @property
+    def turn_count(self) -> int:
+        return self.folded_turns + len(self.turns)
+
+    def is_follow_up(self, question: str) -> bool:
+        if not self.turns or find_references(question):
+            return False
+        return len(question.split()) <= FOLLOW_UP_MAX_WORDS or FOLLOW_UP_PATTERN.search(question) is not None
+
+    def retrieval_query(self, question: str) -> str:
+        """Text to retrieve with: follow-ups are searched together with the previous question"""
+        if self.is_follow_up(question):
+            return f"{self.turns[-1]['question']}\n{question}"
+        return question
+
+    def known_chunk_ids(self) -> set:
+        known = {chunk["chunk_id"] for chunk in self.pinned}
+        for turn in self.turns:
+            known.update(chunk["chunk_id"] for chunk in turn["chunks"])
+        return known
+
+    def split_documents(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """(documents not yet sent in this conversation, number already in its context)"""
+        known = self.known_chunk_ids()
+        new = [doc for doc in documents if doc["chunk_id"] not in known]
+        return new, len(documents) - len(new)
+
+    def pinned_message(self) -> Optional[str]:
+        parts = []
+        if self.pinned:
+            parts.append("Constitutional context from earlier in this conversation:\n"
+                         + SEPARATOR.join(chunk["text"] for chunk in self.pinned))
+        if self.summary:
+            parts.append("Earlier questions and answers in this conversation:\n" + "\n".join(self.summary))
+        return "\n\n".join(parts) or None
+
+    def messages(self, user_content: str) -> List[Dict[str, str]]:
+        """Chat messages for the next turn, ending with `user_content` (see turn_message)"""
+        messages = [{"role": "system", "content": CONVERSATION_SYSTEM_PROMPT}]
+        pinned = self.pinned_message()
+        if pinned:
+            messages.append({"role": "system", "content": pinned})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn["user_content"]})
+            messages.append({"role": "assistant", "content": turn["answer"]})
+        messages.append({"role": "user", "content": user_content})
+        return messages
+
+    def history_tokens(self) -> int:
+        return sum(turn["tokens"] for turn in self.turns)
+
+    def add_turn(self, question: str, user_content: str, answer: str, documents: List[Dict[str, Any]]) -> int:
+        """Record an answered turn, folding older turns if over budget; returns how many were folded"""
+        self.turns.append({
+            "question": question,
+            "user_content": user_content,
+            "answer": answer,
+            "chunks": [{"chunk_id": doc["chunk_id"], "text": doc["text"]} for doc in documents],
+            "tokens": count_tokens(user_content) + count_tokens(answer) + 2 * MESSAGE_OVERHEAD_TOKENS,
+        })
+        self.updated_at = time.time()
+        if self.history_tokens() <= CONVERSATION_HISTORY_TOKENS:
+            return 0
+
+        # Fold the oldest turns until the history is down to half its budget, always keeping
+        # the latest turn verbatim
+        folded = 0
+        while len(self.turns) > 1 and self.history_tokens() > CONVERSATION_HISTORY_TOKENS // 2:
+            turn = self.turns.pop(0)
+            self.summary.append(summarize_turn(turn["question"], turn["answer"]))
+            pinned_ids = {chunk["chunk_id"] for chunk in self.pinned}
+            for chunk in turn["chunks"]:
+                if chunk["chunk_id"] not in pinned_ids:
+                    self.pinned.append(dict(chunk, tokens=count_tokens(chunk["text"])))
+            folded += 1
+        self.folded_turns += folded
+
+        # Oldest summary lines and pinned chunks go first
+        while len(self.summary) > 1 and count_tokens("\n".join(self.summary)) > CONVERSATION_SUMMARY_TOKENS:
+            self.summary.pop(0)
+        while self.pinned and sum(chunk["tokens"] for chunk in self.pinned) > CONVERSATION_PINNED_TOKENS:
+            self.pinned.pop(0)
+        return folded
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "turns": self.turns,
+            "summary": self.summary,
+            "pinned": self.pinned,
+            "folded_turns": self.folded_turns,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Conversation":
+        return cls(data["id"], data["turns"], data["summary"], data["pinned"],
+                   data.get("folded_turns", 0), data.get("updated_at"))
+
+
+class ConversationStore:
+    """Conversations by ID as JSON files, so any server worker process can continue one
+
+    Conversations idle for longer than ttl_seconds are treated as new and
+    their files removed. Hold locked() from get() to save() so two turns of
+    the same conversation, in any worker, cannot overwrite each other.
+    """
+
+    def __init__(self, directory: str = CONVERSATION_DIR, ttl_seconds: float = CONVERSATION_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._stripe_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._last_prune = 0.0
+
+    def _path(self, conversation_id: str) -> str:
+        if not CONVERSATION_ID_PATTERN.fullmatch(conversation_id):
+            raise ValueError("Conversation IDs are 1-64 letters, digits, '-' or '_'")
+        return os.path.join(self.directory, f"{conversation_id}.json")
+
+    @contextmanager
+    def locked(self, conversation_id: str):
+        """Exclusive access to one conversation, across threads and worker processes"""
+        stripe = zlib.crc32(conversation_id.encode("utf-8")) % LOCK_STRIPES
+        lock_directory = os.path.join(self.directory, ".locks")
+        os.makedirs(lock_directory, exist_ok=True)
+        with self._stripe_locks[stripe], open(os.path.join(lock_directory, f"{stripe}.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def get(self, conversation_id: str) -> Conversation:
+        """The stored conversation, or a new one with this ID"""
+        path = self._path(conversation_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                conversation = Conversation.from_dict(json.load(f))
+        except FileNotFoundError:
+            return Conversation(conversation_id)
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring unreadable conversation {conversation_id}: {str(e)}")
+            return Conversation(conversation_id)
+        if time.time() - conversation.updated_at > self.ttl_seconds:
+            return Conversation(conversation_id)
+        return conversation
+
+    def save(self, conversation: Conversation):
+        path = self._path(conversation.id)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(conversation.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.prune()
+
+    def prune(self, interval: float = 3600.0):
+        """Remove expired conversations, at most once per interval"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < interval:
+                return
+            self._last_prune = now
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(".json") and now - os.path.getmtime(path) > self.ttl_seconds:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore()
+    return _store
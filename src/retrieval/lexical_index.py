@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import LEXICAL_INDEX_DIR, BM25_K1, BM25_B
+from vector_store.records import format_match
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or shall that the their this to "
+    "was were which with what who whom how does do any such".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common stopwords removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over array-backed postings.
+
+    Term t's postings are ``doc_ids[offsets[t]:offsets[t + 1]]`` with matching
+    term frequencies in ``tfs``; IDF and per-document length normalisation are
+    precomputed so a query is a handful of vectorised adds.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 idf: np.ndarray, doc_lengths: np.ndarray, documents: List[Dict[str, Any]],
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.doc_lengths = doc_lengths
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        average_length = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+        self._length_norm = (k1 * (1 - b + b * doc_lengths / max(average_length, 1.0))).astype(np.float32)
+
+    @classmethod
+    def build(cls, documents: List[Dict[str, Any]], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        """Build from vector store style metadata dicts (each with a "text" field)"""
+        vocabulary: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int]]] = []
+        doc_lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_index, document in enumerate(documents):
+            counts = Counter(tokenize(document["text"]))
+            doc_lengths[doc_index] = sum(counts.values())
+            for term, tf in counts.items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_index, tf))
+
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(plist) for plist in postings])
+        doc_ids = np.fromiter((d for plist in postings for d, _ in plist), dtype=np.int32, count=int(offsets[-1]))
+        tfs = np.fromiter((tf for plist in postings for _, tf in plist), dtype=np.float32, count=int(offsets[-1]))
+        n = len(documents)
+        df = np.diff(offsets).astype(np.float64)
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        return cls(vocabulary, offsets, doc_ids, tfs, idf, doc_lengths, documents, k1, b)
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Rank documents for a query, returning search results like the vector store"""
+        term_ids = [self.vocabulary[term] for term in dict.fromkeys(tokenize(query)) if term in self.vocabulary]
+        if not term_ids or not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end]
+            # A term occurs at most once per posting list, so plain fancy-index adds are safe
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [format_match(self.documents[i], float(scores[i])) for i in ranked]
+
+    def save(self, directory: str = LEXICAL_INDEX_DIR):
+        """Write postings and documents, replacing any previous index"""
+        os.makedirs(directory, exist_ok=True)
+        postings_tmp = os.path.join(directory, "postings.tmp.npz")
+        np.savez(postings_tmp, offsets=self.offsets, doc_ids=self.doc_ids, tfs=self.tfs,
+                 idf=self.idf, doc_lengths=self.doc_lengths)
+        documents_tmp = os.path.join(directory, "documents.json.tmp")
+        with open(documents_tmp, 'w', encoding='utf-8') as f:
+            json.dump({"vocabulary": self.vocabulary, "documents": self.documents}, f)
+        os.replace(postings_tmp, os.path.join(directory, "postings.npz"))
+        os.replace(documents_tmp, os.path.join(directory, "documents.json"))
+
+    @classmethod
+    def load(cls, directory: str = LEXICAL_INDEX_DIR) -> "BM25Index":
+        with np.load(os.path.join(directory, "postings.npz")) as arrays:
+            offsets, doc_ids, tfs = arrays["offsets"], arrays["doc_ids"], arrays["tfs"]
+            idf, doc_lengths = arrays["idf"], arrays["doc_lengths"]
+        with open(os.path.join(directory, "documents.json"), 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        return cls(payload["vocabulary"], offsets, doc_ids, tfs, idf, doc_lengths, payload["documents"])
+
+
+_index: Optional[BM25Index] = None
+_index_mtime: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index(directory: str = LEXICAL_INDEX_DIR) -> Optional[BM25Index]:
+    """Process-wide BM25 index, reloaded when ingestion rewrites it; None before first ingestion"""
+    global _index, _index_mtime
+    try:
+        mtime = os.stat(os.path.join(directory, "documents.json")).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _index is None or _index_mtime != mtime:
+        with _index_lock:
+            if _index is None or _index_mtime != mtime:
+                _index = BM25Index.load(directory)
+                _index_mtime = mtime
+    return _index
+
+
+def lexical_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    """BM25 search over the ingested chunks"""
+    try:
+        index = get_lexical_index()
+        return index.search(query, top_k) if index is not None else []
+    except Exception as e:
+        print(f"Error in lexical search: {str(e)}")
+        return []
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """Merge ranked result lists by reciprocal rank; the fused score replaces the per-list scores"""
+    fused: Dict[Any, float] = {}
+    first_seen: Dict[Any, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            key = (result.get("source"), result.get("chunk_id"), result["text"][:64])
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank + 1)
+            first_seen.setdefault(key, result)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [dict(first_seen[key], score=fused[key]) for key in ranked]
@@ -1,62 +1,327 @@
-from typing import List, Dict, Any
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Callable, Iterator, Optional
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from vector_store.pinecone_client import similarity_search
-from llm.github_model_client import generate_response
-from config.settings import TOP_K_RESULTS
+from vector_store.vector_store import similarity_search, fetch_documents
+from llm.github_model_client import generate_response, prompt_version
+from llm.errors import LLMError
+from embeddings.embedding_service import embed_query
+from ingestion.ingestion_service import get_corpus_version
+from retrieval.answer_cache import get_answer_cache
+from retrieval.article_index import lookup_chunk_ids
+from retrieval.lexical_index import lexical_search, reciprocal_rank_fusion
+from retrieval.context_builder import build_context
+from retrieval.conversation import Conversation, turn_message, message_tokens
+from retrieval.reranker import rerank
+from utils.tracing import span, traced_iterator
+from config.settings import (
+    TOP_K_RESULTS, ANSWER_CACHE_ENABLED, ARTICLE_LOOKUP_MAX_CHUNKS,
+    RETRIEVAL_MODE, HYBRID_CANDIDATES, RRF_K, VECTOR_SEARCH_TIMEOUT,
+    RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_K
+)
+
+NO_RESULTS_ANSWER = "I couldn't find relevant information in the Constitution to answer your question."
+
+# Vector searches run here so hybrid retrieval can give up waiting on a slow backend
+_vector_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-search")
+
+def _vector_search(question: str, top_k: int) -> List[Dict[str, Any]]:
+    with span("vector_search", top_k=top_k):
+        return similarity_search(query=question, top_k=top_k)
+
+def _lexical_search(question: str, top_k: int) -> List[Dict[str, Any]]:
+    with span("lexical_search", top_k=top_k):
+        return lexical_search(question, top_k)
+
+def retrieval_top_k() -> int:
+    """Chunks retrieved per question: the re-ranker's candidate set, or what the prompt receives"""
+    return RERANK_CANDIDATES if RERANK_ENABLED else TOP_K_RESULTS
+
+def vector_candidates() -> int:
+    """Vector search results needed per question, e.g. for a bulk search ahead of retrieve_documents"""
+    if RETRIEVAL_MODE == "hybrid":
+        return max(HYBRID_CANDIDATES, retrieval_top_k())
+    return retrieval_top_k()
+
+def hybrid_search(question: str, top_k: int = TOP_K_RESULTS,
+                  vector_docs: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Fuse BM25 and vector results, falling back to BM25 alone if vector search fails or is slow
+
+    Pass vector_docs to fuse with vector results that were already fetched.
+    """
+    candidates = max(HYBRID_CANDIDATES, top_k)
+    vector_future = None
+    if vector_docs is None:
+        # Copy the context so the vector_search span joins this request's trace
+        vector_future = _vector_executor.submit(contextvars.copy_context().run, _vector_search, question, candidates)
+    lexical_docs = _lexical_search(question, candidates)
+    if vector_future is not None:
+        try:
+            vector_docs = vector_future.result(timeout=VECTOR_SEARCH_TIMEOUT)
+        except FutureTimeoutError:
+            print(f"Vector search exceeded {VECTOR_SEARCH_TIMEOUT}s, answering from the lexical index")
+            vector_docs = []
+
+    if not vector_docs:
+        return lexical_docs[:top_k]
+    if not lexical_docs:
+        return vector_docs[:top_k]
+    return reciprocal_rank_fusion([vector_docs, lexical_docs], top_k, k=RRF_K)
+
+def retrieve_documents(question: str, vector_docs: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Fetch the chunks of any Article/Schedule the question names, else search
+
+    vector_docs are vector search results already fetched for the question
+    (vector_candidates() of them), e.g. by a bulk search. With RERANK_ENABLED
+    the searched candidates are re-ranked and the best RERANK_TOP_K kept.
+    """
+    with span("retrieval", mode=RETRIEVAL_MODE) as attributes:
+        chunk_ids = lookup_chunk_ids(question, ARTICLE_LOOKUP_MAX_CHUNKS)
+        if chunk_ids:
+            with span("article_lookup", chunks=len(chunk_ids)):
+                documents = fetch_documents(chunk_ids)
+            if documents:
+                attributes["mode"] = "article"
+                return documents
+
+        top_k = retrieval_top_k()
+        if RETRIEVAL_MODE == "lexical":
+            documents = _lexical_search(question, top_k)
+        elif RETRIEVAL_MODE == "hybrid":
+            documents = hybrid_search(question, top_k, vector_docs)
+        elif vector_docs is not None:
+            documents = vector_docs[:top_k]
+        else:
+            documents = _vector_search(question, top_k)
+
+        if RERANK_ENABLED and documents:
+            with span("rerank") as rerank_attributes:
+                documents, stats = rerank(question, documents, RERANK_TOP_K)
+                rerank_attributes.update(stats)
+        return documents
 
 def prepare_context(documents: List[Dict[str, Any]]) -> str:
     """Prepare context from retrieved documents"""
-    context_parts = []
-    for doc in documents:
-        context_parts.append(doc["text"])
-    
-    # Join all contexts with separators
-    context = "\n\n---\n\n".join(context_parts)
-    
-    # Limit context length if needed (adjust based on your model's limits)
-    max_context_length = 4000  # Adjust based on your model
-    if len(context) > max_context_length:
-        context = context[:max_context_length] + "..."
-    
+    context, _ = build_context(documents)
     return context
 
-def query_rag(question: str) -> Dict[str, Any]:
-    """Main RAG query function"""
+def format_sources(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Summarize retrieved documents for display as answer sources"""
+    sources = []
+    for doc in documents:
+        source = {
+            "text": doc["text"][:200] + "...",
+            "score": doc["score"],
+            "chunk_id": doc["chunk_id"]
+        }
+        if "rerank_score" in doc:
+            source["rerank_score"] = doc["rerank_score"]
+        sources.append(source)
+    return sources
+
+def answer_cache_enabled() -> bool:
+    """The semantic answer cache matches dense query embeddings, which lexical retrieval never computes"""
+    return ANSWER_CACHE_ENABLED and RETRIEVAL_MODE != "lexical"
+
+def answer_cache_version() -> str:
+    """Cached answers are only valid for the same corpus, prompt and retrieval settings"""
+    version = f"{get_corpus_version()}:{prompt_version()}:{RETRIEVAL_MODE}:{TOP_K_RESULTS}"
+    if RERANK_ENABLED:
+        version += f":{RERANK_MODEL}:{RERANK_CANDIDATES}:{RERANK_TOP_K}"
+    return version
+
+def llm_error_response(error: LLMError, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response for a question whose sources were found but whose answer could not be generated"""
+    print(f"LLM error ({type(error).__name__}): {str(error)}")
+    return {
+        "answer": "",
+        "sources": format_sources(documents),
+        "error": str(error),
+        "error_type": type(error).__name__
+    }
+
+def is_cacheable(answer: str) -> bool:
+    return bool(answer)
+
+def _store_streamed_answer(fragments: Iterator[str], question: str, query_embedding: List[float],
+                           response: Dict[str, Any], version: str) -> Iterator[str]:
+    """Pass streamed fragments through, caching the full answer once it completes"""
+    parts = []
+    for fragment in fragments:
+        parts.append(fragment)
+        yield fragment
+    answer = "".join(parts)
+    if is_cacheable(answer):
+        get_answer_cache().store(question, query_embedding, dict(response, answer=answer), version)
+
+def query_rag(question: str, stream: bool = False, conversation: Optional[Conversation] = None) -> Dict[str, Any]:
+    """Main RAG query function
+
+    With stream=True, "answer" is a generator of text fragments; sources are
+    available immediately. With a conversation, the question is answered as
+    its next turn and recorded in it (see _query_conversation).
+    """
+    with span("rag.query", stream=stream, conversation=conversation is not None):
+        if conversation is not None:
+            return _query_conversation(question, stream, conversation)
+        return _query_rag(question, stream)
+
+def _record_streamed_turn(fragments: Iterator[str], finish: Callable[[str], None]) -> Iterator[str]:
+    """Pass streamed fragments through, recording the turn once the answer is complete"""
+    parts = []
+    for fragment in fragments:
+        parts.append(fragment)
+        yield fragment
+    finish("".join(parts))
+
+def _query_conversation(question: str, stream: bool, conversation: Conversation) -> Dict[str, Any]:
+    """Answer a question as the next turn of a conversation
+
+    Follow-ups are retrieved together with the previous question, chunks the
+    conversation already sent are not sent again, and the earlier turns go
+    along as chat history (see Conversation). The answer cache is not used:
+    the same words can mean something else later in a conversation.
+    "turn_stats" holds the turn's token and latency accounting; for a
+    stream it is complete once the answer has been consumed.
+    """
     try:
+        start = time.perf_counter()
+        follow_up = conversation.is_follow_up(question)
+        relevant_docs = retrieve_documents(conversation.retrieval_query(question))
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        if not relevant_docs and not conversation.turns:
+            return {
+                "answer": iter([NO_RESULTS_ANSWER]) if stream else NO_RESULTS_ANSWER,
+                "sources": [],
+                "error": None
+            }
+
+        new_docs, reused = conversation.split_documents(relevant_docs)
+        context, context_stats = "", None
+        if new_docs:
+            with span("context") as attributes:
+                context, context_stats = build_context(new_docs)
+                attributes["tokens"] = context_stats["context_tokens"]
+            sent_ids = set(context_stats["chunk_ids"])
+            new_docs = [doc for doc in new_docs if doc["chunk_id"] in sent_ids]
+        user_content = turn_message(question, context)
+        messages = conversation.messages(user_content)
+        prefix_tokens = message_tokens(messages[:-1])
+        turn_stats = {
+            "turn": conversation.turn_count + 1,
+            "follow_up": follow_up,
+            "prompt_tokens": prefix_tokens + message_tokens(messages[-1:]),
+            "prefix_tokens": prefix_tokens,  # unchanged since the previous turn unless turns were folded
+            "history_turns": len(conversation.turns),
+            "history_tokens": conversation.history_tokens(),
+            "summary_lines": len(conversation.summary),
+            "pinned_chunks": len(conversation.pinned),
+            "context_tokens": context_stats["context_tokens"] if context_stats else 0,
+            "new_chunks": len(new_docs),
+            "reused_chunks": reused,
+            "retrieval_ms": retrieval_ms,
+        }
+
+        usage: Dict[str, Any] = {}
+        llm_start = time.perf_counter()
+        try:
+            if stream:
+                answer = traced_iterator("llm", generate_response(question, context, stream=True, messages=messages,
+                                                                  usage=usage), stream=True)
+            else:
+                with span("llm"):
+                    answer = generate_response(question, context, messages=messages, usage=usage)
+        except LLMError as e:
+            return llm_error_response(e, relevant_docs)
+
+        def finish(answer_text: str):
+            turn_stats["llm_ms"] = (time.perf_counter() - llm_start) * 1000
+            turn_stats["total_ms"] = (time.perf_counter() - start) * 1000
+            if usage:
+                turn_stats["usage"] = usage
+                turn_stats["cached_tokens"] = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            turn_stats["folded_turns"] = conversation.add_turn(question, user_content, answer_text, new_docs)
+
+        response = {
+            "answer": answer,
+            "sources": format_sources(relevant_docs),
+            "context_stats": context_stats,
+            "conversation_id": conversation.id,
+            "turn_stats": turn_stats,
+            "error": None
+        }
+        if stream:
+            response["answer"] = _record_streamed_turn(answer, finish)
+        else:
+            finish(answer)
+        return response
+
+    except Exception as e:
+        return {
+            "answer": "An error occurred while processing your question.",
+            "sources": [],
+            "error": str(e)
+        }
+
+def _query_rag(question: str, stream: bool) -> Dict[str, Any]:
+    try:
+        # Step 0: Answer near-identical repeat questions from the cache
+        query_embedding = None
+        if answer_cache_enabled():
+            with span("embedding"):
+                query_embedding = embed_query(question)
+            cache_version = answer_cache_version()
+            with span("answer_cache") as attributes:
+                cached = get_answer_cache().lookup(question, query_embedding, cache_version)
+                attributes["hit"] = cached is not None
+            if cached is not None:
+                cached["cached"] = True
+                if stream:
+                    cached["answer"] = iter([cached["answer"]])
+                return cached
+
         # Step 1: Retrieve relevant documents
-        relevant_docs = similarity_search(
-            query=question,
-            top_k=TOP_K_RESULTS
-        )
+        relevant_docs = retrieve_documents(question)
         
         if not relevant_docs:
+            answer = NO_RESULTS_ANSWER
             return {
-                "answer": "I couldn't find relevant information in the Constitution to answer your question.",
+                "answer": iter([answer]) if stream else answer,
                 "sources": [],
                 "error": None
             }
         
         # Step 2: Prepare context from retrieved documents
-        context = prepare_context(relevant_docs)
+        with span("context") as attributes:
+            context, context_stats = build_context(relevant_docs)
+            attributes["tokens"] = context_stats["context_tokens"]
         
-        # Step 3: Generate answer using LLM
-        answer = generate_response(question, context)
+        # Step 3: Generate answer using LLM; a streamed answer is timed as it is consumed
+        try:
+            if stream:
+                answer = traced_iterator("llm", generate_response(question, context, stream=True), stream=True)
+            else:
+                with span("llm"):
+                    answer = generate_response(question, context)
+        except LLMError as e:
+            return llm_error_response(e, relevant_docs)
         
         # Step 4: Prepare response
         response = {
             "answer": answer,
-            "sources": [
-                {
-                    "text": doc["text"][:200] + "...",
-                    "score": doc["score"],
-                    "chunk_id": doc["chunk_id"]
-                }
-                for doc in relevant_docs
-            ],
+            "sources": format_sources(relevant_docs),
+            "context_stats": context_stats,
             "error": None
         }
+
+        if query_embedding is not None:
+            if stream:
+                response["answer"] = _store_streamed_answer(answer, question, query_embedding, dict(response), cache_version)
+            elif is_cacheable(answer):
+                get_answer_cache().store(question, query_embedding, response, cache_version)
         
         return response
         
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    RERANK_MODEL, RERANK_TOP_K, RERANK_BATCH_SIZE, RERANK_TIMEOUT_MS, RERANK_CACHE_SIZE,
+    EMBEDDING_DEVICE, EMBEDDING_THREADS
+)
+from embeddings.embedding_cache import cache_key
+
+# Scoring runs here so a request can stop waiting once the latency budget is spent
+_rerank_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Return the shared cross-encoder, loading it once per process"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # Deferred: sentence_transformers pulls in torch and transformers
+                from sentence_transformers import CrossEncoder
+
+                if EMBEDDING_THREADS:
+                    import torch
+                    torch.set_num_threads(EMBEDDING_THREADS)
+                start = time.perf_counter()
+                _model = CrossEncoder(RERANK_MODEL, device=EMBEDDING_DEVICE)
+                print(f"Loaded cross-encoder {RERANK_MODEL} in {time.perf_counter() - start:.2f}s")
+    return _model
+
+
+class ScoreCache:
+    """In-memory LRU of cross-encoder scores keyed by (model, query, chunk text)"""
+
+    def __init__(self, max_entries: int = RERANK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> List[Optional[float]]:
+        with self._lock:
+            scores = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            found = sum(score is not None for score in scores)
+            self.hits += found
+            self.misses += len(keys) - found
+            return scores
+
+    def put_many(self, keys: List[str], scores: List[float]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._scores), "hits": self.hits, "misses": self.misses}
+
+
+_score_cache = ScoreCache()
+
+
+def get_score_cache() -> ScoreCache:
+    return _score_cache
+
+
+def warm_up_reranker() -> None:
+    """Load the cross-encoder and score one pair so the first request stays within budget"""
+    get_cross_encoder().predict([("warm up", "warm up")], show_progress_bar=False)
+
+
+def score_key(question: str, text: str) -> str:
+    return cache_key(RERANK_MODEL, f"{' '.join(question.lower().split())}\0{text}")
+
+
+def _score_pairs(question: str, texts: List[str], keys: List[str], deadline: float) -> List[float]:
+    """Score texts in batches, caching each batch; stops early once the deadline has passed"""
+    model = get_cross_encoder()
+    scored: List[float] = []
+    for start in range(0, len(texts), RERANK_BATCH_SIZE):
+        if time.perf_counter() > deadline:
+            break
+        batch = texts[start:start + RERANK_BATCH_SIZE]
+        scores = model.predict([(question, text) for text in batch], batch_size=RERANK_BATCH_SIZE,
+                               show_progress_bar=False)
+        scores = [float(score) for score in scores]
+        _score_cache.put_many(keys[start:start + len(batch)], scores)
+        scored.extend(scores)
+    return scored
+
+
+def rerank(question: str, documents: List[Dict[str, Any]], top_k: int = RERANK_TOP_K,
+           timeout_ms: float = RERANK_TIMEOUT_MS) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Order documents by cross-encoder relevance to the question and keep the best top_k
+
+    Scores come from the cache where possible. If the rest cannot be scored
+    within timeout_ms, or scoring fails, the retrieval order is kept; scores
+    computed by then are still cached for the next request. Returns the
+    documents and stats for tracing.
+    """
+    stats = {"candidates": len(documents), "cached": 0, "scored": 0, "fallback": False}
+    if len(documents) <= 1:
+        return documents[:top_k], stats
+
+    start = time.perf_counter()
+    deadline = start + timeout_ms / 1000
+    keys = [score_key(question, doc["text"]) for doc in documents]
+    scores = _score_cache.get_many(keys)
+    missing = [i for i, score in enumerate(scores) if score is None]
+    stats["cached"] = len(documents) - len(missing)
+
+    if missing:
+        future = _rerank_executor.submit(
+            _score_pairs, question, [documents[i]["text"] for i in missing], [keys[i] for i in missing], deadline
+        )
+        try:
+            new_scores = future.result(timeout=max(deadline - time.perf_counter(), 0))
+        except FutureTimeoutError:
+            new_scores = []
+        except Exception as e:
+            # A model that fails to load or score must not fail the question
+            print(f"Re-ranking failed ({str(e)}), keeping the retrieval order")
+            stats["fallback"] = True
+            return documents[:top_k], stats
+        stats["scored"] = len(new_scores)
+        if len(new_scores) < len(missing):
+            print(f"Re-ranking exceeded {timeout_ms:.0f}ms, keeping the retrieval order")
+            stats["fallback"] = True
+            return documents[:top_k], stats
+        for i, score in zip(missing, new_scores):
+            scores[i] = score
+
+    ranked = sorted(zip(scores, range(len(documents))), key=lambda pair: (-pair[0], pair[1]))
+    return [dict(documents[i], rerank_score=score) for score, i in ranked[:top_k]], stats
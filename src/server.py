@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+JSON HTTP API for the RAG pipeline, served by several worker processes:
+
+    python src/server.py --workers 4 --port 8000
+    curl -s localhost:8000/query -d '{"question": "What does Article 21 say?"}'
+
+The master process loads the embedding model, checks the vector store and
+ingests once, then forks the workers. Workers share the model weights and the
+memory-mapped indexes copy-on-write instead of each loading their own copy.
+
+Endpoints:
+    POST /query    {"question": "...", "conversation_id": "..."} -> {"answer", "sources", "error", ...}
+    GET  /healthz  liveness: the worker process is up
+    GET  /readyz   readiness: 200 once the worker is warmed up, 503 before
+    GET  /metrics  stage latency histograms of the worker that answered
+
+Each worker answers at most SERVER_THREADS questions at once and queues up to
+SERVER_MAX_PENDING more; beyond that it answers 503 with a Retry-After header.
+Questions sent with a client-chosen conversation_id are answered as follow-ups
+in that conversation, whichever worker receives them.
+"""
+
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils.warmup import WarmupState, pipeline_steps, worker_steps, ingest_documents, connect_vector_store
+from config.settings import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_THREADS, SERVER_MAX_PENDING,
+    SERVER_MAX_QUESTION_CHARS, EMBEDDING_THREADS
+)
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 64 * 1024
+# Seconds clients are asked to wait after a 503
+RETRY_AFTER_SECONDS = 1
+# Seconds to wait before replacing a worker that exited, so a crash loop does not spin
+RESPAWN_DELAY = 1.0
+LISTEN_BACKLOG = 256
+
+
+class RequestLimiter:
+    """Caps questions answered at once and rejects new ones once the wait queue is full"""
+
+    def __init__(self, max_concurrency: int, max_pending: int):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.served = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Wait for a slot; False (without waiting) if max_pending requests are already queued"""
+        with self._lock:
+            if self.waiting >= self.max_pending:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": self.in_flight, "pending": self.waiting,
+                    "served": self.served, "rejected": self.rejected}
+
+
+def response_status(response: Dict[str, Any]) -> int:
+    """HTTP status for a query_rag response"""
+    if not response.get("error"):
+        return 200
+    error_type = response.get("error_type")
+    if error_type in ("LLMRateLimitError", "LLMUnavailableError"):
+        return 503
+    return 502 if error_type else 500
+
+
+class RAGServer(ThreadingHTTPServer):
+    """One worker's HTTP server, accepting on a socket bound by the master"""
+    daemon_threads = True
+
+    def __init__(self, sock: socket.socket, worker_id: int, warmup: WarmupState, limiter: RequestLimiter):
+        super().__init__(sock.getsockname()[:2], RAGRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.worker_id = worker_id
+        self.warmup = warmup
+        self.limiter = limiter
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; every response sets Content-Length
+    server: RAGServer
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/healthz":
+            self._send_json(200, {"status": "ok", "worker": self.server.worker_id, "pid": os.getpid()})
+        elif path == "/readyz":
+            state = self.server.warmup.snapshot()
+            state.update(self.server.limiter.stats(), worker=self.server.worker_id)
+            self._send_json(200 if self.server.warmup.ready else 503, state)
+        elif path == "/metrics":
+            from utils.tracing import render_prometheus
+            self._send(200, render_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"Unknown path: {path}"})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path != "/query":
+            self._discard_body()
+            self._send_json(404, {"error": f"Unknown path: {path}"})
+            return
+        question, conversation_id, status, error = self._read_question()
+        if error:
+            self._send_json(status, {"error": error})
+            return
+        if not self.server.warmup.ready:
+            self._send_json(503, {"error": "The server is still warming up"}, retry_after=True)
+            return
+
+        limiter = self.server.limiter
+        if not limiter.acquire():
+            self._send_json(503, {"error": "Too many pending questions, try again shortly"}, retry_after=True)
+            return
+        try:
+            from retrieval.rag_pipeline import query_rag
+            from retrieval.conversation import get_conversation_store
+
+            if conversation_id is None:
+                response = query_rag(question)
+            else:
+                store = get_conversation_store()
+                with store.locked(conversation_id):
+                    conversation = store.get(conversation_id)
+                    response = query_rag(question, conversation=conversation)
+                    if not response["error"]:
+                        store.save(conversation)
+        except Exception as e:
+            print(f"Worker {self.server.worker_id} failed to answer a question: {str(e)}")
+            traceback.print_exc()
+            response = {"answer": "An error occurred while processing your question.", "sources": [],
+                        "error": f"Internal server error ({type(e).__name__})"}
+        finally:
+            limiter.release()
+        self._send_json(response_status(response), response)
+
+    def _read_question(self) -> Tuple[Optional[str], Optional[str], int, Optional[str]]:
+        """(question, conversation ID or None, 200, None) for a valid body, else (None, None, status, error)"""
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            self.close_connection = True
+            return None, None, 400, "Invalid Content-Length"
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return None, None, 413, f"Request body larger than {MAX_BODY_BYTES} bytes"
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            return None, None, 400, "Request body is not valid JSON"
+        question = payload.get("question") if isinstance(payload, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            return None, None, 400, 'Expected a JSON object with a non-empty "question" string'
+        if len(question) > SERVER_MAX_QUESTION_CHARS:
+            return None, None, 400, f"Question longer than {SERVER_MAX_QUESTION_CHARS} characters"
+        from retrieval.conversation import CONVERSATION_ID_PATTERN
+
+        conversation_id = payload.get("conversation_id")
+        if conversation_id is not None and not (isinstance(conversation_id, str)
+                                                and CONVERSATION_ID_PATTERN.fullmatch(conversation_id)):
+            return None, None, 400, '"conversation_id" must be 1-64 letters, digits, "-" or "_"'
+        return question.strip(), conversation_id, 200, None
+
+    def _discard_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = 0
+        if 0 < length <= MAX_BODY_BYTES:
+            self.rfile.read(length)
+        elif length:
+            self.close_connection = True
+
+    def _send_json(self, status: int, payload: Dict[str, Any], retry_after: bool = False):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self._send(status, body, "application/json", retry_after)
+
+    def _send(self, status: int, body: bytes, content_type: str, retry_after: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after:
+            self.send_header("Retry-After", str(RETRY_AFTER_SECONDS))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _fork() -> int:
+    # Flush first, or the child inherits (and prints again) whatever is still buffered
+    sys.stdout.flush()
+    sys.stderr.flush()
+    return os.fork()
+
+
+def run_ingestion(constitution_path: Optional[str] = None):
+    """Ingest in a short-lived child process
+
+    Encoding documents in the master would start the model's thread pools
+    (OpenMP, ONNX Runtime), which do not survive being forked into workers.
+    """
+    if not hasattr(os, "fork"):
+        ingest_documents(constitution_path)
+        return
+    pid = _fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            ingest_documents(constitution_path)
+            exit_code = 0
+        except Exception as e:
+            print(f"Ingestion failed: {str(e)}")
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            os._exit(exit_code)
+    _, status = os.waitpid(pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError("Failed to initialize vector store")
+
+
+def run_worker(sock: socket.socket, worker_id: int, workers: int):
+    """Warm up this process's caches, then serve requests on the shared socket until stopped"""
+    from embeddings.embedding_service import use_process_query_cache
+    from retrieval.answer_cache import use_process_answer_cache
+
+    if workers > 1:
+        use_process_query_cache(f"worker-{worker_id}")
+        use_process_answer_cache(f"worker-{worker_id}")
+        # Split the cores between workers rather than every worker using all of them
+        if not EMBEDDING_THREADS and "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    warmup = WarmupState(worker_steps())
+    server = RAGServer(sock, worker_id, warmup, RequestLimiter(SERVER_THREADS, SERVER_MAX_PENDING))
+    # Accept connections straight away so /healthz and /readyz answer during the warm-up
+    warmup.start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"Worker {worker_id} (pid {os.getpid()}) serving")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = SERVER_WORKERS,
+          ingest: bool = True, constitution_path: Optional[str] = None):
+    """Load the shared state once, then serve from `workers` forked processes"""
+    steps = pipeline_steps(ingest=False)
+    if ingest:
+        steps.append(("ingestion", lambda: run_ingestion(constitution_path)))
+        # Ingestion wrote from a child process; reopen the vector store here so the workers
+        # inherit the new vectors rather than each loading its own copy
+        steps.append(("vector store reload", connect_vector_store))
+    if not WarmupState(steps).start().wait():
+        sys.exit(1)
+
+    sock = socket.create_server((host, port), backlog=LISTEN_BACKLOG)
+    print(f"Listening on http://{host}:{sock.getsockname()[1]} with {workers} worker(s)")
+    if workers <= 1 or not hasattr(os, "fork"):
+        run_worker(sock, 0, 1)
+        return
+
+    # Keep the loaded objects out of the collector's reach so it does not write to
+    # (and un-share) their pages in the workers
+    gc.freeze()
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(worker_id: int):
+        pid = _fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master stops the workers
+                run_worker(sock, worker_id, workers)
+                exit_code = 0
+            except Exception:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                os._exit(exit_code)
+        children[pid] = worker_id
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        worker_id = children.pop(pid, None)
+        if worker_id is None or stopping:
+            continue
+        print(f"Worker {worker_id} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        time.sleep(RESPAWN_DELAY)
+        if not stopping:
+            spawn(worker_id)
+    sock.close()
+    print("Server stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the RAG pipeline over HTTP from several processes")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Worker processes")
+    parser.add_argument("--constitution", help="Constitution file to ingest (default: src/documents/COI.pdf)")
+    parser.add_argument("--no-ingest", action="store_true", help="Serve the existing index without ingesting")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, ingest=not args.no_ingest, constitution_path=args.constitution)
+
+
+if __name__ == "__main__":
+    main()
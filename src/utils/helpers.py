@@ -9,10 +9,12 @@ def ensure_directory_exists(directory_path: str):
 def validate_environment_variables() -> Dict[str, bool]:
     """Validate that all required environment variables are set"""
     required_vars = [
-        "PINECONE_API_KEY",
         "GITHUB_TOKEN",
         "GITHUB_MODEL_ENDPOINT"
     ]
+    # The local vector store runs offline and needs no Pinecone key
+    if os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower() == "pinecone":
+        required_vars.insert(0, "PINECONE_API_KEY")
     
     validation_results = {}
     for var in required_vars:
@@ -0,0 +1,207 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Iterator, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import TRACING_ENABLED, TRACE_LOG_PATH
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts for export plus a window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 2048):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p / 100.0 * len(samples)))] * 1000 if samples else 0.0
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+        }
+
+
+class _Trace:
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.spans: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+_log_lock = threading.Lock()
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("rag_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("rag_span", default=None)
+
+
+def record_latency(stage: str, seconds: float):
+    """Add a duration to a stage's histogram"""
+    with _histograms_lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = LatencyHistogram()
+        histogram.observe(seconds)
+
+
+def _write_trace_log(trace: _Trace):
+    if not TRACE_LOG_PATH:
+        return
+    with trace.lock:
+        spans = sorted(trace.spans, key=lambda span: span["start"])
+    line = json.dumps({"trace_id": trace.trace_id, "spans": spans}, default=str)
+    with _log_lock:
+        with open(TRACE_LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a stage of the request path
+
+    The outermost span starts a trace; when it ends, the whole trace is
+    written to TRACE_LOG_PATH as one JSON line. Yields a dict that callers
+    may add attributes to.
+    """
+    if not TRACING_ENABLED:
+        yield attributes
+        return
+    trace = _current_trace.get()
+    root = trace is None
+    if root:
+        trace = _Trace()
+    trace_token = _current_trace.set(trace)
+    span_id = uuid.uuid4().hex[:8]
+    parent = _current_span.get()
+    span_token = _current_span.set(span_id)
+    start_wall = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+        except ValueError:
+            pass  # a traced generator closed from another context
+        record_latency(name, elapsed)
+        record = {"span_id": span_id, "parent_id": parent, "name": name, "start": start_wall,
+                  "duration_ms": round(elapsed * 1000, 3)}
+        if attributes:
+            record["attributes"] = attributes
+        if error:
+            record["error"] = error
+        with trace.lock:
+            trace.spans.append(record)
+        if root:
+            _write_trace_log(trace)
+
+
+def traced_iterator(name: str, iterator: Iterator, **attributes) -> Iterator:
+    """Wrap a generator so the span covers its consumption, recording time to the first item"""
+    with span(name, **attributes) as span_attributes:
+        start = time.perf_counter()
+        first = True
+        for item in iterator:
+            if first:
+                first = False
+                span_attributes["first_item_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            yield item
+
+
+def get_stage_metrics() -> Dict[str, Dict[str, float]]:
+    """Count, mean and p50/p95/p99 latency per stage"""
+    with _histograms_lock:
+        return {stage: histogram.summary() for stage, histogram in sorted(_histograms.items())}
+
+
+def reset_stage_metrics():
+    """Forget all recorded latencies"""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def render_prometheus() -> str:
+    """Stage latency histograms in the Prometheus text exposition format"""
+    lines = [
+        "# HELP rag_stage_duration_seconds Latency of each stage of the RAG request path",
+        "# TYPE rag_stage_duration_seconds histogram",
+    ]
+    with _histograms_lock:
+        for stage, histogram in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.bucket_counts):
+                cumulative += count
+                lines.append(f'rag_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'rag_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'rag_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'rag_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics on a background thread (once per process)"""
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Could not start metrics server on port {port}: {str(e)}")
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+        return _metrics_server
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helpers import validate_environment_variables, print_validation_results
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, RERANK_ENABLED
+
+CONSTITUTION_PATHS = [
+    "src/documents/COI.pdf"
+]
+
+
+class WarmupState:
+    """Runs named start-up steps once, in order, on a background thread
+
+    The UI polls `snapshot()` to show progress while the steps run; a failing
+    step stops the warm-up and is reported with its error.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], object]]]):
+        self.steps = steps
+        self.status = "pending"  # pending, running, ready or failed
+        self.current_step: Optional[str] = None
+        self.durations: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.failed_step: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WarmupState":
+        with self._lock:
+            if self._thread is None:
+                self.status = "running"
+                self.started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self._run, name="rag-warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        for name, step in self.steps:
+            self.current_step = name
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.durations[name] = time.perf_counter() - start
+                self.failed_step = name
+                self.error = str(e) or type(e).__name__
+                self.status = "failed"
+                print(f"Warm-up step '{name}' failed: {self.error}")
+                traceback.print_exc()
+                break
+            self.durations[name] = time.perf_counter() - start
+            print(f"Warm-up step '{name}' done in {self.durations[name]:.2f}s")
+        else:
+            self.status = "ready"
+        self.current_step = None
+        self.finished_at = time.perf_counter()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up has finished; True if it succeeded"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.status == "ready"
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "status": self.status,
+            "current_step": self.current_step,
+            "completed": len(self.durations) - (1 if self.failed_step else 0),
+            "total": len(self.steps),
+            "durations": dict(self.durations),
+            "failed_step": self.failed_step,
+            "error": self.error,
+            "elapsed": self.elapsed(),
+        }
+
+
+# Start-up steps shared by the Streamlit app and the HTTP server. Heavy modules
+# are imported inside each step so callers can render or bind a port first.
+
+def check_environment():
+    validation_results = validate_environment_variables()
+    if not all(validation_results.values()):
+        print_validation_results(validation_results)
+        missing = [var for var, is_set in validation_results.items() if not is_set]
+        raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
+
+
+def import_pipeline():
+    import retrieval.rag_pipeline  # noqa: F401
+
+
+def load_embedding_model():
+    from embeddings.embedding_service import get_embeddings
+    get_embeddings()
+
+
+def warm_up_embedding_model():
+    from embeddings.embedding_service import warm_up_embeddings
+    warm_up_embeddings()
+
+
+def connect_vector_store():
+    from vector_store.vector_store import check_health
+    health = check_health()
+    if not health.get("healthy", True):
+        raise RuntimeError(f"Vector store is not reachable: {health['error']}")
+
+
+def ingest_documents(constitution_path: Optional[str] = None):
+    """Process and store only what changed since the last ingestion"""
+    from ingestion.ingestion_service import ingest_constitution
+    paths = [constitution_path] if constitution_path else CONSTITUTION_PATHS
+    constitution_path = next((path for path in paths if os.path.exists(path)), None)
+    if constitution_path is None:
+        raise RuntimeError("Constitution file not found! Add the Constitution of India file to "
+                           + " or ".join(paths))
+    if not ingest_constitution(constitution_path, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+        raise RuntimeError("Failed to initialize vector store")
+
+
+def open_caches():
+    """Open the on-disk caches and indexes the first question would otherwise load"""
+    from embeddings.embedding_service import get_embedding_cache
+    from retrieval.answer_cache import get_answer_cache
+    from retrieval.article_index import load_article_index
+    from retrieval.lexical_index import get_lexical_index
+    from retrieval.context_builder import get_encoding
+    from vector_store.chunk_store import get_chunk_store
+    from retrieval.rag_pipeline import answer_cache_enabled
+    from config.settings import RETRIEVAL_MODE
+    get_embedding_cache("queries")
+    if answer_cache_enabled():
+        get_answer_cache()
+    if RETRIEVAL_MODE != "vector":
+        get_lexical_index()
+    load_article_index()
+    get_chunk_store()
+    get_encoding()
+
+
+def load_reranker():
+    from retrieval.reranker import warm_up_reranker
+    warm_up_reranker()
+
+
+def pipeline_steps(ingest: bool = True, constitution_path: Optional[str] = None
+                   ) -> List[Tuple[str, Callable[[], object]]]:
+    """Load the model, check the vector store and ingest; done once per host process"""
+    steps = [
+        ("environment", check_environment),
+        ("import pipeline", import_pipeline),
+        ("embedding model", load_embedding_model),
+        ("vector store", connect_vector_store),
+    ]
+    if ingest:
+        steps.append(("ingestion", lambda: ingest_documents(constitution_path)))
+    return steps
+
+
+def worker_steps() -> List[Tuple[str, Callable[[], object]]]:
+    """Per-process state: a first encode, caches and indexes, and the re-ranker"""
+    steps = [
+        ("embedding warm-up", warm_up_embedding_model),
+        ("caches and indexes", open_caches),
+    ]
+    if RERANK_ENABLED:
+        steps.append(("re-ranker", load_reranker))
+    return steps
@@ -0,0 +1,578 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple
+import numpy as np
+import sys
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process write lock, run a single writer
+    fcntl = None
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    ANN_INDEX_DIR, ANN_NLIST, ANN_PQ_SUBVECTORS, ANN_NPROBE, ANN_REFINE_FACTOR,
+    ANN_TRAIN_MIN_VECTORS, ANN_RETRAIN_GROWTH
+)
+
+PQ_CENTROIDS = 256  # one uint8 code per subvector
+KMEANS_ITERATIONS = 12
+# Training sample per coarse centroid (k-means needs a few dozen points per cluster)
+TRAIN_POINTS_PER_LIST = 40
+PQ_TRAIN_POINTS = PQ_CENTROIDS * 64
+# Rows per distance computation while training, encoding and exact scanning
+BLOCK_SIZE = 16384
+DEFAULT_NAMESPACE = "default"
+# Rebuild (dropping deleted rows) once this fraction of rows is deleted
+MAX_DELETED_FRACTION = 0.25
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def parse_filter(filter: Optional[Dict[str, Any]]) -> Tuple[Optional[Set[str]], Optional[Tuple[int, int]]]:
+    """Document types and (inclusive) year range selected by a Pinecone-style metadata filter
+
+    Supports ``doc_type`` (a value, ``$eq`` or ``$in``) and ``year`` (a value,
+    ``$eq``, ``$gte``, ``$gt``, ``$lte``, ``$lt``), e.g.
+    ``{"doc_type": {"$in": ["judgment", "amendment"]}, "year": {"$gte": 1976}}``.
+    """
+    namespaces, years = None, None
+    for field, condition in (filter or {}).items():
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if field == "doc_type":
+            unknown = set(condition) - {"$eq", "$in"}
+            values = list(condition.get("$in", [])) + ([condition["$eq"]] if "$eq" in condition else [])
+            namespaces = {str(value) for value in values}
+        elif field == "year":
+            unknown = set(condition) - {"$eq", "$gte", "$gt", "$lte", "$lt"}
+            low, high = -2 ** 31, 2 ** 31 - 1
+            if "$eq" in condition:
+                low = high = int(condition["$eq"])
+            low = max(low, int(condition.get("$gte", low)), int(condition.get("$gt", low - 1)) + 1)
+            high = min(high, int(condition.get("$lte", high)), int(condition.get("$lt", high + 1)) - 1)
+            years = (low, high)
+        else:
+            raise ValueError(f"Unsupported filter field: {field} (use doc_type or year)")
+        if unknown:
+            raise ValueError(f"Unsupported filter operators for {field}: {', '.join(sorted(unknown))}")
+    return namespaces, years
+
+
+def metadata_namespace(metadata: Dict[str, Any]) -> str:
+    return str(metadata.get("doc_type") or DEFAULT_NAMESPACE)
+
+
+def metadata_year(metadata: Dict[str, Any]) -> int:
+    """The metadata's year, 0 when absent (never matches a year filter)"""
+    try:
+        return int(metadata.get("year") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _matches(metadata: Dict[str, Any], namespaces: Optional[Set[str]], years: Optional[Tuple[int, int]]) -> bool:
+    if namespaces is not None and metadata_namespace(metadata) not in namespaces:
+        return False
+    year = metadata_year(metadata)
+    return years is None or (year != 0 and years[0] <= year <= years[1])
+
+
+def filter_mask(metadata: Sequence[Dict[str, Any]], filter: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Which of the metadata records a filter selects"""
+    namespaces, years = parse_filter(filter)
+    return np.fromiter((_matches(meta, namespaces, years) for meta in metadata), dtype=bool, count=len(metadata))
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime, size) of a file, None when missing; tells whether another process rewrote an index"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid (L2) for each row"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), BLOCK_SIZE):
+        block = np.asarray(data[start:start + BLOCK_SIZE], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmin(centroid_norms[None, :] - 2 * block @ centroids.T, axis=1)
+    return assignments
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are re-seeded from random points"""
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(data, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        nonempty = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        sums = np.add.reduceat(data[np.argsort(assignments, kind="stable")], starts, axis=0)
+        centroids[nonempty] = sums / counts[nonempty, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+def train_codebooks(residuals: np.ndarray, subvectors: int) -> np.ndarray:
+    """One k-means codebook per subvector: (subvectors, 256, dim / subvectors)"""
+    width = residuals.shape[1] // subvectors
+    return np.stack([
+        kmeans(residuals[:, j * width:(j + 1) * width], PQ_CENTROIDS, seed=j) for j in range(subvectors)
+    ]).astype(np.float32)
+
+
+def encode_residuals(residuals: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    subvectors, _, width = codebooks.shape
+    codes = np.empty((len(residuals), subvectors), dtype=np.uint8)
+    for j in range(subvectors):
+        codes[:, j] = nearest_centroids(residuals[:, j * width:(j + 1) * width], codebooks[j])
+    return codes
+
+
+def auto_nlist(count: int) -> int:
+    """~4 * sqrt(n) lists, keeping enough training points per list"""
+    return max(1, min(int(4 * math.sqrt(count)), count // TRAIN_POINTS_PER_LIST))
+
+
+class IVFPQIndex:
+    """Approximate cosine-similarity index for large corpora: an inverted file over product-quantized codes
+
+    Each vector is assigned to the nearest of ``nlist`` k-means centroids and
+    its residual compressed to ``subvectors`` one-byte PQ codes. A search
+    scores only the rows of the ``nprobe`` closest lists, from one lookup
+    table per query, then re-scores the best ``refine`` x top_k exactly
+    against the stored float16 vectors (refine=0 returns the approximate
+    scores). Inverted lists are kept per namespace (the ``doc_type`` metadata
+    field), so a document type filter scans only that partition; a year
+    filter masks rows before they are scored.
+
+    Rows are only appended: ``vectors.bin`` (float16), ``codes.bin``,
+    ``lists.bin`` and ``records.jsonl`` grow with each insert, and deletes are
+    tombstone lines. Below ``min_train`` vectors the index is searched
+    exactly; it then trains, and retrains (compacting the files) once it has
+    grown ``retrain_growth`` times past the size it was trained at.
+    """
+
+    def __init__(self, directory: str = ANN_INDEX_DIR, nlist: int = ANN_NLIST, subvectors: int = ANN_PQ_SUBVECTORS,
+                 nprobe: int = ANN_NPROBE, refine: int = ANN_REFINE_FACTOR, min_train: int = ANN_TRAIN_MIN_VECTORS,
+                 retrain_growth: float = ANN_RETRAIN_GROWTH):
+        self.directory = directory
+        self.requested_nlist = nlist
+        self.subvectors = subvectors
+        self.nprobe = nprobe
+        self.refine = refine
+        self.min_train = min_train
+        self.retrain_growth = retrain_growth
+        self.vectors_path = os.path.join(directory, "vectors.bin")
+        self.codes_path = os.path.join(directory, "codes.bin")
+        self.lists_path = os.path.join(directory, "lists.bin")
+        self.records_path = os.path.join(directory, "records.jsonl")
+        self.quantizer_path = os.path.join(directory, "quantizer.npz")
+        self.info_path = os.path.join(directory, "index.json")
+        self.lock_path = os.path.join(directory, "write.lock")
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.dim: Optional[int] = None
+        self.trained_rows = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._codebooks: Optional[np.ndarray] = None
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._namespace_ids: Dict[str, int] = {}
+        self._row_namespaces = np.zeros(0, dtype=np.int32)
+        self._row_years = np.zeros(0, dtype=np.int32)
+        self._live = np.zeros(0, dtype=bool)
+        self._records_bytes = 0  # complete record lines seen by the last load or write
+        self._vectors: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        # namespace id -> one array of rows per coarse list
+        self._lists: Dict[int, List[np.ndarray]] = {}
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def nlist(self) -> int:
+        return len(self._centroids) if self.trained else 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def changed_on_disk(self) -> bool:
+        """Whether the records were written by another process (e.g. an ingestion run) since loading"""
+        return file_signature(self.records_path) != self._signature
+
+    # Storage
+
+    def _load(self):
+        # Taken before reading, so a write that lands mid-load still triggers a reload
+        self._signature = file_signature(self.records_path)
+        if not os.path.exists(self.info_path):
+            return
+        with open(self.info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        self.dim = info["dim"]
+        self.trained_rows = info.get("trained_rows", 0)
+        if os.path.exists(self.quantizer_path):
+            with np.load(self.quantizer_path) as quantizer:
+                self._centroids = quantizer["centroids"]
+                self._codebooks = quantizer["codebooks"]
+
+        ids, metadata, deleted = [], [], []
+        if os.path.exists(self.records_path):
+            with open(self.records_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn (or in-progress) write: the writer repairs it, readers skip it
+                    self._records_bytes += len(line)
+                    record = json.loads(line)
+                    if "deleted" in record:
+                        deleted.append(record["deleted"])
+                    else:
+                        ids.append(record["id"])
+                        metadata.append(record["metadata"])
+        # Binary rows written ahead of a record line that never made it are ignored
+        lists = np.fromfile(self.lists_path, dtype=np.int32, count=len(ids)) if self.trained else None
+        self._append_rows(ids, metadata, lists)
+        self._delete_rows(deleted)
+        self._open_files()
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write access: the thread lock, plus a file lock shared with other processes
+
+        Catches up with writes made by other processes, then drops anything a
+        crashed writer left past the last complete record before appending.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                if self.changed_on_disk():
+                    self._reset()
+                    self._load()
+                self._repair()
+                yield
+
+    def _repair(self):
+        if self.dim is None:
+            return
+        rows = len(self._ids)
+        for path, size in ((self.records_path, self._records_bytes), (self.vectors_path, rows * 2 * self.dim),
+                           (self.codes_path, rows * self.subvectors), (self.lists_path, rows * 4)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+        self._signature = file_signature(self.records_path)
+
+    def _records_written(self):
+        self._records_bytes = os.path.getsize(self.records_path)
+        self._signature = file_signature(self.records_path)
+
+    def _open_files(self):
+        rows = len(self._ids)
+        self._vectors = (np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(rows, self.dim))
+                         if rows else None)
+        self._codes = (np.memmap(self.codes_path, dtype=np.uint8, mode="r", shape=(rows, self.subvectors))
+                       if rows and self.trained else None)
+
+    def _write_info(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.info_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "subvectors": self.subvectors, "trained_rows": self.trained_rows}, f)
+        os.replace(tmp_path, self.info_path)
+
+    # In-memory bookkeeping
+
+    def _namespace_id(self, name: str) -> int:
+        if name not in self._namespace_ids:
+            self._namespace_ids[name] = len(self._namespace_ids)
+        return self._namespace_ids[name]
+
+    def _append_rows(self, ids: Sequence[str], metadata: Sequence[Dict[str, Any]], lists: Optional[np.ndarray]):
+        start = len(self._ids)
+        self._ids.extend(ids)
+        self._metadata.extend(metadata)
+        for offset, vector_id in enumerate(ids):
+            self._rows[vector_id] = start + offset
+        namespaces = np.array([self._namespace_id(metadata_namespace(meta)) for meta in metadata], dtype=np.int32)
+        self._row_namespaces = np.concatenate([self._row_namespaces, namespaces])
+        self._row_years = np.concatenate([self._row_years,
+                                          np.array([metadata_year(meta) for meta in metadata], dtype=np.int32)])
+        self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+        if lists is not None:
+            self._add_to_lists(np.arange(start, start + len(ids)), namespaces, lists)
+
+    def _add_to_lists(self, rows: np.ndarray, namespaces: np.ndarray, lists: np.ndarray):
+        keys = namespaces.astype(np.int64) * self.nlist + lists
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        boundaries = np.flatnonzero(np.diff(keys)) + 1
+        for key_rows, key in zip(np.split(rows, boundaries), keys[np.concatenate([[0], boundaries])]):
+            namespace, list_id = divmod(int(key), self.nlist)
+            namespace_lists = self._lists.setdefault(
+                namespace, [np.zeros(0, dtype=np.int64) for _ in range(self.nlist)])
+            namespace_lists[list_id] = np.concatenate([namespace_lists[list_id], key_rows])
+
+    def _delete_rows(self, rows: Sequence[int]):
+        for row in rows:
+            vector_id = self._ids[row]
+            if vector_id is not None and self._rows.get(vector_id) == row:
+                del self._rows[vector_id]
+            self._ids[row] = None
+            self._metadata[row] = None
+            self._live[row] = False
+
+    # Writes
+
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], metadata: Sequence[Dict[str, Any]]):
+        """Insert or replace vectors by ID"""
+        latest = {vector_id: i for i, vector_id in enumerate(ids)}  # the last of repeated IDs wins
+        keep = sorted(latest.values())
+        ids = [ids[i] for i in keep]
+        metadata = [metadata[i] for i in keep]
+        new_vectors = normalize_rows(np.asarray(vectors, dtype=np.float32)[keep])
+        with self._writing():
+            if self.dim is None:
+                self.dim = new_vectors.shape[1]
+                if self.dim % self.subvectors:
+                    raise ValueError(f"Embedding dimension {self.dim} is not divisible into "
+                                     f"{self.subvectors} PQ subvectors")
+                self._write_info()
+            elif new_vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {new_vectors.shape[1]}")
+
+            replaced = [self._rows[vector_id] for vector_id in ids if vector_id in self._rows]
+            lists = None
+            with open(self.vectors_path, "ab") as f:
+                f.write(new_vectors.astype(np.float16).tobytes())
+            if self.trained:
+                lists = nearest_centroids(new_vectors, self._centroids).astype(np.int32)
+                codes = encode_residuals(new_vectors - self._centroids[lists], self._codebooks)
+                with open(self.codes_path, "ab") as f:
+                    f.write(codes.tobytes())
+                with open(self.lists_path, "ab") as f:
+                    f.write(lists.tobytes())
+            with open(self.records_path, "a", encoding="utf-8") as f:
+                for row in replaced:
+                    f.write(json.dumps({"deleted": row}) + "\n")
+                for vector_id, meta in zip(ids, metadata):
+                    f.write(json.dumps({"id": vector_id, "metadata": meta}) + "\n")
+            self._records_written()
+
+            self._delete_rows(replaced)
+            self._append_rows(ids, metadata, lists)
+            self._open_files()
+            self._maybe_rebuild()
+
+    def delete(self, ids: Sequence[str]):
+        """Remove vectors by ID"""
+        with self._writing():
+            rows = sorted({self._rows[vector_id] for vector_id in ids if vector_id in self._rows})
+            if not rows:
+                return
+            with open(self.records_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"deleted": row}) + "\n")
+            self._records_written()
+            self._delete_rows(rows)
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        live, total = len(self._rows), len(self._ids)
+        if not self.trained:
+            if live >= self.min_train:
+                self._rebuild()
+        elif live > self.trained_rows * self.retrain_growth or total - live > MAX_DELETED_FRACTION * total:
+            self._rebuild()
+
+    def _rebuild(self):
+        """Train the quantizers on the live vectors and rewrite the files without deleted rows"""
+        start = time.perf_counter()
+        live_rows = np.flatnonzero(self._live)
+        ids = [self._ids[row] for row in live_rows]
+        metadata = [self._metadata[row] for row in live_rows]
+        rng = np.random.default_rng(0)
+
+        centroids, codebooks = None, None
+        if len(live_rows) >= self.min_train:
+            nlist = self.requested_nlist or auto_nlist(len(live_rows))
+            sample = np.sort(rng.choice(live_rows, min(len(live_rows), nlist * TRAIN_POINTS_PER_LIST), replace=False))
+            centroids = kmeans(np.asarray(self._vectors[sample], dtype=np.float32), nlist)
+            pq_sample = sample[:PQ_TRAIN_POINTS] if len(sample) <= PQ_TRAIN_POINTS else \
+                np.sort(rng.choice(sample, PQ_TRAIN_POINTS, replace=False))
+            pq_vectors = np.asarray(self._vectors[pq_sample], dtype=np.float32)
+            codebooks = train_codebooks(pq_vectors - centroids[nearest_centroids(pq_vectors, centroids)],
+                                        self.subvectors)
+
+        tmp = {path: path + ".tmp" for path in (self.vectors_path, self.codes_path, self.lists_path,
+                                                 self.records_path)}
+        with open(tmp[self.vectors_path], "wb") as vectors_file, open(tmp[self.codes_path], "wb") as codes_file, \
+                open(tmp[self.lists_path], "wb") as lists_file:
+            for block_start in range(0, len(live_rows), BLOCK_SIZE):
+                block = np.asarray(self._vectors[live_rows[block_start:block_start + BLOCK_SIZE]])
+                vectors_file.write(block.tobytes())
+                if centroids is not None:
+                    block = block.astype(np.float32)
+                    lists = nearest_centroids(block, centroids).astype(np.int32)
+                    codes_file.write(encode_residuals(block - centroids[lists], codebooks).tobytes())
+                    lists_file.write(lists.tobytes())
+        with open(tmp[self.records_path], "w", encoding="utf-8") as f:
+            for vector_id, meta in zip(ids, metadata):
+                f.write(json.dumps({"id": vector_id, "metadata": meta}) + "\n")
+
+        if centroids is not None:
+            np.savez(self.quantizer_path + ".tmp.npz", centroids=centroids, codebooks=codebooks)
+            os.replace(self.quantizer_path + ".tmp.npz", self.quantizer_path)
+        elif os.path.exists(self.quantizer_path):
+            os.remove(self.quantizer_path)  # shrunk below min_train: back to exact search
+        for path, tmp_path in tmp.items():
+            os.replace(tmp_path, path)
+        self.trained_rows = len(live_rows)
+        self._write_info()
+
+        self._reset()
+        self._load()
+        print(f"Rebuilt ANN index: {len(live_rows)} vectors, {self.nlist} lists "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    # Reads
+
+    def fetch(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Return metadata for the IDs present in the index"""
+        with self._lock:
+            return {vector_id: self._metadata[self._rows[vector_id]] for vector_id in ids if vector_id in self._rows}
+
+    def _filter_mask(self, rows: np.ndarray, namespaces: Optional[Set[str]],
+                     years: Optional[Tuple[int, int]]) -> np.ndarray:
+        mask = self._live[rows]
+        if namespaces is not None:
+            wanted = [self._namespace_ids[name] for name in namespaces if name in self._namespace_ids]
+            mask &= np.isin(self._row_namespaces[rows], wanted)
+        if years is not None:
+            row_years = self._row_years[rows]
+            mask &= (row_years != 0) & (row_years >= years[0]) & (row_years <= years[1])
+        return mask
+
+    def _exact_scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return np.asarray(self._vectors[rows], dtype=np.float32) @ query
+
+    def _search_exact(self, query: np.ndarray, top_k: int, namespaces, years) -> Tuple[np.ndarray, np.ndarray]:
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(self._ids), BLOCK_SIZE):
+            rows = np.arange(start, min(start + BLOCK_SIZE, len(self._ids)))
+            rows = rows[self._filter_mask(rows, namespaces, years)]
+            if not len(rows):
+                continue
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, self._exact_scores(rows, query)])
+            if len(best_rows) > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1)[:top_k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        return best_rows, best_scores
+
+    def _probe_rows(self, query: np.ndarray, nprobe: int, namespaces) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the nprobe lists closest to the query, with each row's list score q . centroid"""
+        centroid_scores = self._centroids @ query
+        distances = (self._centroids ** 2).sum(axis=1) - 2 * centroid_scores
+        probe = np.argpartition(distances, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        namespace_ids = (self._namespace_ids.values() if namespaces is None
+                         else [self._namespace_ids[name] for name in namespaces if name in self._namespace_ids])
+        rows, bases = [], []
+        for namespace in namespace_ids:
+            lists = self._lists.get(namespace)
+            if lists is None:
+                continue
+            for list_id in probe:
+                if len(lists[list_id]):
+                    rows.append(lists[list_id])
+                    bases.append(np.full(len(lists[list_id]), centroid_scores[list_id], dtype=np.float32))
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(bases)
+
+    def _search_ivfpq(self, query: np.ndarray, top_k: int, nprobe: int, refine: int,
+                      namespaces, years) -> Tuple[np.ndarray, np.ndarray]:
+        shortlist_size = top_k * refine if refine else top_k
+        # A selective filter can leave too few rows in the nearest lists; widen the probe until enough match
+        while True:
+            rows, bases = self._probe_rows(query, nprobe, namespaces)
+            mask = self._filter_mask(rows, namespaces, years)
+            rows, bases = rows[mask], bases[mask]
+            if len(rows) >= shortlist_size or nprobe >= self.nlist:
+                break
+            nprobe = min(nprobe * 2, self.nlist)
+        if not len(rows):
+            return rows, bases
+
+        order = np.argsort(rows)  # read the memory-mapped codes in file order
+        rows, bases = rows[order], bases[order]
+        subvectors, _, width = self._codebooks.shape
+        lookup = np.einsum("mcd,md->mc", self._codebooks, query.reshape(subvectors, width))
+        scores = bases + lookup[np.arange(subvectors)[None, :], self._codes[rows]].sum(axis=1)
+
+        if len(rows) > shortlist_size:
+            keep = np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+            rows, scores = rows[keep], scores[keep]
+        if refine:
+            scores = self._exact_scores(rows, query)
+        return rows, scores
+
+    def search(self, query_vectors: Sequence[Sequence[float]], top_k: int, filter: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None, refine: Optional[int] = None
+               ) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """Approximate top-k search for a batch of query vectors, optionally pre-filtered by metadata"""
+        queries = normalize_rows(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        namespaces, years = parse_filter(filter)
+        refine = self.refine if refine is None else refine
+
+        # Writes swap the row arrays and memory maps, so a search must not interleave with one
+        with self._lock:
+            if not self._rows or top_k <= 0:
+                return [[] for _ in range(len(queries))]
+            nprobe = max(1, min(nprobe or self.nprobe, self.nlist or 1))
+            results = []
+            for query in queries:
+                if self.trained:
+                    rows, scores = self._search_ivfpq(query, top_k, nprobe, refine, namespaces, years)
+                else:
+                    rows, scores = self._search_exact(query, top_k, namespaces, years)
+                order = np.argsort(-scores)[:top_k]
+                results.append([(self._ids[row], float(scores[i]), self._metadata[row])
+                                for i, row in zip(order, rows[order])])
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "vectors": len(self._rows),
+                "deleted": len(self._ids) - len(self._rows),
+                "trained": self.trained,
+                "nlist": self.nlist,
+                "namespaces": sorted(self._namespace_ids),
+                "code_bytes_per_vector": self.subvectors if self.trained else 0,
+                "vector_bytes_per_vector": 2 * (self.dim or 0),
+            }
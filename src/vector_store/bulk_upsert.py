@@ -0,0 +1,124 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Iterator
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import (
+    UPSERT_BATCH_SIZE, UPSERT_MAX_REQUEST_BYTES, UPSERT_WORKERS, UPSERT_MAX_RETRIES
+)
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+MAX_RETRY_DELAY = 10.0
+
+
+def estimate_vector_bytes(vector: Dict[str, Any]) -> int:
+    """Rough size of one vector in an upsert request body (floats serialize to ~12 bytes)"""
+    return (len(vector["id"]) + 12 * len(vector["values"])
+            + len(json.dumps(vector.get("metadata", {}), ensure_ascii=False)) + 64)
+
+
+def iter_upsert_batches(vectors: List[Dict[str, Any]], max_vectors: int = UPSERT_BATCH_SIZE,
+                        max_bytes: int = UPSERT_MAX_REQUEST_BYTES) -> Iterator[List[Dict[str, Any]]]:
+    """Split vectors into request-sized batches, capped by count and by estimated payload size"""
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+    for vector in vectors:
+        size = estimate_vector_bytes(vector)
+        if batch and (len(batch) >= max_vectors or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+class BulkUpserter:
+    """Sends upsert batches through a bounded thread pool
+
+    submit() returns as soon as the batches are queued, so the caller can
+    embed the next documents while earlier ones are in flight; it blocks only
+    when max_in_flight batches are outstanding, which bounds memory. Each
+    failed batch is retried on its own with backoff. close() waits for
+    everything and reports whether every batch was stored.
+    """
+
+    def __init__(self, upsert: Callable[[List[Dict[str, Any]]], Any], workers: int = UPSERT_WORKERS,
+                 max_retries: int = UPSERT_MAX_RETRIES, max_in_flight: int = 0, label: str = "vector store"):
+        self.upsert = upsert
+        self.max_retries = max_retries
+        self.label = label
+        self.workers = max(workers, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upsert")
+        self._slots = threading.BoundedSemaphore(max_in_flight or self.workers * 2)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.upserted = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.errors: List[str] = []
+        self._start = time.perf_counter()
+        self._last_progress = self._start
+
+    def __enter__(self) -> "BulkUpserter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def submit(self, vectors: List[Dict[str, Any]]):
+        for batch in iter_upsert_batches(vectors):
+            self._slots.acquire()
+            self.submitted += len(batch)
+            try:
+                self._executor.submit(self._send, batch)
+            except BaseException:
+                self._slots.release()
+                raise
+
+    def _send(self, batch: List[Dict[str, Any]]):
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.upsert(batch)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        with self._lock:
+                            self.failed_batches += 1
+                            self.errors.append(str(e))
+                        print(f"Upsert of {len(batch)} vectors to {self.label} failed after "
+                              f"{attempt + 1} attempts: {str(e)}")
+                        return
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(min(0.5 * 2 ** attempt, MAX_RETRY_DELAY) * (0.5 + random.random() / 2))
+            with self._lock:
+                self.upserted += len(batch)
+                now = time.perf_counter()
+                if now - self._last_progress >= PROGRESS_INTERVAL:
+                    self._last_progress = now
+                    print(f"Upserted {self.upserted}/{self.submitted} vectors to {self.label} "
+                          f"({self.upserted / (now - self._start):.0f} vectors/s)")
+        finally:
+            self._slots.release()
+
+    def close(self) -> bool:
+        """Wait for all batches; True if every one was stored"""
+        self._executor.shutdown(wait=True)
+        return self.failed_batches == 0
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._start
+        return {
+            "upserted": self.upserted,
+            "failed_batches": self.failed_batches,
+            "retries": self.retries,
+            "seconds": elapsed,
+            "vectors_per_second": self.upserted / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+import threading
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import CHUNK_STORE_DIR
+from vector_store.records import format_match
+
+# Names the generation directory readers should load; replaced atomically by save()
+CURRENT_FILE = "CURRENT"
+FILE_NAMES = ("text.bin", "offsets.npy", "chunks.json")
+
+
+class ChunkStore:
+    """Chunk text and metadata by vector ID, kept next to the app instead of in the vector store
+
+    All text is one UTF-8 blob (``text.bin``, memory-mapped) sliced by an
+    offsets array (``offsets.npy``, row i is ``text[offsets[i]:offsets[i + 1]]``).
+    ``chunks.json`` holds the IDs in row order and each chunk's metadata
+    (source, pages, Article) without the text. Each save writes the three
+    files to a new generation directory and then points ``CURRENT`` at it,
+    so a reader never pairs files from different saves.
+    """
+
+    def __init__(self, ids: List[str], metadata: List[Dict[str, Any]], offsets: np.ndarray, text):
+        self.ids = ids
+        self.metadata = metadata
+        self.offsets = offsets
+        self.text = text
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    @classmethod
+    def build(cls, ids: Sequence[str], documents: Sequence[Dict[str, Any]]) -> "ChunkStore":
+        """Build from vector store style metadata dicts (each with a "text" field)"""
+        encoded = [document["text"].encode("utf-8") for document in documents]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(text) for text in encoded])
+        metadata = [{key: value for key, value in document.items() if key != "text"} for document in documents]
+        return cls(list(ids), metadata, offsets, b"".join(encoded))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.rows
+
+    def get_text(self, row: int) -> str:
+        return bytes(self.text[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata with text for a chunk, or None if it is not in the store"""
+        row = self.rows.get(chunk_id)
+        if row is None:
+            return None
+        return dict(self.metadata[row], text=self.get_text(row))
+
+    def save(self, directory: str = CHUNK_STORE_DIR):
+        """Write the store as a new generation and make it current, replacing any previous one"""
+        os.makedirs(directory, exist_ok=True)
+        previous = current_generation(directory)
+        generation = f"gen-{time.time_ns()}-{os.getpid()}"
+        generation_path = os.path.join(directory, generation)
+        os.makedirs(generation_path)
+        with open(os.path.join(generation_path, "text.bin"), 'wb') as f:
+            f.write(bytes(self.text))
+        with open(os.path.join(generation_path, "offsets.npy"), 'wb') as f:
+            np.save(f, self.offsets)
+        with open(os.path.join(generation_path, "chunks.json"), 'w', encoding='utf-8') as f:
+            json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+        current_path = os.path.join(directory, CURRENT_FILE)
+        with open(current_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(generation)
+        os.replace(current_path + ".tmp", current_path)
+
+        # Keep the previous generation for readers that picked it just before the switch
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith("gen-") and name not in (generation, previous):
+                shutil.rmtree(path, ignore_errors=True)
+            elif name in FILE_NAMES:
+                os.remove(path)  # single-generation layout of earlier versions
+
+    @classmethod
+    def load(cls, directory: str = CHUNK_STORE_DIR) -> "ChunkStore":
+        generation = current_generation(directory)
+        if generation is None:
+            raise FileNotFoundError(f"No chunk store in {directory}")
+        generation_path = os.path.join(directory, generation)
+        with open(os.path.join(generation_path, "chunks.json"), 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        offsets = np.load(os.path.join(generation_path, "offsets.npy"))
+        text_path = os.path.join(generation_path, "text.bin")
+        # np.memmap cannot map an empty file
+        text = np.memmap(text_path, dtype=np.uint8, mode="r") if os.path.getsize(text_path) else b""
+        return cls(payload["ids"], payload["metadata"], offsets, text)
+
+
+def current_generation(directory: str = CHUNK_STORE_DIR) -> Optional[str]:
+    """Name of the generation directory holding the current store, or None if there is none"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def chunk_store_exists(directory: str = CHUNK_STORE_DIR) -> bool:
+    return current_generation(directory) is not None
+
+
+_store: Optional[ChunkStore] = None
+_store_signature: Optional[Tuple[int, int]] = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_store(directory: str = CHUNK_STORE_DIR) -> Optional[ChunkStore]:
+    """Process-wide chunk store, reloaded when ingestion saves a new one; None before first ingestion"""
+    global _store, _store_signature
+    try:
+        # Every save replaces CURRENT with a new file, so its inode changes even within one mtime tick
+        stat = os.stat(os.path.join(directory, CURRENT_FILE))
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_ino, stat.st_mtime_ns)
+    if _store is None or _store_signature != signature:
+        with _store_lock:
+            if _store is None or _store_signature != signature:
+                _store = ChunkStore.load(directory)
+                _store_signature = signature
+    return _store
+
+
+def hydrate_matches(matches: Sequence[Tuple[str, float]]) -> Tuple[List[Optional[Dict[str, Any]]], List[str]]:
+    """Turn (vector ID, score) pairs into search results from the chunk store
+
+    Returns the results in match order (None where the store has no entry)
+    and the IDs that were missing.
+    """
+    store = get_chunk_store()
+    results: List[Optional[Dict[str, Any]]] = []
+    missing = []
+    for chunk_id, score in matches:
+        metadata = store.get(chunk_id) if store is not None else None
+        if metadata is None:
+            missing.append(chunk_id)
+            results.append(None)
+        else:
+            results.append(format_match(metadata, score))
+    return results, missing
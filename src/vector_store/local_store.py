@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple, TYPE_CHECKING
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import LOCAL_INDEX_DIR, LOCAL_INDEX_DTYPE, LOCAL_INDEX_TYPE
+from embeddings.embedding_service import embed_documents, embed_query
+from vector_store.ann_index import IVFPQIndex, file_signature, filter_mask
+from vector_store.records import document_metadata, format_match
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+INDEX_TYPES = ("exact", "ivfpq")
+
+# Rows scored per matrix multiply, keeps temporary score buffers small
+SEARCH_BLOCK_SIZE = 65536
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert normalized float32 rows to the storage dtype (plus per-row scales for int8)"""
+    if dtype == "float32":
+        return vectors.astype(np.float32), None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class LocalVectorIndex:
+    """Exact cosine-similarity index kept in a memory-mapped NumPy matrix.
+
+    ``vectors.npy`` holds one normalized row per vector (float32, float16 or
+    int8 with ``scales.npy``), and ``records.json`` holds the matching IDs and
+    metadata in row order.
+    """
+
+    def __init__(self, directory: str = LOCAL_INDEX_DIR, dtype: str = LOCAL_INDEX_DTYPE):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported local index dtype: {dtype}. Use one of {', '.join(SUPPORTED_DTYPES)}")
+        self.directory = directory
+        self.dtype = dtype
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.scales_path = os.path.join(directory, "scales.npy")
+        self.records_path = os.path.join(directory, "records.json")
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._records: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def changed_on_disk(self) -> bool:
+        """Whether the records were written by another process (e.g. an ingestion run) since loading"""
+        return file_signature(self.records_path) != self._signature
+
+    def _load(self):
+        self._signature = file_signature(self.records_path)
+        if not os.path.exists(self.records_path):
+            return
+        with open(self.records_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("dtype") != self.dtype:
+            print(f"Local index at {self.directory} uses {stored.get('dtype')}, converting to {self.dtype} on next write")
+        self._records = stored["records"]
+        self._rows = {record["id"]: row for row, record in enumerate(self._records)}
+        self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        if os.path.exists(self.scales_path):
+            self._scales = np.load(self.scales_path, mmap_mode="r")
+
+    def _dequantized(self) -> np.ndarray:
+        if self._vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.asarray(self._vectors, dtype=np.float32)
+        if self._scales is not None:
+            vectors = vectors * np.asarray(self._scales)[:, None]
+        return vectors
+
+    def _save(self, vectors: np.ndarray):
+        """Persist float32 rows in the storage dtype and re-open them memory-mapped"""
+        os.makedirs(self.directory, exist_ok=True)
+        stored, scales = _quantize(vectors, self.dtype)
+        np.save(self.vectors_path + ".tmp.npy", stored)
+        os.replace(self.vectors_path + ".tmp.npy", self.vectors_path)
+        if scales is not None:
+            np.save(self.scales_path + ".tmp.npy", scales)
+            os.replace(self.scales_path + ".tmp.npy", self.scales_path)
+        elif os.path.exists(self.scales_path):
+            os.remove(self.scales_path)
+        tmp_path = self.records_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "records": self._records}, f)
+        os.replace(tmp_path, self.records_path)
+        self._signature = file_signature(self.records_path)
+
+        self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        self._scales = np.load(self.scales_path, mmap_mode="r") if scales is not None else None
+
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], metadata: Sequence[Dict[str, Any]]):
+        """Insert or replace vectors by ID"""
+        new_vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            current = self._dequantized()
+            if len(current) == 0:
+                current = np.zeros((0, new_vectors.shape[1]), dtype=np.float32)
+            else:
+                current = current.copy()
+            appended = []
+            for vector_id, vector, meta in zip(ids, new_vectors, metadata):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    self._rows[vector_id] = len(self._records)
+                    self._records.append({"id": vector_id, "metadata": meta})
+                    appended.append(vector)
+                else:
+                    current[row] = vector
+                    self._records[row] = {"id": vector_id, "metadata": meta}
+            if appended:
+                current = np.vstack([current, np.asarray(appended, dtype=np.float32)])
+            self._save(current)
+
+    def delete(self, ids: Sequence[str]):
+        """Remove vectors by ID"""
+        with self._lock:
+            doomed = {self._rows[vector_id] for vector_id in ids if vector_id in self._rows}
+            if not doomed:
+                return
+            keep = [row for row in range(len(self._records)) if row not in doomed]
+            current = self._dequantized()[keep]
+            self._records = [self._records[row] for row in keep]
+            self._rows = {record["id"]: row for row, record in enumerate(self._records)}
+            self._save(current)
+
+    def fetch(self, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Return metadata for the IDs present in the index"""
+        records = self._records
+        rows = self._rows
+        return {vector_id: records[rows[vector_id]]["metadata"] for vector_id in ids if vector_id in rows}
+
+    def search(self, query_vectors: Sequence[Sequence[float]], top_k: int, filter: Optional[Dict[str, Any]] = None
+               ) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """Exact top-k search for a batch of query vectors, optionally restricted by a metadata filter"""
+        vectors, scales, records = self._vectors, self._scales, self._records
+        queries = _normalize_rows(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        if vectors is None or len(records) == 0:
+            return [[] for _ in range(len(queries))]
+        if filter:
+            allowed = filter_mask([record["metadata"] for record in records], filter)
+            if not allowed.any():
+                return [[] for _ in range(len(queries))]
+
+        top_k = min(top_k, len(records))
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, len(records), SEARCH_BLOCK_SIZE):
+            block = np.asarray(vectors[start:start + SEARCH_BLOCK_SIZE], dtype=np.float32)
+            scores = queries @ block.T
+            if scales is not None:
+                scores *= np.asarray(scales[start:start + SEARCH_BLOCK_SIZE])[None, :]
+            if filter:
+                scores[:, ~allowed[start:start + SEARCH_BLOCK_SIZE]] = -np.inf
+
+            k = min(top_k, scores.shape[1])
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+            best_rows = np.hstack([best_rows, candidates + start])
+            best_scores = np.hstack([best_scores, candidate_scores])
+            if best_rows.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        return [
+            [(records[row]["id"], float(score), records[row]["metadata"])
+             for row, score in zip(rows, row_scores) if score > -np.inf]
+            for rows, row_scores in zip(best_rows, best_scores)
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_local_index():
+    """Get the process-wide local index instance (LocalVectorIndex or IVFPQIndex, per LOCAL_INDEX_TYPE)
+
+    Reloaded when another process (an ingestion run, a server worker) has rewritten it on disk.
+    """
+    global _index
+    if _index is None or _index.changed_on_disk():
+        with _index_lock:
+            if _index is None or _index.changed_on_disk():
+                if LOCAL_INDEX_TYPE not in INDEX_TYPES:
+                    raise ValueError(f"Unsupported local index type: {LOCAL_INDEX_TYPE}. "
+                                     f"Use one of {', '.join(INDEX_TYPES)}")
+                _index = IVFPQIndex() if LOCAL_INDEX_TYPE == "ivfpq" else LocalVectorIndex()
+    return _index
+
+
+def check_health() -> Dict[str, Any]:
+    """Check that the local index is loaded, reporting its size"""
+    start = time.perf_counter()
+    try:
+        vector_count = len(get_local_index())
+        return {"healthy": True, "latency_ms": (time.perf_counter() - start) * 1000,
+                "vector_count": vector_count, "error": None}
+    except Exception as e:
+        return {"healthy": False, "latency_ms": (time.perf_counter() - start) * 1000,
+                "vector_count": 0, "error": str(e)}
+
+
+def store_documents(documents: List["Document"], ids: List[str] = None) -> bool:
+    """Store documents in the local vector index"""
+    try:
+        index = get_local_index()
+
+        texts = [doc.page_content for doc in documents]
+        embeddings = embed_documents(texts)
+
+        metadata = [document_metadata(doc, i) for i, doc in enumerate(documents)]
+        index.upsert(ids or [f"chunk_{i}" for i in range(len(documents))], embeddings, metadata)
+
+        print(f"Successfully stored {len(documents)} documents in local index")
+        return True
+
+    except Exception as e:
+        print(f"Error storing documents: {str(e)}")
+        return False
+
+
+def store_document_batches(batches: Iterable[Tuple[List["Document"], List[str]]]) -> bool:
+    """Embed and store (documents, ids) batches as they arrive"""
+    # The index is in-process, so there is no request latency to overlap
+    return all(store_documents(documents, ids=ids) for documents, ids in batches)
+
+
+def delete_documents(ids: List[str]) -> bool:
+    """Delete vectors by ID from the local vector index"""
+    try:
+        if ids:
+            get_local_index().delete(ids)
+            print(f"Deleted {len(ids)} stale documents from local index")
+        return True
+    except Exception as e:
+        print(f"Error deleting documents: {str(e)}")
+        return False
+
+
+def fetch_documents(ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch documents by vector ID, in the order given"""
+    try:
+        found = get_local_index().fetch(ids)
+        return [format_match(found[vector_id], 1.0) for vector_id in ids if vector_id in found]
+    except Exception as e:
+        print(f"Error fetching documents: {str(e)}")
+        return []
+
+
+def similarity_search(query: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Search for similar documents, optionally restricted by a metadata filter (doc_type, year)"""
+    try:
+        query_embedding = embed_query(query)
+        matches = get_local_index().search([query_embedding], top_k, filter=filter)[0]
+
+        return [format_match(metadata, score) for _, score, metadata in matches]
+
+    except Exception as e:
+        print(f"Error during similarity search: {str(e)}")
+        return []
+
+
+def search_by_vectors(query_vectors: List[List[float]], top_k: int = 5,
+                      filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+    """Search for many precomputed query embeddings in one pass over the index"""
+    try:
+        if not query_vectors:
+            return []
+        return [
+            [format_match(metadata, score) for _, score, metadata in matches]
+            for matches in get_local_index().search(query_vectors, top_k, filter=filter)
+        ]
+    except Exception as e:
+        print(f"Error during batch similarity search: {str(e)}")
+        return [[] for _ in query_vectors]
@@ -1,15 +1,29 @@
 from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
 from langchain.schema import Document
+import threading
+import time
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import PINECONE_API_KEY, PINECONE_INDEX_NAME, EMBEDDING_DIMENSION
+from config.settings import (
+    PINECONE_API_KEY, PINECONE_INDEX_NAME, EMBEDDING_DIMENSION, PINECONE_INDEX_HOST,
+    PINECONE_POOL_THREADS, PINECONE_CONNECTION_POOL_MAXSIZE, PINECONE_TIMEOUT, INGEST_BATCH_SIZE,
+    CHUNK_STORE_ENABLED
+)
 from embeddings.embedding_service import embed_documents, embed_query
+from vector_store.records import vector_metadata, format_match
+from vector_store.chunk_store import hydrate_matches
+from vector_store.bulk_upsert import BulkUpserter
+
+# Long-lived client and index handle, created on first use
+_pinecone_client = None
+_pinecone_index = None
+_pinecone_lock = threading.Lock()
 
 def initialize_pinecone():
     """Initialize Pinecone client"""
-    pc = Pinecone(api_key=PINECONE_API_KEY)
+    pc = Pinecone(api_key=PINECONE_API_KEY, pool_threads=PINECONE_POOL_THREADS)
     return pc
 
 def create_index_if_not_exists(pc, index_name: str):
@@ -31,77 +45,210 @@ def create_index_if_not_exists(pc, index_name: str):
         print(f"Using existing Pinecone index: {index_name}")
 
 def get_pinecone_index():
-    """Get Pinecone index instance"""
-    pc = initialize_pinecone()
-    create_index_if_not_exists(pc, PINECONE_INDEX_NAME)
-    index = pc.Index(PINECONE_INDEX_NAME)
-    return index
+    """Get the shared Pinecone index instance, connecting on first use"""
+    global _pinecone_client, _pinecone_index
+    if _pinecone_index is not None:
+        return _pinecone_index
+
+    with _pinecone_lock:
+        if _pinecone_index is None:
+            _pinecone_client = initialize_pinecone()
+            pool_kwargs = {
+                "pool_threads": PINECONE_POOL_THREADS,
+                "connection_pool_maxsize": PINECONE_CONNECTION_POOL_MAXSIZE,
+            }
+            if PINECONE_INDEX_HOST:
+                # Known host: no control-plane round trips
+                _pinecone_index = _pinecone_client.Index(host=PINECONE_INDEX_HOST, **pool_kwargs)
+            else:
+                create_index_if_not_exists(_pinecone_client, PINECONE_INDEX_NAME)
+                _pinecone_index = _pinecone_client.Index(PINECONE_INDEX_NAME, **pool_kwargs)
+    return _pinecone_index
+
+def _reset_after_fork():
+    # Pooled connections (and a lock another thread may have held) must not be shared with the parent
+    global _pinecone_client, _pinecone_index, _pinecone_lock
+    _pinecone_lock = threading.Lock()
+    _pinecone_client = None
+    _pinecone_index = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def reset_pinecone_index():
+    """Drop the cached client and index handle so the next call reconnects"""
+    global _pinecone_client, _pinecone_index
+    with _pinecone_lock:
+        _pinecone_client = None
+        _pinecone_index = None
 
-def store_documents(documents: List[Document]) -> bool:
+def check_health() -> Dict[str, Any]:
+    """Check that the Pinecone index answers, reporting round-trip latency and vector count"""
+    start = time.perf_counter()
+    try:
+        stats = get_pinecone_index().describe_index_stats(_request_timeout=PINECONE_TIMEOUT)
+        return {
+            "healthy": True,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "vector_count": stats.get("total_vector_count", 0),
+            "error": None
+        }
+    except Exception as e:
+        return {
+            "healthy": False,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "vector_count": 0,
+            "error": str(e)
+        }
+
+def store_documents(documents: List[Document], ids: List[str] = None) -> bool:
     """Store documents in Pinecone vector database"""
+    return store_document_batches([(documents, ids or [f"chunk_{i}" for i in range(len(documents))])])
+
+def store_document_batches(batches: Iterable[Tuple[List[Document], List[str]]]) -> bool:
+    """Embed and upsert (documents, ids) batches as they arrive
+
+    Upserts run concurrently in the background while the next documents are
+    produced and embedded; only a bounded number of batches is held in memory.
+    """
     try:
         index = get_pinecone_index()
-        
-        # Extract text content
-        texts = [doc.page_content for doc in documents]
-        
-        # Generate embeddings
-        embeddings = embed_documents(texts)
-        
-        # Prepare data for upsert
-        vectors_to_upsert = []
-        for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
-            vector_data = {
-                "id": f"chunk_{i}",
-                "values": embedding,
-                "metadata": {
-                    "text": doc.page_content,
-                    "source": doc.metadata.get("source", ""),
-                    "chunk_id": doc.metadata.get("chunk_id", i)
-                }
-            }
-            vectors_to_upsert.append(vector_data)
-        
-        # Upsert in batches
-        batch_size = 100
-        for i in range(0, len(vectors_to_upsert), batch_size):
-            batch = vectors_to_upsert[i:i + batch_size]
-            index.upsert(vectors=batch)
-        
-        print(f"Successfully stored {len(documents)} documents in Pinecone")
+        upserter = BulkUpserter(lambda vectors: index.upsert(vectors=vectors, _request_timeout=PINECONE_TIMEOUT),
+                                label="Pinecone")
+        position = 0
+        with upserter:
+            for documents, ids in batches:
+                if upserter.failed_batches:
+                    break  # a batch failed even after retries; the store would be incomplete anyway
+                for start in range(0, len(documents), INGEST_BATCH_SIZE):
+                    chunk = documents[start:start + INGEST_BATCH_SIZE]
+                    embeddings = embed_documents([doc.page_content for doc in chunk])
+                    upserter.submit([
+                        {
+                            "id": ids[start + i],
+                            "values": embedding,
+                            "metadata": vector_metadata(doc, position + i)
+                        }
+                        for i, (doc, embedding) in enumerate(zip(chunk, embeddings))
+                    ])
+                    position += len(chunk)
+
+        stats = upserter.stats()
+        if stats["failed_batches"]:
+            print(f"Error storing documents: {stats['failed_batches']} upsert batches failed "
+                  f"({upserter.errors[0]})")
+            return False
+        print(f"Successfully stored {stats['upserted']} documents in Pinecone "
+              f"({stats['vectors_per_second']:.0f} vectors/s, {stats['retries']} retries)")
         return True
         
     except Exception as e:
         print(f"Error storing documents: {str(e)}")
         return False
 
-def similarity_search(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    """Search for similar documents"""
+def delete_documents(ids: List[str]) -> bool:
+    """Delete vectors by ID from Pinecone vector database"""
+    try:
+        if not ids:
+            return True
+        index = get_pinecone_index()
+
+        # Delete in batches
+        batch_size = 1000
+        for i in range(0, len(ids), batch_size):
+            index.delete(ids=ids[i:i + batch_size], _request_timeout=PINECONE_TIMEOUT)
+
+        print(f"Deleted {len(ids)} stale documents from Pinecone")
+        return True
+
+    except Exception as e:
+        print(f"Error deleting documents: {str(e)}")
+        return False
+
+def _fetch_metadata(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Stored metadata of vectors by ID (IDs that do not exist are left out)"""
+    response = get_pinecone_index().fetch(ids=ids, _request_timeout=PINECONE_TIMEOUT)
+    vectors = response['vectors'] if isinstance(response, dict) else response.vectors
+    return {
+        vector_id: (vector['metadata'] if isinstance(vector, dict) else vector.metadata) or {}
+        for vector_id, vector in vectors.items()
+    }
+
+def _documents_for(matches: Sequence[Tuple[str, float]],
+                   metadata: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Search results for (vector ID, score) pairs, in order
+
+    Text comes from the local chunk store when enabled; vectors it does not
+    know (e.g. ingested before it existed) are read from their metadata, which
+    is fetched from the index if the query did not return it.
+    """
+    if CHUNK_STORE_ENABLED:
+        documents, missing = hydrate_matches(matches)
+    else:
+        documents, missing = [None] * len(matches), [vector_id for vector_id, _ in matches]
+    if missing:
+        if metadata is None:
+            metadata = _fetch_metadata(missing)
+        for i, (vector_id, score) in enumerate(matches):
+            if documents[i] is None and 'text' in metadata.get(vector_id, {}):
+                documents[i] = format_match(metadata[vector_id], score)
+    unresolved = [vector_id for document, (vector_id, _) in zip(documents, matches) if document is None]
+    if unresolved:
+        print(f"Warning: no text for {len(unresolved)} of {len(matches)} matches (e.g. {unresolved[0]}); "
+              f"re-ingest if CHUNK_STORE_ENABLED was changed")
+    return [document for document in documents if document is not None]
+
+def _format_matches(matches) -> List[Dict[str, Any]]:
+    metadata = None if CHUNK_STORE_ENABLED else {match['id']: match['metadata'] or {} for match in matches}
+    return _documents_for([(match['id'], match['score']) for match in matches], metadata)
+
+def fetch_documents(ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch documents by vector ID, in the order given"""
+    try:
+        if not ids:
+            return []
+        return _documents_for([(vector_id, 1.0) for vector_id in ids])
+
+    except Exception as e:
+        print(f"Error fetching documents: {str(e)}")
+        return []
+
+def similarity_search(query: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Search for similar documents, optionally restricted by a metadata filter (applied by Pinecone)"""
     try:
         index = get_pinecone_index()
         
         # Generate query embedding
         query_embedding = embed_query(query)
         
-        # Search in Pinecone
+        # Search in Pinecone; with the chunk store only IDs and scores come back
         results = index.query(
             vector=query_embedding,
             top_k=top_k,
-            include_metadata=True
+            filter=filter,
+            include_metadata=not CHUNK_STORE_ENABLED,
+            _request_timeout=PINECONE_TIMEOUT
         )
         
         # Format results
-        formatted_results = []
-        for match in results['matches']:
-            formatted_results.append({
-                'text': match['metadata']['text'],
-                'score': match['score'],
-                'source': match['metadata'].get('source', ''),
-                'chunk_id': match['metadata'].get('chunk_id', '')
-            })
-        
-        return formatted_results
+        return _format_matches(results['matches'])
         
     except Exception as e:
         print(f"Error during similarity search: {str(e)}")
         return []
+
+def search_by_vectors(query_vectors: List[List[float]], top_k: int = 5,
+                      filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+    """Search for many precomputed query embeddings, issuing the queries concurrently"""
+    try:
+        index = get_pinecone_index()
+        # async_req runs each query on the client's pool of PINECONE_POOL_THREADS threads
+        pending = [
+            index.query(vector=vector, top_k=top_k, filter=filter, include_metadata=not CHUNK_STORE_ENABLED,
+                        async_req=True, _request_timeout=PINECONE_TIMEOUT)
+            for vector in query_vectors
+        ]
+        return [_format_matches(result.get()['matches']) for result in pending]
+
+    except Exception as e:
+        print(f"Error during batch similarity search: {str(e)}")
+        return [[] for _ in query_vectors]
@@ -0,0 +1,49 @@
+from typing import Dict, Any, TYPE_CHECKING
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import CHUNK_STORE_ENABLED
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# Chunk metadata copied into the vector store alongside each vector
+METADATA_FIELDS = (
+    "source", "chunk_id", "page_start", "page_end",
+    "part", "article", "article_title", "schedule", "clauses",
+    "doc_type", "year"
+)
+
+
+def document_metadata(doc: "Document", position: int) -> Dict[str, Any]:
+    """Build the vector store metadata for a document chunk"""
+    metadata = {"text": doc.page_content}
+    for field in METADATA_FIELDS:
+        value = doc.metadata.get(field)
+        if value is not None:
+            metadata[field] = value
+    metadata.setdefault("source", "")
+    metadata.setdefault("chunk_id", position)
+    return metadata
+
+
+def vector_metadata(doc: "Document", position: int) -> Dict[str, Any]:
+    """Metadata sent to a remote vector store; the text stays in the local chunk store when enabled"""
+    metadata = document_metadata(doc, position)
+    if CHUNK_STORE_ENABLED:
+        del metadata["text"]
+    return metadata
+
+
+def format_match(metadata: Dict[str, Any], score: float) -> Dict[str, Any]:
+    """Convert stored metadata and a similarity score into a search result"""
+    result = {
+        'text': metadata['text'],
+        'score': score,
+        'source': metadata.get('source', ''),
+        'chunk_id': metadata.get('chunk_id', '')
+    }
+    for field in METADATA_FIELDS:
+        if field not in result and field in metadata:
+            result[field] = metadata[field]
+    return result
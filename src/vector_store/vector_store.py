@@ -0,0 +1,71 @@
+import importlib
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.settings import VECTOR_STORE_BACKEND, PINECONE_INDEX_NAME, LOCAL_INDEX_DIR, LOCAL_INDEX_TYPE, ANN_INDEX_DIR
+
+# Each backend module provides store_documents, store_document_batches, delete_documents,
+# fetch_documents, similarity_search, search_by_vectors and check_health
+BACKENDS = {
+    "pinecone": "vector_store.pinecone_client",
+    "local": "vector_store.local_store",
+}
+
+
+def get_backend(name: str = None):
+    """Import and return the configured vector store backend module"""
+    name = (name or VECTOR_STORE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector store backend: {name}. Use one of {', '.join(BACKENDS)}")
+    return importlib.import_module(BACKENDS[name])
+
+
+def index_identity(name: str = None) -> str:
+    """Identify where vectors are stored, so manifests can tell backends apart"""
+    name = (name or VECTOR_STORE_BACKEND).lower()
+    if name == "local":
+        location = ANN_INDEX_DIR if LOCAL_INDEX_TYPE == "ivfpq" else LOCAL_INDEX_DIR
+    else:
+        location = PINECONE_INDEX_NAME
+    return f"{name}:{location}"
+
+
+def store_documents(documents, ids: List[str] = None) -> bool:
+    """Store documents in the configured vector store"""
+    return get_backend().store_documents(documents, ids=ids)
+
+
+def store_document_batches(batches: Iterable[Tuple[list, List[str]]]) -> bool:
+    """Store a stream of (documents, ids) batches, e.g. straight from ingestion"""
+    return get_backend().store_document_batches(batches)
+
+
+def delete_documents(ids: List[str]) -> bool:
+    """Delete vectors by ID from the configured vector store"""
+    return get_backend().delete_documents(ids)
+
+
+def fetch_documents(ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch documents by vector ID from the configured vector store"""
+    return get_backend().fetch_documents(ids)
+
+
+def similarity_search(query: str, top_k: int = 5, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Search the configured vector store for similar documents
+
+    `filter` is a Pinecone-style metadata filter on doc_type and year, e.g.
+    {"doc_type": "amendment", "year": {"$gte": 1976}}.
+    """
+    return get_backend().similarity_search(query, top_k=top_k, filter=filter)
+
+
+def search_by_vectors(query_vectors: List[List[float]], top_k: int = 5,
+                      filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+    """Search the configured vector store for many precomputed query embeddings"""
+    return get_backend().search_by_vectors(query_vectors, top_k=top_k, filter=filter)
+
+
+def check_health() -> Dict[str, Any]:
+    """Check that the configured vector store is reachable"""
+    return get_backend().check_health()
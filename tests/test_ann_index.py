@@ -0,0 +1,90 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from vector_store.ann_index import IVFPQIndex
+
+DIM = 32
+CLUSTERS = 20
+
+
+def clustered_vectors(count, seed=0):
+    """Points around a fixed set of centers, so coarse lists mean something"""
+    centers = np.random.default_rng(0).normal(size=(CLUSTERS, DIM))
+    rng = np.random.default_rng(seed)
+    return (centers[rng.integers(0, CLUSTERS, count)] + 0.3 * rng.normal(size=(count, DIM))).astype(np.float32)
+
+
+def make_index(directory):
+    return IVFPQIndex(str(directory), nlist=8, subvectors=8, min_train=500)
+
+
+def metadata_for(count, start=0):
+    return [{"text": f"chunk {i}", "doc_type": "article" if i % 2 else "judgment", "year": 1950 + i % 50}
+            for i in range(start, start + count)]
+
+
+def test_round_trip_and_reload(tmp_path):
+    vectors = clustered_vectors(1000)
+    ids = [f"v{i}" for i in range(1000)]
+    index = make_index(tmp_path)
+    index.upsert(ids, vectors, metadata_for(1000))
+    assert index.trained and len(index) == 1000
+
+    top = index.search(vectors[:3], 1)
+    assert [results[0][0] for results in top] == ids[:3]
+    assert index.fetch(["v5", "missing"]) == {"v5": metadata_for(1, 5)[0]}
+
+    index.upsert(["v5"], vectors[6:7], metadata_for(1, 6))
+    index.delete(["v7"])
+    reloaded = make_index(tmp_path)
+    assert len(reloaded) == 999
+    assert reloaded.fetch(["v5", "v7"]) == {"v5": metadata_for(1, 6)[0]}
+    assert {vector_id for vector_id, _, _ in reloaded.search(vectors[6], 2)[0]} == {"v5", "v6"}
+
+
+def test_filtered_search_only_returns_matches(tmp_path):
+    vectors = clustered_vectors(1000)
+    index = make_index(tmp_path)
+    index.upsert([f"v{i}" for i in range(1000)], vectors, metadata_for(1000))
+    for _, _, metadata in index.search(vectors[0], 10, filter={"doc_type": "article", "year": {"$gte": 1990}})[0]:
+        assert metadata["doc_type"] == "article" and metadata["year"] >= 1990
+
+
+def test_recall_against_brute_force(tmp_path):
+    vectors = clustered_vectors(1000)
+    queries = clustered_vectors(50, seed=1)
+    index = make_index(tmp_path)
+    index.upsert([f"v{i}" for i in range(1000)], vectors, metadata_for(1000))
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T, axis=1)[:, :10]
+    found = index.search(queries, 10, nprobe=4, refine=4)
+    recall = np.mean([len({f"v{row}" for row in truth} & {vector_id for vector_id, _, _ in results}) / 10
+                      for truth, results in zip(exact, found)])
+    assert recall >= 0.9
+
+
+def test_torn_write_is_ignored_by_readers_and_repaired_by_the_writer(tmp_path):
+    vectors = clustered_vectors(100)
+    writer = make_index(tmp_path)
+    writer.upsert([f"v{i}" for i in range(100)], vectors, metadata_for(100))
+
+    # A writer that crashed mid-append: a vector row without its record, and half a record line
+    with open(tmp_path / "vectors.bin", "ab") as f:
+        f.write(b"\0" * 2 * DIM)
+    with open(tmp_path / "records.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "torn"')
+    sizes = {name: os.path.getsize(tmp_path / name) for name in ("vectors.bin", "records.jsonl")}
+
+    reader = make_index(tmp_path)
+    assert len(reader) == 100 and reader.fetch(["torn"]) == {}
+    assert {name: os.path.getsize(tmp_path / name) for name in sizes} == sizes
+
+    writer.upsert(["new"], clustered_vectors(1, seed=2), metadata_for(1, 100))
+    reloaded = make_index(tmp_path)
+    assert len(reloaded) == 101
+    assert reloaded.search(clustered_vectors(1, seed=2), 1)[0][0][0] == "new"
+    assert reader.changed_on_disk()
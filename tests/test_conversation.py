@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from retrieval import conversation as conversation_module
+from retrieval.conversation import Conversation, ConversationStore, turn_message
+
+ANSWER = "The Article guarantees the right in the terms set out in the context above. " * 8
+
+
+def add_turns(conversation, count, start=0):
+    for i in range(start, start + count):
+        question = f"What does Article {i + 1} say?"
+        documents = [{"chunk_id": f"chunk_{i}", "text": f"Text of Article {i + 1}. " * 10}]
+        conversation.add_turn(question, turn_message(question, documents[0]["text"]), ANSWER, documents)
+
+
+def test_messages_keep_the_previous_turn_as_prefix():
+    conversation = Conversation("c1")
+    add_turns(conversation, 2)
+    before = conversation.messages("Question: next")
+    add_turns(conversation, 1, start=2)
+    after = conversation.messages("Question: next")
+    assert after[:len(before) - 1] == before[:-1]
+
+
+def test_add_turn_folds_old_turns_over_budget(monkeypatch):
+    monkeypatch.setattr(conversation_module, "CONVERSATION_HISTORY_TOKENS", 600)
+    conversation = Conversation("c1")
+    for i in range(10):
+        add_turns(conversation, 1, start=i)
+        assert conversation.turn_count == i + 1
+    assert conversation.folded_turns > 0
+    assert conversation.turns[-1]["question"] == "What does Article 10 say?"
+    assert conversation.history_tokens() <= 600
+    assert conversation.summary and conversation.summary[0].startswith("- Q: What does Article")
+    # Chunks of folded turns stay available as pinned context
+    assert "chunk_0" in conversation.known_chunk_ids()
+    assert conversation.messages("Question: next")[1]["role"] == "system"
+
+
+def test_follow_up_detection():
+    conversation = Conversation("c1")
+    assert not conversation.is_follow_up("What about clause 2 of that?")
+    add_turns(conversation, 1)
+    assert conversation.is_follow_up("What about clause 2 of that?")
+    assert conversation.retrieval_query("And its exceptions?").startswith("What does Article 1 say?\n")
+    assert not conversation.is_follow_up("What does Article 19 say about that?")
+
+
+def test_store_round_trip(tmp_path):
+    store = ConversationStore(str(tmp_path))
+    conversation = store.get("user-1")
+    assert conversation.turn_count == 0
+    add_turns(conversation, 2)
+    store.save(conversation)
+
+    loaded = ConversationStore(str(tmp_path)).get("user-1")
+    assert loaded.to_dict() == conversation.to_dict()
+
+
+def test_store_expires_idle_conversations(tmp_path):
+    store = ConversationStore(str(tmp_path), ttl_seconds=60)
+    conversation = store.get("user-1")
+    add_turns(conversation, 1)
+    conversation.updated_at -= 120
+    store.save(conversation)
+    assert store.get("user-1").turn_count == 0
+
+
+def test_store_rejects_unsafe_ids(tmp_path):
+    store = ConversationStore(str(tmp_path))
+    for conversation_id in ("../x", "", "a/b", "x" * 65):
+        try:
+            store.get(conversation_id)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {conversation_id!r}")
+
+
+def test_locked_turns_are_not_lost(tmp_path):
+    store = ConversationStore(str(tmp_path))
+
+    def answer(i):
+        with store.locked("user-1"):
+            conversation = store.get("user-1")
+            add_turns(conversation, 1, start=i)
+            store.save(conversation)
+
+    threads = [threading.Thread(target=answer, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get("user-1").turn_count == 8
@@ -0,0 +1,96 @@
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from server import RAGServer, RequestLimiter, RETRY_AFTER_SECONDS, response_status
+from utils.warmup import WarmupState
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_limiter_queues_then_rejects():
+    limiter = RequestLimiter(max_concurrency=1, max_pending=1)
+    assert limiter.acquire()
+
+    queued = threading.Thread(target=limiter.acquire)
+    queued.start()
+    wait_until(lambda: limiter.stats()["pending"] == 1)
+    assert not limiter.acquire()  # the wait queue is full
+
+    limiter.release()
+    queued.join(timeout=5)
+    assert limiter.stats() == {"in_flight": 1, "pending": 0, "served": 1, "rejected": 1}
+    limiter.release()
+
+
+def test_response_status():
+    assert response_status({"error": None}) == 200
+    assert response_status({"error": "slow down", "error_type": "LLMRateLimitError"}) == 503
+    assert response_status({"error": "bad gateway", "error_type": "LLMServerError"}) == 502
+    assert response_status({"error": "boom"}) == 500
+
+
+def start_server(limiter, ready=True):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    warmup = WarmupState([])
+    if ready:
+        warmup.status = "ready"
+    server = RAGServer(sock, 0, warmup, limiter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def post_question(server, body):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    connection.request("POST", "/query", json.dumps(body), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response, payload
+
+
+def test_handler_answers_503_with_retry_after_when_full():
+    limiter = RequestLimiter(max_concurrency=1, max_pending=0)
+    server = start_server(limiter)
+    try:
+        response, payload = post_question(server, {"question": "What does Article 21 say?"})
+        assert response.status == 503
+        assert response.getheader("Retry-After") == str(RETRY_AFTER_SECONDS)
+        assert "error" in payload
+        assert limiter.stats()["rejected"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_handler_answers_503_while_warming_up():
+    server = start_server(RequestLimiter(max_concurrency=1, max_pending=1), ready=False)
+    try:
+        response, payload = post_question(server, {"question": "What does Article 21 say?"})
+        assert response.status == 503
+        assert response.getheader("Retry-After") == str(RETRY_AFTER_SECONDS)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_handler_rejects_invalid_bodies():
+    server = start_server(RequestLimiter(max_concurrency=1, max_pending=1))
+    try:
+        assert post_question(server, {"question": ""})[0].status == 400
+        assert post_question(server, {"question": "x", "conversation_id": "../x"})[0].status == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from data.structure_chunker import ARTICLE_PATTERN, iter_segments
+
+HEADINGS = [
+    ("1. Name and territory of the Union.—(1) India, that is Bharat, shall be a Union of States.",
+     "1", "Name and territory of the Union"),
+    ("14. Equality before law.—The State shall not deny to any person equality before the law",
+     "14", "Equality before law"),
+    ("21. Protection of life and personal liberty.—No person shall be deprived of his life",
+     "21", "Protection of life and personal liberty"),
+    ("1[21A. Right to education.—The State shall provide free and compulsory education",
+     "21A", "Right to education"),
+]
+
+FOOTNOTES = [
+    "3. Ins. by the Constitution (Forty-second Amendment) Act, 1976, s. 2 (w.e.f. 3-1-1977).",
+    "1. Subs. by the Constitution (Seventh Amendment) Act, 1956, s. 29 and Sch.",
+    "2. The words \"and the Union territories\" omitted by the Constitution (Seventh Amendment) Act, 1956.",
+]
+
+
+def test_article_headings_match():
+    for line, number, title in HEADINGS:
+        match = ARTICLE_PATTERN.match(line)
+        assert match is not None, line
+        assert match.group(1) == number
+        assert match.group(2).strip(" .") == title
+
+
+def test_amendment_footnotes_are_not_articles():
+    for line in FOOTNOTES:
+        assert ARTICLE_PATTERN.match(line) is None, line
+
+
+def test_footnote_does_not_skip_following_article():
+    page = "\n".join([
+        "PART I",
+        "1. Name and territory of the Union.—(1) India, that is Bharat, shall be a Union of States.",
+        FOOTNOTES[0],
+        "2. Admission or establishment of new States.—Parliament may by law admit into the Union",
+    ])
+    articles = [segment.article for segment in iter_segments([(1, page)]) if segment.article]
+    assert articles == ["1", "2"]